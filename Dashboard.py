@@ -6,9 +6,16 @@ import altair as alt
 from streamlit_autorefresh import st_autorefresh
 import streamlit.components.v1 as components
 
+import dashboard_data
+import signal_journal
+import signal_stats
+
 # --- KONFIGURASI UTAMA ---
-JSON_FILE = "sinyal_trading.json"
-PNL_MULTIPLIER = 0.01 
+JSON_FILE = signal_journal.SNAPSHOT_FILE
+JOURNAL_FILE = signal_journal.JOURNAL_FILE
+AGGREGATES_FILE = signal_stats.AGGREGATES_FILE
+TRADES_PER_HALAMAN = 50
+PNL_MULTIPLIER = dashboard_data.PNL_MULTIPLIER
 
 # Warna kustom
 COLOR_PROFIT = '#2ecc71'
@@ -30,26 +37,20 @@ def load_css():
         .metric-value { font-size: 1.5rem; font-weight: bold; }
         </style>""", unsafe_allow_html=True)
 
-def load_signals():
+def load_data():
     try:
-        df = pd.read_json(JSON_FILE)
-        if df.empty: return pd.DataFrame()
-        df['Waktu'] = pd.to_datetime(df['Waktu'], errors='coerce')
-        df.dropna(subset=['Waktu'], inplace=True)
-        return df.sort_values('Waktu', ascending=False)
+        # Ringkasan agregat yang ditulis bot; histori lengkap tidak dibaca di sini (lihat dashboard_data.py)
+        return dashboard_data.get_summary(AGGREGATES_FILE, JSON_FILE, JOURNAL_FILE)
     except Exception as e:
-        st.error(f"Gagal memuat {JSON_FILE}: {e}")
-        return pd.DataFrame()
+        st.error(f"Gagal memuat {AGGREGATES_FILE}: {e}")
+        return None
 
-def calculate_pnl(row):
+def load_trades():
     try:
-        entry, sl, tp = float(row['Entry']), float(row['SL']), float(row['TP'])
-        tipe, hasil = str(row.get('Tipe', '')).upper(), str(row.get('Hasil', '')).upper()
-        if hasil == "TP": pnl = abs(tp - entry) * PNL_MULTIPLIER
-        elif hasil == "SL": pnl = -abs(sl - entry) * PNL_MULTIPLIER
-        else: pnl = 0.0
-        return pnl
-    except (ValueError, TypeError): return 0.0
+        return dashboard_data.get_trades(JSON_FILE, JOURNAL_FILE)
+    except Exception as e:
+        st.error(f"Gagal memuat {JSON_FILE}: {e}")
+        return None
 
 def render_holistic_summary(metrics):
     st.markdown("### Ringkasan Performa Holistik")
@@ -77,11 +78,19 @@ def render_holistic_summary(metrics):
             ).properties(height=200, width=200)
             st.altair_chart(donut_chart, use_container_width=True)
 
-def render_trades_tab(df):
+def render_trades_tab():
     st.markdown("### Histori Trade")
-    display_df = df.copy()
-    display_df['Net PnL'] = display_df.apply(calculate_pnl, axis=1)
-    st.dataframe(display_df[['Waktu', 'Tipe', 'Hasil', 'Entry', 'SL', 'TP', 'Net PnL', 'Alasan', 'Probabilitas']], hide_index=True, use_container_width=True,
+    # Histori lengkap hanya dimuat jika diminta, lalu ditampilkan per halaman
+    if not st.toggle("Tampilkan histori trade", key="tampilkan_trades"):
+        return
+    trades = load_trades()
+    if trades is None or trades.empty:
+        st.info("Belum ada trade."); return
+    jumlah_halaman = max(1, -(-len(trades) // TRADES_PER_HALAMAN))
+    halaman = st.number_input(f"Halaman (1-{jumlah_halaman})", min_value=1, max_value=jumlah_halaman, value=1, step=1, key="halaman_trades")
+    mulai = (halaman - 1) * TRADES_PER_HALAMAN
+    st.caption(f"Trade {mulai + 1}-{min(mulai + TRADES_PER_HALAMAN, len(trades))} dari {len(trades)}")
+    st.dataframe(trades.iloc[mulai:mulai + TRADES_PER_HALAMAN], hide_index=True, use_container_width=True,
         column_config={"Waktu": st.column_config.DatetimeColumn("Waktu", format="YYYY-MM-DD HH:mm"), "Net PnL": st.column_config.NumberColumn("Net PnL", format="$%.2f"), "Probabilitas": st.column_config.ProgressColumn("Probabilitas", format="%.2f", min_value=0, max_value=1),})
 
 # --- MAIN APP ---
@@ -91,27 +100,12 @@ def main():
     st_autorefresh(interval=60 * 1000, key="data_refresher")
     st.title("📈 Trading Performance Dashboard")
     
-    df = load_signals()
-    if df.empty:
+    data = load_data()
+    if data is None:
         st.warning("File sinyal_trading.json kosong atau tidak ditemukan."); st.stop()
 
-    if 'Hasil' not in df.columns: df['Hasil'] = None
-    df['Hasil'] = df['Hasil'].fillna('pending')
-    for col in ['Entry', 'SL', 'TP', 'Probabilitas']:
-        if col in df.columns: df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
-    outcome_df = df['Hasil'].value_counts().reset_index(); outcome_df.columns = ['Hasil', 'Count']
-    total_signals = len(df)
-    total_win = (df['Hasil'] == "TP").sum()
-    total_loss = (df['Hasil'] == "SL").sum()
-    total_invalid = df['Hasil'].str.contains('invalid', na=False).sum()
-    total_expired = (df['Hasil'] == "expired").sum()
-    executed_trades = total_win + total_loss
-    df['Net_PnL'] = df.apply(calculate_pnl, axis=1)
-    
-    metrics = {'total_pnl': df[df['Hasil'].isin(['TP', 'SL'])]['Net_PnL'].sum(), 'win_rate': (total_win / executed_trades * 100) if executed_trades > 0 else 0, 'execution_rate': (executed_trades / total_signals * 100) if total_signals > 0 else 0, 'total_signals': total_signals, 'total_win': total_win, 'total_loss': total_loss, 'total_invalid': total_invalid, 'total_expired': total_expired, 'outcome_df': outcome_df}
-    
-    render_holistic_summary(metrics)
+    # Metrik & frame grafik dari file agregat, dihitung ulang hanya jika file berubah
+    render_holistic_summary(data['metrics'])
 
     st.markdown("### Live Chart TradingView")
     tradingview_widget_html = f"""
@@ -132,16 +126,13 @@ def main():
     st.markdown("### Analisis Mendalam")
     tabs = st.tabs(["Trades", "PnL per Minggu", "PnL Kumulatif", "Rata-rata Win/Loss"])
     
-    with tabs[0]: render_trades_tab(df)
+    with tabs[0]: render_trades_tab()
     
-    chart_df = df[df['Hasil'].isin(['TP', 'SL'])].copy()
+    chart_df = data['chart_df']
     if not chart_df.empty:
-        chart_df = chart_df.sort_values('Waktu'); chart_df['Cum_PnL'] = chart_df['Net_PnL'].cumsum()
-        
         with tabs[1]:
-            st.markdown("##### PnL per Minggu"); weekly_pnl = chart_df.set_index('Waktu').resample('W-MON')['Net_PnL'].sum().reset_index()
+            st.markdown("##### PnL per Minggu"); weekly_pnl = data['weekly_pnl']
             if not weekly_pnl.empty:
-                weekly_pnl['WeekDisplay'] = weekly_pnl['Waktu'].apply(lambda d: f"{d.strftime('%b %d')} - {(d + timedelta(days=6)).strftime('%b %d')}")
                 weekly_chart = alt.Chart(weekly_pnl).mark_bar(size=20).encode(x=alt.X('WeekDisplay:N', title="Minggu", sort=alt.EncodingSortField(field="Waktu"), axis=alt.Axis(labelAngle=0)), y=alt.Y('Net_PnL:Q', title="Net PnL"), color=alt.condition(alt.datum.Net_PnL > 0, alt.value(COLOR_PROFIT), alt.value(COLOR_LOSS)), tooltip=['WeekDisplay', alt.Tooltip('Net_PnL', format='$,.2f')]).properties(height=300)
                 st.altair_chart(weekly_chart, use_container_width=True)
         
@@ -149,7 +140,7 @@ def main():
             st.markdown("##### PnL Kumulatif"); base = alt.Chart(chart_df).encode(x=alt.X("Waktu:T", title="Tanggal", axis=alt.Axis(labelAngle=0)), y=alt.Y("Cum_PnL:Q", title="Cumulative PnL", scale=alt.Scale(zero=True)), tooltip=[alt.Tooltip("Waktu:T", format='%Y-%m-%d %H:%M', title="Waktu"), alt.Tooltip("Cum_PnL:Q", format='$,.2f', title="PnL Kumulatif")]); area_layer = base.mark_area(opacity=0.3, color=COLOR_LINE); line_layer = base.mark_line(color=COLOR_LINE); cumulative_chart = (area_layer + line_layer).properties(height=300).interactive(); st.altair_chart(cumulative_chart, use_container_width=True)
         
         with tabs[3]:
-            st.markdown("##### Rata-rata Win vs Loss"); win_avg = chart_df[chart_df['Net_PnL'] > 0]['Net_PnL'].mean(); loss_avg = chart_df[chart_df['Net_PnL'] < 0]['Net_PnL'].mean(); avg_data = pd.DataFrame([{'Jenis': 'Rata-rata Win', 'Nilai': win_avg}, {'Jenis': 'Rata-rata Loss', 'Nilai': loss_avg}]).fillna(0); avg_chart = alt.Chart(avg_data).mark_bar(size=20).encode(x=alt.X('Jenis:N', title=None, sort=None, axis=alt.Axis(labelAngle=0)), y=alt.Y('Nilai:Q', title="Rata-rata PnL"), color=alt.condition(alt.datum.Nilai > 0, alt.value(COLOR_PROFIT), alt.value(COLOR_LOSS)), tooltip=['Jenis', alt.Tooltip('Nilai', format='$,.2f')]).properties(height=300); st.altair_chart(avg_chart, use_container_width=True)
+            st.markdown("##### Rata-rata Win vs Loss"); avg_data = data['avg_data']; avg_chart = alt.Chart(avg_data).mark_bar(size=20).encode(x=alt.X('Jenis:N', title=None, sort=None, axis=alt.Axis(labelAngle=0)), y=alt.Y('Nilai:Q', title="Rata-rata PnL"), color=alt.condition(alt.datum.Nilai > 0, alt.value(COLOR_PROFIT), alt.value(COLOR_LOSS)), tooltip=['Jenis', alt.Tooltip('Nilai', format='$,.2f')]).properties(height=300); st.altair_chart(avg_chart, use_container_width=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,4 @@
-import requests
 import json
-import csv
 import time
 import re
 from datetime import datetime, timedelta
@@ -8,78 +6,112 @@ from zoneinfo import ZoneInfo
 import os
 from dotenv import load_dotenv
 
+import candle_store
+import http_client
+import indicators
+import intrabar
+import llm_cache
+import llm_client
+import llm_ensemble
+import metrics
+import prompt_builder
+import signal_journal
+import signal_stats
+import state_checkpoint
+from signal_book import SignalBook
+from scheduler import BarScheduler
+
 # --- KONFIGURASI UTAMA & MANAJEMEN RISIKO ---
 # Di sini Anda bisa dengan mudah mengubah parameter bot tanpa menyentuh kode inti.
 load_dotenv()
 TWELVE_DATA_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
 LLM_API_KEY = os.getenv("LLM_API_KEY")
+LLM_API_URL = os.getenv("LLM_API_URL", llm_client.LLM_API_URL) # Bisa diarahkan ke stub_servers.py untuk uji lokal
+LLM_MODEL = llm_client.LLM_MODEL
+LLM_STREAMING = True # Stream respons & berhenti begitu objek JSON sinyal pertama lengkap
+# Ensemble: prompt dikirim bersamaan ke beberapa model/endpoint (kosong = hanya LLM_MODEL).
+# Contoh: [{"model": LLM_MODEL}, {"model": "Qwen/Qwen2.5-72B-Instruct-Turbo"}, {"model": "...", "url": "...", "api_key": "..."}]
+LLM_ENSEMBLE = []
+LLM_ENSEMBLE_MODE = llm_ensemble.MODE_PERTAMA # MODE_PERTAMA: sinyal valid tercepat menang | MODE_VOTING: mayoritas
+LLM_ENSEMBLE_DEADLINE = 20 # Detik, batas waktu keseluruhan ensemble
+LLM_CACHE_FILE = llm_cache.CACHE_FILE # Keputusan LLM per kondisi pasar, dipakai ulang selama kondisi sama
+LLM_CACHE_TTL_DETIK = 15 * 60 # Umur maksimal keputusan yang boleh dipakai ulang
 
 # Pengaturan Aset & Timeframe
 SYMBOL = "BTC/USD:Binance"
 INTERVAL = "15min"
-CANDLES_UNTUK_PROMPT = 100
+CANDLES_UNTUK_PROMPT = 100 # Maksimal candle terbaru yang ditulis per bar di prompt
+CANDLES_RINGKASAN_PROMPT = 400 # Candle lebih lama yang boleh diringkas (OHLC per jam) jika anggaran token cukup
+PROMPT_TOKEN_BUDGET = 3000 # Anggaran token input untuk satu prompt
+CANDLES_WARMUP = 1000 # Jumlah candle yang diambil saat store lokal masih kosong (cukup untuk konteks H1 & Daily)
+SESI_DAILY = "UTC" # Penyelarasan bar Daily: "UTC" (sama dengan TwelveData) atau "WIB"
+INTRABAR_DRILLDOWN = True # Candle yang ambigu (SL & TP / TP & Entry tersentuh bersamaan) dicek dengan candle 1min
 HISTORY_UNTUK_PROMPT = 5 # Jumlah histori sinyal yang dikirim ke LLM
 
 # Pengaturan Risiko & Perdagangan
 MINIMUM_RR = 2.0  # Risk/Reward Ratio minimal yang diterima
 WAKTU_EXPIRED_MENIT = 120 # Waktu kadaluarsa sinyal dalam menit jika tidak aktif
 
-# Pengaturan File
-JSON_FILE = "sinyal_trading.json"
-CSV_FILE = "sinyal_trading.csv"
+# Pengaturan File (snapshot + jurnal append-only, lihat signal_journal.py)
+JSON_FILE = signal_journal.SNAPSHOT_FILE
+JOURNAL_FILE = signal_journal.JOURNAL_FILE
+AGGREGATES_FILE = signal_stats.AGGREGATES_FILE # Ringkasan inkremental untuk Dashboard.py
+STATE_FILE = state_checkpoint.STATE_FILE # Checkpoint biner untuk start ulang cepat (sinyal terbuka, candle terakhir, indikator)
+
+# Instrumentasi (lihat metrics.py): endpoint Prometheus lokal + log JSONL per tahap
+METRICS_PORT = metrics.METRICS_PORT # None = tanpa endpoint
+METRICS_LOG_FILE = metrics.METRICS_LOG_FILE # None = tanpa log JSONL
 WIB = ZoneInfo("Asia/Jakarta")
 
 # --- FUNGSI-FUNGSI INTI ---
 
 def fetch_data_with_retry(url, max_retry=3):
-    for attempt in range(max_retry):
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"⚠️  Percobaan {attempt + 1} gagal: {e}")
-    return None
-
-def get_market_data():
-    # Menggunakan variabel dari konfigurasi
-    url = f"https://api.twelvedata.com/time_series?symbol={SYMBOL}&interval={INTERVAL}&apikey={TWELVE_DATA_API_KEY}&outputsize={CANDLES_UNTUK_PROMPT}"
-    data = fetch_data_with_retry(url)
+    # Koneksi pooled + backoff + circuit breaker ada di http_client
+    return http_client.get_json(url, max_retry=max_retry, timeout=10)
+
+def fetch_time_series(params):
+    # Dipakai candle_store untuk sinkronisasi; mengembalikan list 'values' atau None
+    values = http_client.twelvedata_time_series({**params, "apikey": TWELVE_DATA_API_KEY}, timeout=10)
+    if values == http_client.LIMIT_EXCEEDED:
+        return None
+    return values
+
+def get_market_data(symbol=SYMBOL, interval=INTERVAL):
+    # Hanya candle baru yang diambil dari API, sisanya dilayani dari store lokal
+    with metrics.span("market_data", symbol=symbol, interval=interval):
+        baru = candle_store.sync_candles(symbol, interval, fetch_time_series, warmup=CANDLES_WARMUP)
+        candles = candle_store.load_candles(symbol, interval)
 
     print("\n====================== MARKET DATA ======================")
-    print(f"📡 Symbol         : {SYMBOL}")
-    print(f"⏱️ Interval       : {INTERVAL}")
+    print(f"📡 Symbol         : {symbol}")
+    print(f"⏱️ Interval       : {interval}")
 
-    if not data or "values" not in data:
+    if baru is None or len(candles) == 0:
         print("❗ Gagal mendapatkan data pasar dari API TwelveData.")
         print("========================================================\n")
         return []
 
-    print(f"✅ Candle         : {len(data['values'])} data berhasil diambil")
-    print(f"🆕 Data Terbaru   : {data['values'][0]['datetime']}")
+    values = candle_store.records_to_values(candles[-CANDLES_UNTUK_PROMPT:])
+    print(f"✅ Candle         : {baru} data baru diambil, {len(values)} data dari store lokal")
+    print(f"🆕 Data Terbaru   : {values[0]['datetime']}")
     print("========================================================\n")
-    return data["values"]
+    return values
 
 def load_signals():
+    # State = snapshot JSON + replay jurnal
     try:
-        with open(JSON_FILE, "r") as f:
-            return json.load(f)
+        return signal_journal.load_signals(JSON_FILE, JOURNAL_FILE, repair=True)
     except Exception:
         return []
 
-def save_signals(data):
-    # Menyimpan semua data sinyal ke JSON dan CSV
-    with open(JSON_FILE, "w") as f:
-        json.dump(data, f, indent=2)
-    
-    # Simpan juga ke CSV
-    if not data: return
-    keys = set()
-    for d in data: keys.update(d.keys())
-    with open(CSV_FILE, "w", newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=list(keys))
-        writer.writeheader()
-        writer.writerows(data)
+def save_signal_event(idx, sinyal, baru=False, journal_file=None):
+    # Hanya event yang berubah yang ditulis; view JSON/CSV lengkap dibuat oleh regeneratecsv.py
+    journal_file = journal_file or JOURNAL_FILE
+    with metrics.span("jurnal"):
+        if baru:
+            signal_journal.append_new(idx, sinyal, journal_file=journal_file)
+        else:
+            signal_journal.append_update(idx, sinyal, journal_file=journal_file)
 
 def get_last_signals_for_prompt(signals, max_count):
     # Sekarang LLM akan melihat semua jenis hasil, termasuk yang gagal
@@ -88,123 +120,92 @@ def get_last_signals_for_prompt(signals, max_count):
 
 # --- FUNGSI BARU UNTUK PROMPT YANG LEBIH CERDAS ---
 
-def get_trend_and_volatility_summary():
-    # Fungsi ini mengambil tren H1 dan memberikan ringkasan volatilitas sederhana
-    url = f"https://api.twelvedata.com/time_series?symbol={SYMBOL}&interval=1h&apikey={TWELVE_DATA_API_KEY}&outputsize=24"
-    data = fetch_data_with_retry(url)
-    if not data or "values" not in data or len(data["values"]) < 2:
-        return "Tidak diketahui", "Tidak diketahui"
-    
-    values = data["values"]
-    closes = [float(c["close"]) for c in reversed(values)]
-    highs = [float(h["high"]) for h in reversed(values)]
-    lows = [float(l["low"]) for l in reversed(values)]
-    
-    # Tren sederhana
-    trend = "Uptrend" if closes[-1] > closes[0] else "Downtrend"
-    
-    # Volatilitas sederhana (berdasarkan rentang candle)
-    avg_range = sum(h - l for h, l in zip(highs, lows)) / len(highs)
-    last_range = highs[-1] - lows[-1]
-    
-    if last_range > avg_range * 1.5:
-        volatility = "Tinggi"
-    elif last_range < avg_range * 0.7:
-        volatility = "Rendah"
+_indicator_engines = {} # (symbol, interval) -> IndicatorEngine
+
+def get_indicator_engine(candles, symbol=SYMBOL, interval=INTERVAL):
+    """
+    Mesin indikator inkremental (tren/volatilitas H1, S/R Daily, EMA, ATR, swing, FVG),
+    diperbarui hanya dengan candle yang belum pernah diterapkan dan di-checkpoint ke disk.
+    """
+    config = {"base_interval": interval, "session": SESI_DAILY}
+    path = indicators.checkpoint_path(symbol, interval)
+    kunci = (symbol, interval)
+    if kunci not in _indicator_engines:
+        _indicator_engines[kunci] = indicators.load_checkpoint(path, **config)
+    engine = _indicator_engines[kunci]
+    if engine is None or (len(candles) and engine.last_ts is not None and candles["ts"][-1] < engine.last_ts):
+        # Belum ada state (atau candle yang diminta lebih lama dari state): bangun dari ekor data
+        engine = indicators.IndicatorEngine(**config)
+        engine.update_records(candles[-CANDLES_WARMUP:])
+        if _indicator_engines[kunci] is None:
+            _indicator_engines[kunci] = engine
     else:
-        volatility = "Sedang"
-        
-    return trend, volatility
-
-def get_support_resistance():
-    # Placeholder: Di masa depan, ini bisa diisi dengan logika yang lebih canggih
-    # untuk menghitung S/R dari timeframe Daily atau Weekly.
-    # Untuk sekarang, kita bisa menggunakan nilai high/low dari beberapa hari terakhir.
-    url = f"https://api.twelvedata.com/time_series?symbol={SYMBOL}&interval=1day&apikey={TWELVE_DATA_API_KEY}&outputsize=5"
-    data = fetch_data_with_retry(url)
-    if not data or "values" not in data:
-        return "Tidak diketahui", "Tidak diketahui"
-    
-    highs = [float(v['high']) for v in data['values']]
-    lows = [float(v['low']) for v in data['values']]
-    
-    # S/R sederhana dari high 5 hari terakhir dan low 5 hari terakhir
-    resistance = max(highs)
-    support = min(lows)
-    
-    return f"${support:,.2f}", f"${resistance:,.2f}"
-
-def format_prompt(data_market, signals_lama):
-    harga_str = "\n".join([f"{v['datetime']} Close: {v['close']}" for v in data_market])
-    sinyal_str = json.dumps(signals_lama, indent=2)
-    
-    # Mengambil konteks pasar yang lebih kaya
-    trend_h1, volatility_h1 = get_trend_and_volatility_summary()
-    support, resistance = get_support_resistance()
-
-    prompt = f"""
-Anda adalah seorang analis trading profesional yang menggunakan konsep ICT & Smart Money Concepts (SMC).
-
-## Bagian 1: Analisis Kondisi Pasar Saat Ini
-
-Berikut adalah data dan konteks pasar terbaru untuk {SYMBOL}:
-
-**Konteks Timeframe Tinggi (H1 & Daily):**
-- **Tren H1:** {trend_h1}
-- **Volatilitas H1:** {volatility_h1}
-- **Support Kunci (Daily Lows):** {support}
-- **Resistance Kunci (Daily Highs):** {resistance}
-
-**Data Harga Terbaru ({INTERVAL}):**
-{harga_str}
-
-## Bagian 2: Pembelajaran dari Performa Sebelumnya
-
-Berikut adalah {len(signals_lama)} sinyal trading terakhir beserta hasilnya. Pelajari ini untuk menghindari kesalahan yang sama.
-
-{sinyal_str}
-
-**Pelajaran Penting dari Sinyal Gagal:**
-- **`invalid_tp_hit_first`:** Ini terjadi karena `Entry` terlalu jauh dan `TP` terlalu dekat. Harga mencapai TP sebelum sempat menjemput order. **HINDARI** membuat sinyal seperti ini.
-- **`expired`:** Ini terjadi karena pasar sideways dan tidak ada momentum untuk mencapai `Entry`. Hindari memberi sinyal jika tidak ada tanda-tanda pergerakan harga yang jelas.
-- **`SL`:** Analisis mengapa SL terjadi. Apakah karena melawan tren H1? Apakah karena salah identifikasi order block?
-
-## Bagian 3: Tugas Anda
-
-Berdasarkan semua data di atas, berikan sinyal trading berikutnya.
-
-**Aturan Analisis & Output:**
-1.  **Prioritaskan sinyal yang searah dengan Tren H1**, kecuali Anda melihat ada Change of Character (CHoCH) yang valid.
-2.  Gunakan konsep SMC/ICT: cari liquidity sweep, displacement, Fair Value Gap (FVG), dan order block.
-3.  **Risk/Reward Ratio (RR) minimal harus {MINIMUM_RR}:1.** Hitung ini dengan cermat.
-4.  Pastikan `Entry`, `TP`, dan `SL` berada pada level harga yang masuk akal dan belum dilewati oleh harga saat ini.
-5.  Jika tidak ada peluang trading yang jelas dan berisiko rendah, kembalikan JSON kosong: `{{}}`
-6.  Format output **HANYA JSON SAJA**, tanpa penjelasan lain, seperti ini:
-
-{{
-  "Tipe": "BUY LIMIT" atau "SELL LIMIT",
-  "Entry": float,
-  "SL": float,
-  "TP": float,
-  "Probabilitas": float,
-  "Alasan": "string pendek menjelaskan setup SMC/ICT yang digunakan"
-}}
-"""
+        engine.update_records(candles)
+    if engine is _indicator_engines[kunci] and engine.last_ts is not None:
+        indicators.save_checkpoint(engine, path)
+    return engine
+
+def get_market_context(data_market, symbol=SYMBOL, interval=INTERVAL):
+    # Konteks H1 & Daily dibangun lokal dari candle yang sudah ada di store (tanpa request tambahan),
+    # dipotong sampai candle terbaru di data_market supaya prompt konsisten dengan data tersebut
+    with metrics.span("konteks_pasar", symbol=symbol, interval=interval):
+        candles = candle_store.load_candles(symbol, interval)
+        if data_market:
+            candles = candle_store.slice_until(candles, candle_store.parse_datetime(data_market[0]["datetime"]))
+        return candles, market_context_from_engine(get_indicator_engine(candles, symbol, interval))
+
+def market_context_from_engine(engine):
+    trend_h1, volatility_h1 = engine.trend_volatility()
+    support, resistance = engine.support_resistance()
+    return {"trend_h1": trend_h1, "volatility_h1": volatility_h1, "support": support, "resistance": resistance,
+            "indikator": engine.summary()}
+
+def format_prompt(data_market, signals_lama, market_context=None, symbol=SYMBOL, interval=INTERVAL):
+    candles, context = market_context or get_market_context(data_market, symbol, interval)
+    with metrics.span("prompt", symbol=symbol, interval=interval):
+        prompt, laporan = prompt_builder.build_prompt(
+            candles[-(CANDLES_UNTUK_PROMPT + CANDLES_RINGKASAN_PROMPT):], signals_lama, context, symbol, interval, MINIMUM_RR,
+            token_budget=PROMPT_TOKEN_BUDGET, raw_maks=CANDLES_UNTUK_PROMPT)
+    print(f"📝 Prompt ~{laporan['total']}/{laporan['budget']} token (preamble {laporan['preamble']}, konteks {laporan['konteks']}, "
+          f"harga {laporan['harga']}, histori {laporan['histori']}) | candle: {laporan['candle_raw']} per bar + {laporan['candle_ringkasan']} diringkas")
     return prompt
 
 # --- FUNGSI-FUNGSI EVALUASI (Telah disesuaikan) ---
 
 def extract_json_from_text(text):
-    # ... (Fungsi ini tidak perlu diubah) ...
+    # None = tidak ada JSON / JSON rusak (bukan keputusan "tidak ada trade")
     match = re.search(r"\{[\s\S]*\}", text)
     if match:
         try: return json.loads(match.group(0))
-        except json.JSONDecodeError: return {}
-    return {}
+        except json.JSONDecodeError: metrics.LLM_PARSE_FAILURES.inc(alasan="json_rusak", model=LLM_MODEL); return None
+    metrics.LLM_PARSE_FAILURES.inc(alasan="tanpa_json", model=LLM_MODEL)
+    return None
 
 def get_signal_from_llm(prompt):
-    # --- PERBAIKAN URL DI SINI ---
-    url = "https://api.together.ai/v1/chat/completions"  # Menggunakan domain .ai yang benar
+    # None = gagal menghubungi LLM / respons tidak bisa dipakai (jangan di-cache); {} = LLM memutuskan tidak ada trade
+    if LLM_ENSEMBLE:
+        print(f"🧠 Mengirim prompt cerdas ke {len(LLM_ENSEMBLE)} model sekaligus (mode {LLM_ENSEMBLE_MODE})...")
+        sinyal, laporan = llm_ensemble.ensemble_signal(prompt, LLM_ENSEMBLE, mode=LLM_ENSEMBLE_MODE, deadline=LLM_ENSEMBLE_DEADLINE,
+                                                       default_url=LLM_API_URL, default_key=LLM_API_KEY)
+        print(f"⏱️ Ensemble selesai dalam {laporan['durasi']} detik | menjawab: {laporan['jawaban']} | "
+              f"gagal: {list(laporan['gagal'])} | dibatalkan: {laporan['batal']}")
+        if sinyal is None:
+            print("❌ Tidak ada model yang menjawab sebelum batas waktu.")
+        else:
+            print(json.dumps(sinyal, indent=2))
+        return sinyal
+
+    if LLM_STREAMING:
+        try:
+            print("🧠 Mengirim prompt cerdas ke LLM (streaming)...");
+            sinyal, content = llm_client.stream_signal(prompt, LLM_API_KEY, model=LLM_MODEL, url=LLM_API_URL)
+            print("\n==================== RESPONSE LLM =======================")
+            print(content)
+            print("========================================================\n")
+            return sinyal
+        except Exception as e:
+            print(f"❌ Gagal mendapatkan sinyal dari LLM: {e}")
+            return None
 
     headers = {
         "Authorization": f"Bearer {LLM_API_KEY}",
@@ -212,23 +213,26 @@ def get_signal_from_llm(prompt):
     }
     # Menggunakan model yang stabil dan umum tersedia
     body = {
-        "model": "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free", 
+        "model": LLM_MODEL, 
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.7
     }
     try:
         print("🧠 Mengirim prompt cerdas ke LLM...");
-        response = requests.post(url, headers=headers, json=body, timeout=45)
-        response.raise_for_status()
-        result = response.json()
+        result = http_client.post_json(LLM_API_URL, body, headers=headers, timeout=45)
         content = result["choices"][0]["message"]["content"]
         print("\n==================== RESPONSE LLM =======================")
         print(content)
         print("========================================================\n")
-        return extract_json_from_text(content)
+        sinyal = extract_json_from_text(content)
+        return None if sinyal is None else llm_client.validate_signal(sinyal)
+    except llm_client.InvalidSignalError as e:
+        metrics.LLM_PARSE_FAILURES.inc(alasan="tidak_valid", model=LLM_MODEL)
+        print(f"❌ Sinyal dari LLM tidak valid: {e}")
+        return None
     except Exception as e:
         print(f"❌ Gagal mendapatkan sinyal dari LLM: {e}")
-        return {}
+        return None
     
 def validasi_expired(sinyal, now_wib):
     # Menggunakan variabel dari konfigurasi
@@ -260,82 +264,272 @@ def evaluasi_sinyal(sinyal, candle):
     
 # --- MAIN LOOP ---
 
-# --- MAIN LOOP ---
+def build_book(signals, symbol=SYMBOL, interval=INTERVAL):
+    """
+    SignalBook untuk satu instrumen. Sinyal lama tanpa Symbol/Interval dianggap milik
+    SYMBOL/INTERVAL; id tetap posisi di histori bersama, jadi next_id = panjang histori.
+    """
+    book = SignalBook(WAKTU_EXPIRED_MENIT, HISTORY_UNTUK_PROMPT)
+    for idx, sinyal in enumerate(signals):
+        if (sinyal.get("Symbol", SYMBOL), sinyal.get("Interval", INTERVAL)) == (symbol, interval):
+            book.add(idx, sinyal)
+    book.next_id = max(book.next_id, len(signals))
+    return book
+
+class LoopState:
+    """State yang dibawa antar iterasi main loop (dipakai juga oleh replay.py dan pipeline_engine.py)."""
+
+    def __init__(self, book, decision_cache, journal_file=None, fine_candles=None, stats=None,
+                 symbol=SYMBOL, interval=INTERVAL):
+        self.book = book
+        self.decision_cache = decision_cache
+        self.journal_file = journal_file
+        self.stats = stats # signal_stats.SignalStats, None = tanpa file agregat
+        self.fine_candles = fine_candles # intrabar.FineCandles, None = tanpa drill-down
+        self.symbol = symbol
+        self.interval = interval
+        self.last_processed_datetime = None
+
+    def add_signal(self, sinyal):
+        """Mendaftarkan sinyal baru ke buku & jurnal, mengembalikan id-nya."""
+        idx = self.book.next_id
+        self.book.add(idx, sinyal)
+        save_signal_event(idx, sinyal, baru=True, journal_file=self.journal_file)
+        return idx
+
+def _closed_bars(data, interval, now_utc, last_processed):
+    """
+    Candle dari `data` (terbaru dulu) yang sudah tutup pada `now_utc` dan belum diproses,
+    urut lama -> baru, plus posisi candle tutup terbaru di `data`. Candle yang masih
+    terbentuk (data[0] saat live) dilewati; tanpa `last_processed` hanya candle tutup terbaru.
+    """
+    step = candle_store.interval_seconds(interval)
+    now_ts = now_utc.timestamp()
+    terakhir = candle_store.parse_datetime(last_processed) if last_processed else None
+    bars, awal = [], None
+    for i, candle in enumerate(data):
+        ts = candle_store.parse_datetime(candle["datetime"])
+        if ts + step > now_ts:
+            continue
+        if terakhir is not None and ts <= terakhir:
+            break
+        if awal is None:
+            awal = i
+        bars.append(candle)
+        if terakhir is None:
+            break
+    return bars[::-1], awal
+
+def _expire_signals(state, waktu, ringkasan, label):
+    # Sinyal yang lewat WAKTU_EXPIRED_MENIT diambil dari heap, tanpa memindai seluruh histori
+    book = state.book
+    for idx, sinyal in book.pop_expired(waktu):
+        sinyal["Status"] = "expired"; sinyal["Hasil"] = "expired"
+        save_signal_event(idx, sinyal, journal_file=state.journal_file)
+        if state.stats is not None: state.stats.record_terminal(sinyal)
+        book.resolve(idx, sinyal)
+        ringkasan["hasil"].append((idx, "expired"))
+        metrics.SIGNAL_OUTCOMES.inc(hasil="expired", **label)
+        print(f"⚠️ Sinyal expired: {sinyal.get('Tipe')} @ {sinyal.get('Entry')}")
+
+def _evaluate_open_signals(state, candle, ringkasan, label):
+    book = state.book
+    for idx, sinyal in book.open_signals():
+        status_lama = sinyal["Status"]
+        if state.fine_candles is not None and intrabar.is_ambiguous(sinyal, candle):
+            print(f"🔬 Candle {candle['datetime']} ambigu untuk sinyal {sinyal['Tipe']} @ {sinyal['Entry']}, cek candle {state.fine_candles.interval}...")
+            hasil = intrabar.resolve_bar(sinyal, candle, state.interval, state.fine_candles, fallback=evaluasi_sinyal)
+        else:
+            hasil = evaluasi_sinyal(sinyal, candle)
+        if sinyal["Status"] != status_lama:
+            save_signal_event(idx, sinyal, journal_file=state.journal_file) # Transisi pending -> active -> TP/SL/invalid dicatat ke jurnal
+            if not hasil and state.stats is not None: state.stats.record_update(sinyal)
+        if hasil:
+            print(f"🎯 Sinyal {hasil.upper()}: {sinyal.get('Tipe')} @ {sinyal.get('Entry')}")
+            # Jika sudah ada hasil (TP/SL/Invalid), maka tidak perlu menunggu sinyal ini lagi
+            if state.stats is not None: state.stats.record_terminal(sinyal)
+            book.resolve(idx)
+            ringkasan["hasil"].append((idx, sinyal["Hasil"]))
+            metrics.SIGNAL_OUTCOMES.inc(hasil=sinyal["Hasil"], **label)
+
+def process_bar(state, data, now_utc, market_context=None, get_signal=None):
+    """
+    Satu iterasi pada waktu `now_utc` (datetime UTC aware) untuk `data` (candle terbaru dulu):
+    setiap candle yang sudah tutup sejak candle terakhir yang diproses dievaluasi berurutan
+    (expiry + evaluasi sinyal terbuka), lalu sinyal baru diminta untuk candle tutup terbaru
+    jika tidak ada yang ditunggu. Candle yang masih terbentuk tidak pernah dievaluasi.
+    Mengembalikan dict ringkasan: diproses, hasil [(idx, hasil)], llm_dipanggil, sinyal_baru.
+    """
+    book = state.book
+    ringkasan = {"diproses": False, "hasil": [], "llm_dipanggil": False, "sinyal_baru": None}
+    bars, awal = _closed_bars(data, state.interval, now_utc, state.last_processed_datetime)
+    if not bars:
+        print(f"⏳ Belum ada candle tutup setelah {state.last_processed_datetime}. Menunggu...")
+        return ringkasan
+    ringkasan["diproses"] = True
+    data = data[awal:] # Konteks & prompt berhenti di candle tutup terbaru
+    latest_candle_datetime = data[0]['datetime']
+    if len(bars) > 1:
+        print(f"🔁 {len(bars)} candle tutup sejak {state.last_processed_datetime} dievaluasi berurutan")
+
+    now_wib = now_utc.astimezone(WIB)
+    label = {"symbol": state.symbol, "interval": state.interval}
+    mulai_evaluasi = time.perf_counter()
+    step = candle_store.interval_seconds(state.interval)
+
+    # --- PERUBAHAN LOGIKA DI SINI ---
+    # Expiry dihitung pada waktu tutup tiap candle, jadi candle yang tertinggal dinilai sesuai urutannya
+    for candle in bars:
+        waktu_tutup = datetime.fromtimestamp(candle_store.parse_datetime(candle["datetime"]) + step, WIB)
+        _expire_signals(state, waktu_tutup, ringkasan, label)
+        _evaluate_open_signals(state, candle, ringkasan, label)
+    _expire_signals(state, now_wib, ringkasan, label)
+
+    # Sinyal yang masih terbuka harus ditunggu
+    terbuka = book.open_signals()
+    ada_sinyal_menunggu = bool(terbuka)
+    sinyal_yang_ditunggu = terbuka[-1][1] if terbuka else None
+
+    state.last_processed_datetime = latest_candle_datetime
+    metrics.record_span("evaluasi", time.perf_counter() - mulai_evaluasi, **label)
+    
+    # Gunakan penanda untuk membuat keputusan
+    if ada_sinyal_menunggu:
+        # Tampilkan status yang benar, apakah pending atau active
+        status_tunggu = sinyal_yang_ditunggu.get('Status', '').capitalize()
+        print(f"⏳ Menunggu sinyal selesai (Status: {status_tunggu}): {sinyal_yang_ditunggu['Tipe']} @ {sinyal_yang_ditunggu['Entry']}")
+        return ringkasan
+
+    print("🔍 Tidak ada sinyal yang perlu ditunggu. Mencoba generate sinyal baru...")
+    market_context = market_context or get_market_context(data, state.symbol, state.interval)
+    kunci = llm_cache.fingerprint(latest_candle_datetime, market_context[1], book.recent_resolved_keys(),
+                                  instrument=(state.symbol, state.interval))
+    sinyal_baru = state.decision_cache.get(kunci)
+    if sinyal_baru is not None:
+        metrics.LLM_DECISIONS.inc(sumber="cache", **label)
+        stats = state.decision_cache.stats()
+        print(f"♻️ Kondisi pasar sama dengan sebelumnya, keputusan LLM diambil dari cache "
+              f"(hit {stats['hits']}, miss {stats['misses']})")
+    else:
+        prompt = format_prompt(data, book.recent_resolved(), market_context, state.symbol, state.interval)
+        with metrics.span("llm", **label):
+            sinyal_baru = (get_signal or get_signal_from_llm)(prompt)
+        metrics.LLM_DECISIONS.inc(sumber="gagal" if sinyal_baru is None else "llm", **label)
+        ringkasan["llm_dipanggil"] = True
+        if sinyal_baru is not None:
+            state.decision_cache.put(kunci, sinyal_baru) # Termasuk {} (tidak ada trade)
+
+    if sinyal_baru and "Entry" in sinyal_baru:
+        risk = abs(sinyal_baru["Entry"] - sinyal_baru["SL"])
+        reward = abs(sinyal_baru["TP"] - sinyal_baru["Entry"])
+        rr = reward / risk if risk > 0 else 0
+        if rr < MINIMUM_RR:
+            metrics.RR_REJECTIONS.inc(**label)
+            print(f"❌ Sinyal ditolak karena RR < {MINIMUM_RR}:1 (RR: {rr:.2f})")
+        else:
+            sinyal_baru["Probabilitas"] = float(sinyal_baru.get("Probabilitas", 0.0))
+            sinyal_baru["Waktu"] = now_utc.isoformat()
+            sinyal_baru["Status"] = "pending"; sinyal_baru["Hasil"] = None
+            sinyal_baru["Symbol"] = state.symbol; sinyal_baru["Interval"] = state.interval
+            state.add_signal(sinyal_baru)
+            if state.stats is not None: state.stats.record_new(sinyal_baru)
+            metrics.SIGNALS_CREATED.inc(tipe=sinyal_baru.get("Tipe"), **label)
+            ringkasan["sinyal_baru"] = sinyal_baru
+            print("\n📈 Signal Trading Baru Diterima:")
+            print(json.dumps(sinyal_baru, indent=2))
+    else:
+        print("❌ Tidak ada sinyal valid dari LLM saat ini.")
+    return ringkasan
+
+def restore_state(decision_cache, fine_candles=None, symbol=SYMBOL, interval=INTERVAL):
+    """
+    LoopState dari checkpoint biner (buku sinyal + agregat) jika masih sesuai dengan snapshot +
+    jurnal; histori lengkap hanya dibaca jika checkpoint tidak ada / tertinggal dan file agregat
+    juga perlu dibangun ulang.
+    """
+    checkpoint = state_checkpoint.load_state(STATE_FILE)
+    if checkpoint is not None and (checkpoint["symbol"], checkpoint["interval"]) != (symbol, interval):
+        checkpoint = None
+    signals = None
+    stats = None
+    if checkpoint is not None and state_checkpoint.is_current(checkpoint, JSON_FILE, JOURNAL_FILE):
+        book = SignalBook.from_state(checkpoint["book"], WAKTU_EXPIRED_MENIT, HISTORY_UNTUK_PROMPT)
+        if checkpoint["stats"] is not None:
+            stats = signal_stats.SignalStats(AGGREGATES_FILE, JSON_FILE, JOURNAL_FILE)
+            if stats.load_dict(checkpoint["stats"]):
+                stats.watermark = checkpoint["watermark"]
+            else:
+                stats = None
+        print(f"⚡ State dipulihkan dari checkpoint: {len(book.open_signals())} sinyal terbuka, "
+              f"candle terakhir {checkpoint['last_processed_datetime']}")
+    else:
+        signals = load_signals()
+        book = build_book(signals, symbol, interval)
+    if stats is None:
+        # Agregat untuk dashboard: dibangun ulang dari histori hanya jika file tertinggal dari jurnal
+        stats = signal_stats.open_stats(signals if signals is not None else load_signals,
+                                        AGGREGATES_FILE, JSON_FILE, JOURNAL_FILE)
+    state = LoopState(book, decision_cache, fine_candles=fine_candles, stats=stats, symbol=symbol, interval=interval)
+    if checkpoint is not None:
+        # Candle terakhir & indikator tetap valid walau jurnal berubah setelah checkpoint
+        state.last_processed_datetime = checkpoint["last_processed_datetime"]
+        if checkpoint["indikator"] is not None:
+            engine = indicators.IndicatorEngine.from_state(checkpoint["indikator"], base_interval=interval, session=SESI_DAILY)
+            if engine is not None:
+                _indicator_engines[(symbol, interval)] = engine
+    return state
+
+def save_state(state):
+    with metrics.span("checkpoint"):
+        state_checkpoint.save_state(state, _indicator_engines.get((state.symbol, state.interval)), STATE_FILE,
+                                    JSON_FILE, JOURNAL_FILE)
+
+def record_bar_metrics(state, ringkasan, latency=None):
+    """Latensi candle tutup -> sinyal ke histogram + satu baris ringkasan iterasi di log JSONL."""
+    if latency is not None:
+        metrics.SIGNAL_LATENCY.observe(latency, symbol=state.symbol, interval=state.interval)
+    sinyal = ringkasan["sinyal_baru"]
+    metrics.log_event("bar", symbol=state.symbol, interval=state.interval, candle=state.last_processed_datetime,
+                      hasil=ringkasan["hasil"], llm_dipanggil=ringkasan["llm_dipanggil"],
+                      sinyal_baru=sinyal.get("Tipe") if sinyal else None,
+                      latensi_detik=round(latency, 3) if latency is not None else None)
 
 def main_loop():
-    signals = load_signals()
-    last_processed_datetime = None
+    # State dari checkpoint biner (histori lengkap hanya dibaca jika perlu); setelah itu loop bekerja dengan SignalBook
+    fine_candles = intrabar.FineCandles(SYMBOL, fetch_values=fetch_time_series) if INTRABAR_DRILLDOWN else None
+    state = restore_state(llm_cache.DecisionCache(ttl=LLM_CACHE_TTL_DETIK, path=LLM_CACHE_FILE), fine_candles)
+    # Bangun tepat setelah candle INTERVAL tutup, bukan polling tiap 60 detik
+    scheduler = BarScheduler(INTERVAL)
+    pertama = True
+    # Profil satu iterasi: `touch profile.trigger` atau GET /profile di endpoint metrics
+    metrics.configure(METRICS_LOG_FILE)
+    metrics.start_http_server(METRICS_PORT)
 
     while True:
+        if not pertama:
+            scheduler.wait_next_close()
+        pertama = False
         print("\n==============================")
         print(f"🕒 Loop dimulai: {datetime.now(WIB).strftime('%Y-%m-%d %H:%M:%S')} WIB")
 
-        data = get_market_data()
-        if not data:
-            time.sleep(30); continue
-
-        latest_candle_datetime = data[0]['datetime']
-        if latest_candle_datetime == last_processed_datetime:
-            print(f"⏳ Data candle {latest_candle_datetime} sudah diproses. Menunggu..."); time.sleep(60); continue
-
-        now_wib = datetime.now(WIB)
-        
-        # --- PERUBAHAN LOGIKA DI SINI ---
-        # Kita gunakan 'penanda' (flag) untuk melacak apakah ada sinyal yang harus ditunggu
-        ada_sinyal_menunggu = False
-        sinyal_yang_ditunggu = None
-
-        for sinyal in signals:
-            if sinyal.get("Status") in ["pending", "active"]:
-                # Tandai bahwa kita harus menunggu
-                ada_sinyal_menunggu = True
-                sinyal_yang_ditunggu = sinyal # Simpan info sinyal untuk ditampilkan
-                
-                if validasi_expired(sinyal, now_wib):
-                    sinyal["Status"] = "expired"; sinyal["Hasil"] = "expired"
-                    print(f"⚠️ Sinyal expired: {sinyal.get('Tipe')} @ {sinyal.get('Entry')}")
-                    # Jika expired, mungkin kita tidak perlu menunggu lagi
-                    ada_sinyal_menunggu = False 
-                    continue
-                
-                hasil = evaluasi_sinyal(sinyal, data[0])
-                if hasil:
-                    print(f"🎯 Sinyal {hasil.upper()}: {sinyal.get('Tipe')} @ {sinyal.get('Entry')}")
-                    # Jika sudah ada hasil (TP/SL/Invalid), maka tidak perlu menunggu sinyal ini lagi
-                    ada_sinyal_menunggu = False
-                    continue
-        
-        last_processed_datetime = latest_candle_datetime
-        
-        # Gunakan penanda untuk membuat keputusan
-        if ada_sinyal_menunggu:
-            # Tampilkan status yang benar, apakah pending atau active
-            status_tunggu = sinyal_yang_ditunggu.get('Status', '').capitalize()
-            print(f"⏳ Menunggu sinyal selesai (Status: {status_tunggu}): {sinyal_yang_ditunggu['Tipe']} @ {sinyal_yang_ditunggu['Entry']}")
-        else:
-            print("🔍 Tidak ada sinyal yang perlu ditunggu. Mencoba generate sinyal baru...")
-            prompt = format_prompt(data, get_last_signals_for_prompt(signals, max_count=HISTORY_UNTUK_PROMPT))
-            sinyal_baru = get_signal_from_llm(prompt)
-
-            if sinyal_baru and "Entry" in sinyal_baru:
-                risk = abs(sinyal_baru["Entry"] - sinyal_baru["SL"])
-                reward = abs(sinyal_baru["TP"] - sinyal_baru["Entry"])
-                rr = reward / risk if risk > 0 else 0
-                if rr < MINIMUM_RR:
-                    print(f"❌ Sinyal ditolak karena RR < {MINIMUM_RR}:1 (RR: {rr:.2f})")
-                else:
-                    sinyal_baru["Probabilitas"] = float(sinyal_baru.get("Probabilitas", 0.0))
-                    sinyal_baru["Waktu"] = datetime.now(ZoneInfo("UTC")).isoformat()
-                    sinyal_baru["Status"] = "pending"; sinyal_baru["Hasil"] = None
-                    signals.append(sinyal_baru)
-                    print("\n📈 Signal Trading Baru Diterima:")
-                    print(json.dumps(sinyal_baru, indent=2))
-            else:
-                print("❌ Tidak ada sinyal valid dari LLM saat ini.")
-
-        save_signals(signals)
-        print("✅ Loop selesai. Tidur 60 detik...\n")
-        time.sleep(60)
+        with metrics.profile_iteration(f"{SYMBOL}-{INTERVAL}"), metrics.span("iterasi", symbol=SYMBOL, interval=INTERVAL):
+            data = scheduler.poll_new_bar(get_market_data)
+            if not data:
+                print("❗ Data pasar tidak tersedia. Menunggu candle berikutnya..."); continue
+
+            ringkasan = process_bar(state, data, datetime.now(ZoneInfo("UTC")))
+            if not ringkasan["diproses"]:
+                continue
+            save_state(state)
+            latency = None
+            if ringkasan["sinyal_baru"] is not None:
+                latency = scheduler.record_signal_latency()
+                if latency is not None:
+                    rata2 = scheduler.latency_summary()["avg"]
+                    print(f"⏱️ Latensi candle tutup -> sinyal: {latency:.1f} detik (rata-rata {rata2:.1f} detik)")
+            record_bar_metrics(state, ringkasan, latency)
+
+        print("✅ Loop selesai. Menunggu candle berikutnya...\n")
 
 if __name__ == "__main__":
     main_loop()
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""
+Backtest walk-forward untuk prompt / model LLM di atas candle historis dari candle store.
+
+Setiap bar diproses dengan process_bar() yang sama dengan bot live dan replay.py
+(expiry, evaluasi + drill-down intrabar, filter RR, cache keputusan, jurnal). Prompt dibuat
+oleh format_prompt() dari data point-in-time: candle sampai bar itu saja, konteks H1/Daily
+dari mesin indikator yang baru menerima candle sampai bar itu, dan histori sinyal backtest
+yang sudah selesai pada saat itu. Jam simulasi = waktu tutup bar + latensi.
+
+Prompt dikirim ke endpoint model lewat pool thread. Supaya pool terisi tanpa melanggar
+urutan waktu, prompt bar-bar berikutnya boleh dikirim lebih dulu (spekulatif) hanya saat
+tidak ada sinyal terbuka: selama itu histori tidak bisa berubah kecuali LLM membuka sinyal,
+jadi prompt bar j sudah pasti sama dengan yang akan dibuat loop saat tiba di bar j. Loop
+sendiri tetap berurutan dan hanya memakai respons yang prompt-nya identik (sha1) dengan
+prompt yang ia buat di bar tersebut; respons spekulatif yang tidak terpakai dibuang (tapi
+tetap direkam). Data dari bar yang lebih baru tidak pernah masuk ke prompt bar sebelumnya.
+
+Semua respons direkam ke `<output>/llm_<model>.jsonl` ({"prompt_sha1", "response"}, format
+yang sama dengan replay.RecordedLLM), jadi menjalankan ulang backtest yang sama tidak
+memanggil model sama sekali, dan rekamannya bisa diputar ulang dengan replay.py.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import candle_store
+import http_client
+import indicators
+import llm_client
+import replay
+import Signal_Trading_LLM as bot
+
+# --- KONFIGURASI ---
+BACKTEST_CANDLE_FILE = replay.REPLAY_CANDLE_FILE
+BACKTEST_OUTPUT_DIR = "backtest_output"
+BACKTEST_MODEL = bot.LLM_MODEL
+BACKTEST_LLM_URL = bot.LLM_API_URL
+BACKTEST_START = None  # "2025-06-01" (UTC) atau None = dari awal rekaman (setelah warmup)
+BACKTEST_END = None
+BACKTEST_WARMUP_BARS = replay.REPLAY_WARMUP_BARS
+BACKTEST_LATENCY_DETIK = replay.REPLAY_LATENCY_DETIK
+BACKTEST_PARALEL = 4  # Request LLM yang boleh berjalan bersamaan
+# Bar ke depan yang prompt-nya boleh dikirim lebih dulu (0 = satu per satu). Setiap kali LLM membuka
+# sinyal, prompt spekulatif yang sudah terkirim terbuang, jadi biaya tambahan <= nilai ini per sinyal.
+BACKTEST_SPEKULASI = BACKTEST_PARALEL
+BACKTEST_MAX_RETRY = 3
+BACKTEST_VERBOSE = False
+
+
+def recording_path(output_dir, model):
+    return os.path.join(output_dir, "llm_%s.jsonl" % re.sub(r"[^A-Za-z0-9._-]+", "_", model))
+
+def _sha1(prompt):
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+
+def request_signal_text(prompt, model=BACKTEST_MODEL, url=BACKTEST_LLM_URL, api_key=None, max_retry=BACKTEST_MAX_RETRY):
+    """Teks respons model (mode streaming seperti bot live), atau None jika semua percobaan gagal."""
+    for attempt in range(max_retry):
+        try:
+            _, teks = llm_client.stream_signal(prompt, api_key or bot.LLM_API_KEY, model=model, url=url)
+            return teks
+        except Exception as e:
+            print(f"⚠️  Request LLM percobaan {attempt + 1} gagal: {e}")
+            if attempt + 1 < max_retry:
+                time.sleep(http_client.backoff_delay(attempt))
+    return None
+
+
+class PooledLLM:
+    """
+    Pengganti get_signal untuk process_bar: respons dari rekaman jika prompt yang sama sudah
+    pernah dikirim, jika tidak dikirim lewat pool (`request_fn(prompt)` -> teks atau None).
+    """
+
+    def __init__(self, record_file, request_fn, max_workers=BACKTEST_PARALEL):
+        self.record_file = record_file
+        self.request_fn = request_fn
+        self.responses = replay.RecordedLLM(record_file).responses if os.path.exists(record_file) else {}
+        self.futures = {}  # sha1 -> Future (request yang sedang / akan berjalan)
+        self.sent = set()  # sha1 yang dikirim ke model di eksekusi ini
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backtest-llm")
+        self._lock = threading.Lock()
+        self.stats = Counter()  # dipakai, dari_rekaman, dikirim (tanpa yang dibatalkan), gagal, dibatalkan
+
+    def _request(self, sha, prompt):
+        teks = self.request_fn(prompt)
+        if teks is not None:
+            with self._lock:
+                self.responses[sha] = teks
+                with open(self.record_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"prompt_sha1": sha, "response": teks}, ensure_ascii=False) + "\n")
+        return teks
+
+    def submit(self, prompt):
+        """Mengirim prompt ke pool (jika belum ada di rekaman / belum dikirim). Mengembalikan sha1-nya."""
+        sha = _sha1(prompt)
+        with self._lock:
+            if sha not in self.responses and sha not in self.futures:
+                self.futures[sha] = self.executor.submit(self._request, sha, prompt)
+                self.sent.add(sha)
+                self.stats["dikirim"] += 1
+        return sha
+
+    def __call__(self, prompt):
+        sha = _sha1(prompt)
+        self.stats["dipakai"] += 1
+        with self._lock:
+            teks = self.responses.get(sha)
+        if teks is not None and sha not in self.futures:
+            self.stats["dari_rekaman"] += sha not in self.sent
+        else:
+            self.submit(prompt)
+            teks = self.futures[sha].result()
+            with self._lock:
+                self.futures.pop(sha, None)
+        if teks is None:
+            self.stats["gagal"] += 1
+            return None  # Sama dengan live: gagal menghubungi LLM, tidak di-cache
+        return replay._parse_response(teks)
+
+    def opens_signal(self, sha):
+        """True jika respons untuk prompt ini sudah diketahui dan berisi sinyal."""
+        with self._lock:
+            teks = self.responses.get(sha)
+        sinyal = replay._parse_response(teks) if teks is not None else None
+        return bool(sinyal) and "Entry" in sinyal
+
+    def cancel_pending(self):
+        """
+        Membatalkan request spekulatif yang belum mulai (mis. setelah sinyal baru terbuka);
+        yang sudah selesai dilepas, responsnya tetap ada di rekaman.
+        """
+        with self._lock:
+            for sha, future in list(self.futures.items()):
+                if future.cancel():
+                    del self.futures[sha]
+                    self.sent.discard(sha)
+                    self.stats["dikirim"] -= 1
+                    self.stats["dibatalkan"] += 1
+                elif future.done():
+                    del self.futures[sha]
+
+    def close(self):
+        self.cancel_pending()
+        self.executor.shutdown(wait=True)
+
+
+class PointInTimeContext:
+    """
+    Konteks pasar per bar dari satu IndicatorEngine yang boleh berjalan di depan loop
+    (untuk prompt spekulatif). Konteks bar i hanya berasal dari candle records[:i + 1].
+    """
+
+    def __init__(self, records, warmup_bars, interval=bot.INTERVAL):
+        self.records = records
+        self.warmup_bars = warmup_bars
+        self.engine = indicators.IndicatorEngine(interval, session=bot.SESI_DAILY)
+        self.pos = 0  # Candle berikutnya yang belum diterapkan ke engine
+        self.konteks = {}
+
+    def at(self, i):
+        while self.pos <= i:
+            r = self.records[self.pos]
+            self.engine.update(r["ts"], r["open"], r["high"], r["low"], r["close"])
+            if self.pos >= self.warmup_bars:
+                self.konteks[self.pos] = bot.market_context_from_engine(self.engine)
+            self.pos += 1
+        return self.records[:i + 1], self.konteks[i]
+
+    def drop_before(self, i):
+        for j in [j for j in self.konteks if j < i]:
+            del self.konteks[j]
+
+
+def _speculate(state, llm, konteks, i, spekulasi, terkirim):
+    # Hanya saat tidak ada sinyal terbuka: histori tetap sampai LLM membuka sinyal baru
+    if spekulasi <= 0 or state.book.open_signals():
+        return
+    history = tuple(map(tuple, state.book.recent_resolved_keys()))
+    signals_lama = state.book.recent_resolved()
+    for j in range(i, min(i + spekulasi + 1, len(konteks.records))):
+        if terkirim.get(j, (None,))[0] != history:
+            market_context = konteks.at(j)
+            data = candle_store.records_to_values(konteks.records[j:j + 1])
+            terkirim[j] = (history, llm.submit(bot.format_prompt(data, signals_lama, market_context, state.symbol, state.interval)))
+        if llm.opens_signal(terkirim[j][1]):
+            break  # Bar setelahnya tidak akan di-prompt dengan histori ini
+
+
+def run_backtest(candle_file=BACKTEST_CANDLE_FILE, model=BACKTEST_MODEL, url=BACKTEST_LLM_URL, api_key=None,
+                 output_dir=BACKTEST_OUTPUT_DIR, start_ts=None, end_ts=None, warmup_bars=BACKTEST_WARMUP_BARS,
+                 paralel=BACKTEST_PARALEL, spekulasi=BACKTEST_SPEKULASI, latency=BACKTEST_LATENCY_DETIK,
+                 request_fn=None, verbose=BACKTEST_VERBOSE):
+    """Menjalankan backtest dan mengembalikan dict ringkasan (juga ditulis ke backtest_summary.json)."""
+    records, warmup_bars = replay.load_records(candle_file, start_ts, end_ts, warmup_bars)
+    clock = replay.ReplayClock()
+    state = replay.build_state(output_dir, clock)
+    record_file = recording_path(output_dir, model)
+    request_fn = request_fn or (lambda prompt: request_signal_text(prompt, model, url, api_key))
+    llm = PooledLLM(record_file, request_fn, max_workers=paralel)
+    konteks = PointInTimeContext(records, warmup_bars)
+    step = candle_store.interval_seconds(bot.INTERVAL)
+
+    hasil = Counter()
+    sinyal_baru = llm_dipanggil = diproses = 0
+    terkirim = {}  # bar -> (histori, sha1 prompt) saat prompt spekulatifnya dikirim
+    mulai = time.perf_counter()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            for i in range(warmup_bars, len(records)):
+                _speculate(state, llm, konteks, i, spekulasi, terkirim)
+                clock.ts = float(records["ts"][i]) + step + latency
+                market_context = konteks.at(i)
+                data = candle_store.records_to_values(records[i:i + 1])
+                ringkasan = bot.process_bar(state, data, clock.now_utc(), market_context=market_context, get_signal=llm)
+                konteks.drop_before(i + 1)
+                terkirim.pop(i, None)
+                diproses += ringkasan["diproses"]
+                llm_dipanggil += ringkasan["llm_dipanggil"]
+                hasil.update(h for _, h in ringkasan["hasil"])
+                if ringkasan["sinyal_baru"] is not None:
+                    sinyal_baru += 1
+                    llm.cancel_pending()
+                    terkirim.clear()
+    finally:
+        llm.close()
+    durasi = time.perf_counter() - mulai
+    state.stats.save()
+
+    laporan = {
+        "candle_file": candle_file,
+        "model": model,
+        "bar": diproses,
+        "dari": candle_store.format_datetime(records["ts"][warmup_bars]) if diproses else None,
+        "sampai": candle_store.format_datetime(records["ts"][-1]) if diproses else None,
+        "durasi_detik": round(durasi, 3),
+        "llm_dipanggil": llm_dipanggil,
+        "llm": {
+            "dari_rekaman": llm.stats["dari_rekaman"],
+            "dikirim": llm.stats["dikirim"],
+            "spekulatif_tidak_terpakai": llm.stats["dikirim"] - (llm.stats["dipakai"] - llm.stats["dari_rekaman"]),
+            "dibatalkan": llm.stats["dibatalkan"],
+            "gagal": llm.stats["gagal"],
+        },
+        "cache": state.decision_cache.stats(),
+        "sinyal_baru": sinyal_baru,
+        "masih_terbuka": len(state.book.open_signals()),
+        "hasil": dict(hasil),
+        "journal_file": state.journal_file,
+        "record_file": record_file,
+        "ringkasan": state.stats.summary(),
+    }
+    with open(os.path.join(output_dir, "backtest_summary.json"), "w") as f:
+        json.dump(laporan, f, indent=2)
+    return laporan
+
+
+if __name__ == "__main__":
+    laporan = run_backtest(start_ts=candle_store.parse_datetime(BACKTEST_START) if BACKTEST_START else None,
+                           end_ts=candle_store.parse_datetime(BACKTEST_END) if BACKTEST_END else None)
+    r = laporan["ringkasan"]
+    print("\n===================== BACKTEST =====================")
+    print(f"🎞️ {laporan['bar']} bar ({laporan['dari']} -> {laporan['sampai']}) dalam {laporan['durasi_detik']} detik | model {laporan['model']}")
+    print(f"🧠 Prompt {laporan['llm_dipanggil']}x | dari rekaman {laporan['llm']['dari_rekaman']} | dikirim {laporan['llm']['dikirim']} "
+          f"(spekulatif tidak terpakai {laporan['llm']['spekulatif_tidak_terpakai']}) | gagal {laporan['llm']['gagal']}")
+    print(f"📈 Sinyal {laporan['sinyal_baru']} | hasil {laporan['hasil']} | win rate {r['win_rate']:.1f}% | PnL {r['total_pnl']:.2f}")
+    print(f"💾 Jurnal: {laporan['journal_file']} | rekaman LLM: {laporan['record_file']}")
+    print("====================================================\n")
@@ -0,0 +1,130 @@
+"""
+Evaluator sinyal versi batch (NumPy) untuk re-evaluasi histori.
+
+Hasilnya identik dengan state machine `evaluasi_sinyal` yang dijalankan candle per
+candle, tetapi ribuan sinyal dievaluasi sekaligus:
+
+- pending: jika TP tersentuh -> invalid (dicek duluan); jika entry tersentuh -> active
+  dan pada candle yang sama langsung dicek SL lalu TP.
+- active : SL dicek duluan, lalu TP.
+
+Jadi untuk tiap sinyal cukup dicari indeks sentuhan pertama (first-touch) untuk TP,
+entry dan SL di dalam jendela candle-nya.
+"""
+import numpy as np
+
+# Kode status internal
+PENDING, ACTIVE, INVALID, SL, TP = 0, 1, 2, 3, 4
+
+STATUS_NAMA = np.array(["pending", "active", "invalid", "SL", "TP"], dtype=object)
+HASIL_NAMA = np.array([None, None, "invalid_tp_hit_first", "SL", "TP"], dtype=object)
+
+NO_TS = -1  # Penanda "tidak ada" untuk fill_ts / exit_ts
+
+
+def _first_true(mask):
+    # Indeks kolom True pertama per baris, atau lebar mask jika tidak ada
+    hit = mask.any(axis=1)
+    return np.where(hit, mask.argmax(axis=1), mask.shape[1])
+
+
+def evaluate_batch(candles, tipe, entry, sl, tp, start_ts, end_ts=None, active=None, block=256):
+    """
+    Evaluasi banyak sinyal terhadap satu deret candle (array CANDLE_DTYPE terurut naik).
+
+    Setiap sinyal hanya melihat candle dengan start_ts <= ts <= end_ts (end_ts None = sampai
+    candle terakhir). `active` opsional menandai sinyal yang sudah terisi sebelum jendela.
+    Candle diproses per blok kolom sebesar `block`; sinyal yang sudah selesai tidak ikut
+    diproses di blok berikutnya.
+
+    Mengembalikan dict berisi array: 'status' (kode), 'fill_ts', 'exit_ts' (NO_TS jika tidak ada),
+    serta 'Status' dan 'Hasil' dalam bentuk string seperti di file JSON.
+    """
+    ts = np.asarray(candles["ts"])
+    high = np.asarray(candles["high"], dtype=np.float64)
+    low = np.asarray(candles["low"], dtype=np.float64)
+
+    tipe = np.asarray(tipe)
+    n = len(tipe)
+    is_buy = tipe == "BUY LIMIT"
+    is_sell = tipe == "SELL LIMIT"
+    entry = np.asarray(entry, dtype=np.float64)
+    sl = np.asarray(sl, dtype=np.float64)
+    tp = np.asarray(tp, dtype=np.float64)
+
+    lo = np.searchsorted(ts, np.asarray(start_ts), side="left")
+    if end_ts is None:
+        hi = np.full(n, len(ts))
+    else:
+        hi = np.searchsorted(ts, np.asarray(end_ts), side="right")
+    length = np.maximum(hi - lo, 0)
+
+    status = np.full(n, PENDING, dtype=np.int8)
+    if active is not None:
+        status[np.asarray(active, dtype=bool)] = ACTIVE
+    fill_idx = np.full(n, -1, dtype=np.int64)
+    exit_idx = np.full(n, -1, dtype=np.int64)
+
+    offset = 0
+    cols = np.arange(block)
+    while True:
+        rows = np.flatnonzero((status <= ACTIVE) & (length > offset))
+        if len(rows) == 0:
+            break
+
+        pos = lo[rows, None] + offset + cols
+        valid = cols < (length[rows, None] - offset)
+        pos = np.minimum(pos, len(ts) - 1)
+        h = high[pos]; l = low[pos]
+        buy = is_buy[rows, None]; sell = is_sell[rows, None]
+
+        tp_touch = valid & ((buy & (h >= tp[rows, None])) | (sell & (l <= tp[rows, None])))
+        fill_touch = valid & ((buy & (l <= entry[rows, None])) | (sell & (h >= entry[rows, None])))
+        sl_touch = valid & ((buy & (l <= sl[rows, None])) | (sell & (h >= sl[rows, None])))
+
+        pending = status[rows] == PENDING
+        first_tp = _first_true(tp_touch)
+        first_fill = _first_true(fill_touch)
+
+        # Pending: TP tersentuh sebelum (atau bersamaan dengan) entry -> invalid
+        invalid = pending & (first_tp < block) & (first_tp <= first_fill)
+        filled = pending & ~invalid & (first_fill < block)
+
+        # Kolom mulai posisi aktif: 0 untuk yang sudah aktif, kolom fill untuk yang baru terisi
+        act_from = np.where(pending, np.where(filled, first_fill, block), 0)
+        aktif_mask = cols >= act_from[:, None]
+        first_sl = _first_true(sl_touch & aktif_mask)
+        first_tp_aktif = _first_true(tp_touch & aktif_mask)
+
+        kena_sl = (act_from < block) & (first_sl < block) & (first_sl <= first_tp_aktif)
+        kena_tp = (act_from < block) & ~kena_sl & (first_tp_aktif < block)
+
+        r = rows[invalid]
+        status[r] = INVALID; exit_idx[r] = lo[r] + offset + first_tp[invalid]
+        r = rows[filled]
+        status[r] = ACTIVE; fill_idx[r] = lo[r] + offset + first_fill[filled]
+        r = rows[kena_sl]
+        status[r] = SL; exit_idx[r] = lo[r] + offset + first_sl[kena_sl]
+        r = rows[kena_tp]
+        status[r] = TP; exit_idx[r] = lo[r] + offset + first_tp_aktif[kena_tp]
+
+        offset += block
+
+    fill_ts = np.where(fill_idx >= 0, ts[np.maximum(fill_idx, 0)] if len(ts) else NO_TS, NO_TS)
+    exit_ts = np.where(exit_idx >= 0, ts[np.maximum(exit_idx, 0)] if len(ts) else NO_TS, NO_TS)
+    return {
+        "status": status,
+        "fill_ts": fill_ts,
+        "exit_ts": exit_ts,
+        "Status": STATUS_NAMA[status],
+        "Hasil": HASIL_NAMA[status],
+    }
+
+
+def signals_to_arrays(signals):
+    """Mengubah list dict sinyal (format JSON) menjadi array untuk evaluate_batch."""
+    tipe = np.array([s.get("Tipe", "") for s in signals], dtype=object)
+    entry = np.array([float(s["Entry"]) for s in signals], dtype=np.float64)
+    sl = np.array([float(s["SL"]) for s in signals], dtype=np.float64)
+    tp = np.array([float(s["TP"]) for s in signals], dtype=np.float64)
+    return tipe, entry, sl, tp
@@ -0,0 +1,286 @@
+"""
+Benchmark offline untuk pipeline bot, tanpa jaringan.
+
+Data pasar dari synthetic.generate_ohlc (rezim trend/range/volatile), API TwelveData dan
+LLM diganti server lokal dari stub_servers.py (latensi & tingkat error bisa diatur).
+Semua file (candle store, jurnal, limiter) ditulis di folder sementara.
+
+Bagian:
+- loop      : per iterasi main loop: get_market_data, susun prompt, LLM (stream + parse),
+              evaluasi_sinyal, simpan sinyal (event jurnal)
+- histori   : throughput re-evaluasi histori (batch_eval vs evaluasi_sinyal per candle)
+- dashboard : waktu muat dashboard untuk 1k / 100k / 1M sinyal (histori penuh vs agregat)
+
+Hasil ditulis sebagai JSON ke BENCH_OUTPUT_FILE supaya regresi bisa dilacak antar commit.
+Contoh: `python benchmark.py` (semua) atau `python benchmark.py loop histori`.
+"""
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import batch_eval
+import candle_store
+import dashboard_data
+import http_client
+import llm_client
+import rate_limiter
+import signal_journal
+import signal_stats
+import stub_servers
+import synthetic
+import Signal_Trading_LLM as bot
+
+# --- KONFIGURASI ---
+BENCH_OUTPUT_FILE = "bench_results.json"
+BENCH_SEED = 42
+BENCH_ULANG = 5  # Pengulangan per pengukuran (dashboard 1M hanya sekali)
+
+BENCH_LOOP_ITERASI = 50
+BENCH_LOOP_WARMUP_BARS = 2000  # Candle yang sudah ada di store sebelum loop pertama
+BENCH_API_LATENSI = 0.0  # Detik per request stub TwelveData
+BENCH_API_ERROR_RATE = 0.0
+BENCH_LLM_LATENSI = 0.0  # Detik sebelum stub LLM mulai menjawab
+BENCH_LLM_CHUNK_DELAY = 0.0  # Detik per potongan SSE
+BENCH_LLM_ERROR_RATE = 0.0
+
+BENCH_HISTORI_CANDLE = 35_040  # ~1 tahun candle 15min
+BENCH_HISTORI_SINYAL = [1_000, 10_000, 100_000]
+BENCH_HISTORI_SKALAR_MAKS = 1_000  # Sinyal untuk pembanding evaluasi per candle (lambat)
+
+BENCH_DASHBOARD_SINYAL = [1_000, 100_000, 1_000_000]
+
+RESPON_LLM = ('{"Tipe": "BUY LIMIT", "Entry": %.2f, "SL": %.2f, "TP": %.2f, "Probabilitas": 0.7, '
+              '"Alasan": "Benchmark: pullback ke support H1."}\nPenjelasan tambahan dari model yang tidak dibaca...')
+
+
+# --- BANTUAN ---
+
+def ringkas(durasi):
+    """Statistik (ms) dari list durasi dalam detik."""
+    ms = sorted(d * 1000 for d in durasi)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))], 4),
+        "min_ms": round(ms[0], 4),
+        "max_ms": round(ms[-1], 4),
+    }
+
+def ukur(fn, *args, **kwargs):
+    """(hasil, durasi detik) satu panggilan."""
+    mulai = time.perf_counter()
+    hasil = fn(*args, **kwargs)
+    return hasil, time.perf_counter() - mulai
+
+@contextlib.contextmanager
+def folder_kerja():
+    # Semua path relatif (candles/, jurnal, limiter) diarahkan ke folder sementara
+    asal = os.getcwd()
+    limiter_asal = rate_limiter._default
+    with tempfile.TemporaryDirectory(prefix="bench-") as folder:
+        os.chdir(folder)
+        # Kredit tanpa batas: yang diukur pipeline, bukan token bucket
+        rate_limiter._default = rate_limiter.TokenBucket(os.path.join(folder, "credits.json"), capacity=1e9, refill_per_sec=1e9)
+        try:
+            yield folder
+        finally:
+            rate_limiter._default = limiter_asal
+            os.chdir(asal)
+
+def diam():
+    return contextlib.redirect_stdout(io.StringIO())
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# --- LOOP ---
+
+def bench_loop(iterasi=BENCH_LOOP_ITERASI, warmup_bars=BENCH_LOOP_WARMUP_BARS, seed=BENCH_SEED):
+    # Candle terakhir = candle yang baru tutup sekarang, supaya sync_candles cukup satu request per bar
+    step = candle_store.interval_seconds(bot.INTERVAL)
+    akhir = int(time.time()) // step * step - step
+    candles, _ = synthetic.generate_ohlc(warmup_bars + iterasi, bot.INTERVAL, start_ts=akhir - (warmup_bars + iterasi - 1) * step, seed=seed)
+    api, api_url = stub_servers.start_time_series_server(
+        {bot.SYMBOL: {bot.INTERVAL: candles}}, latency=BENCH_API_LATENSI, error_rate=BENCH_API_ERROR_RATE,
+        now_ts=int(candles["ts"][warmup_bars - 1]))
+    close = float(candles["close"][-1])
+    chat, chat_url = stub_servers.start_chat_server(
+        [RESPON_LLM % (close * 0.998, close * 0.994, close * 1.01)], latency=BENCH_LLM_LATENSI,
+        chunk_delay=BENCH_LLM_CHUNK_DELAY, error_rate=BENCH_LLM_ERROR_RATE)
+    url_asal = http_client.TWELVE_DATA_URL
+    http_client.TWELVE_DATA_URL = api_url
+    tahap = {k: [] for k in ("get_market_data", "prompt", "llm", "evaluasi_sinyal", "save_signal", "total")}
+    gagal = {"market_data": 0, "llm": 0}
+    try:
+        with folder_kerja():
+            bot._indicator_engines.clear()  # Mesin indikator dibangun dari store di folder sementara
+            candle_store.write_candles(bot.SYMBOL, bot.INTERVAL, candles[:warmup_bars - 1])
+            histori = synthetic.generate_signals(candles[:warmup_bars], bot.HISTORY_UNTUK_PROMPT, seed=seed)
+            for i in range(iterasi):
+                api.cfg["now_ts"] = int(candles["ts"][warmup_bars - 1 + i])
+                with diam():
+                    data, t_data = ukur(bot.get_market_data)
+                    if not data:
+                        gagal["market_data"] += 1
+                        continue
+                    prompt, t_prompt = ukur(bot.format_prompt, data, histori)
+                try:
+                    (sinyal, _), t_llm = ukur(llm_client.stream_signal, prompt, "dummy", url=chat_url)
+                except Exception:
+                    gagal["llm"] += 1
+                    continue
+                if sinyal is None:
+                    gagal["llm"] += 1
+                    continue
+                # Sinyal baru dievaluasi terhadap candle terbaru seperti sinyal terbuka di loop berikutnya
+                sinyal = dict(sinyal, Status="pending", Hasil=None, Waktu=datetime.now(timezone.utc).isoformat())
+                mulai = time.perf_counter()
+                for _ in range(100):
+                    bot.evaluasi_sinyal(dict(sinyal), data[0])
+                t_eval = (time.perf_counter() - mulai) / 100
+                _, t_save = ukur(bot.save_signal_event, i, sinyal, baru=True)
+                for k, t in zip(tahap, (t_data, t_prompt, t_llm, t_eval, t_save, t_data + t_prompt + t_llm + t_eval + t_save)):
+                    tahap[k].append(t)
+    finally:
+        http_client.TWELVE_DATA_URL = url_asal
+        api.shutdown()
+        chat.shutdown()
+    hasil = {k: ringkas(v) for k, v in tahap.items() if v}
+    hasil["gagal"] = gagal
+    hasil["request_api"] = len(api.requests)
+    hasil["request_llm"] = len(chat.requests)
+    return hasil
+
+
+# --- HISTORI ---
+
+def _evaluasi_skalar(signals, candles, start_ts, end_ts):
+    # Cara lama: evaluasi_sinyal candle per candle untuk tiap sinyal
+    dict_candles = [{"open": o, "high": h, "low": l, "close": c} for _, o, h, l, c in candles.tolist()]
+    lo = np.searchsorted(candles["ts"], start_ts)
+    hi = np.searchsorted(candles["ts"], end_ts, side="right")
+    for s, a, b in zip(signals, lo, hi):
+        s = dict(s)
+        for c in dict_candles[a:b]:
+            if bot.evaluasi_sinyal(s, c):
+                break
+
+def bench_histori(jumlah=BENCH_HISTORI_SINYAL, n_candle=BENCH_HISTORI_CANDLE, seed=BENCH_SEED):
+    candles, _ = synthetic.generate_ohlc(n_candle, bot.INTERVAL, seed=seed)
+    hasil = {"candle": n_candle}
+    for n in jumlah:
+        signals = synthetic.generate_signals(candles, n, seed=seed, hasil=False)
+        tipe, entry, sl, tp = batch_eval.signals_to_arrays(signals)
+        start_ts = np.array([candle_store.parse_datetime(s["Waktu"]) for s in signals])
+        end_ts = start_ts + 86400
+        durasi = [ukur(batch_eval.evaluate_batch, candles, tipe, entry, sl, tp, start_ts, end_ts)[1] for _ in range(BENCH_ULANG)]
+        item = {"batch": ringkas(durasi), "batch_sinyal_per_detik": round(n / min(durasi))}
+        m = min(n, BENCH_HISTORI_SKALAR_MAKS)
+        _, t = ukur(_evaluasi_skalar, signals[:m], candles, start_ts[:m], end_ts[:m])
+        item["skalar_sinyal_per_detik"] = round(m / t)
+        hasil[str(n)] = item
+    return hasil
+
+
+# --- DASHBOARD ---
+
+def bench_dashboard(jumlah=BENCH_DASHBOARD_SINYAL, seed=BENCH_SEED):
+    candles, _ = synthetic.generate_ohlc(20_000, bot.INTERVAL, seed=seed)
+    hasil = {}
+    for n in jumlah:
+        ulang = BENCH_ULANG if n <= 100_000 else 1
+        with folder_kerja():
+            signals = synthetic.generate_signals(candles, n, seed=seed)
+            with open(signal_journal.SNAPSHOT_FILE, "w") as f:
+                json.dump(signals, f)
+            item = {"file_mb": round(os.path.getsize(signal_journal.SNAPSHOT_FILE) / 2**20, 2)}
+            waktu = {k: [] for k in ("load_signals", "get_data_dingin", "get_data_hangat", "agregat_rebuild",
+                                     "get_summary_dingin", "get_summary_hangat", "get_trades")}
+            for _ in range(ulang):
+                waktu["load_signals"].append(ukur(signal_journal.load_signals)[1])
+                dashboard_data._cache.clear()
+                waktu["get_data_dingin"].append(ukur(dashboard_data.get_data)[1])
+                waktu["get_data_hangat"].append(ukur(dashboard_data.get_data)[1])
+                stats = signal_stats.SignalStats()
+                waktu["agregat_rebuild"].append(ukur(lambda: (stats.rebuild(signals), stats.save()))[1])
+                dashboard_data._cache.clear()
+                waktu["get_summary_dingin"].append(ukur(dashboard_data.get_summary)[1])
+                waktu["get_summary_hangat"].append(ukur(dashboard_data.get_summary)[1])
+                waktu["get_trades"].append(ukur(dashboard_data.get_trades)[1])
+            item.update({k: ringkas(v) for k, v in waktu.items()})
+            item["agregat_kb"] = round(os.path.getsize(signal_stats.AGGREGATES_FILE) / 1024, 1)
+            dashboard_data._cache.clear()
+            del signals
+            gc.collect()
+        hasil[str(n)] = item
+    return hasil
+
+
+BAGIAN = {"loop": bench_loop, "histori": bench_histori, "dashboard": bench_dashboard}
+
+
+def run_benchmarks(bagian=tuple(BAGIAN)):
+    hasil = {
+        "meta": {
+            "waktu": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "seed": BENCH_SEED,
+            "ulang": BENCH_ULANG,
+            "stub": {"api_latensi": BENCH_API_LATENSI, "api_error_rate": BENCH_API_ERROR_RATE,
+                     "llm_latensi": BENCH_LLM_LATENSI, "llm_chunk_delay": BENCH_LLM_CHUNK_DELAY,
+                     "llm_error_rate": BENCH_LLM_ERROR_RATE},
+        }
+    }
+    for nama in bagian:
+        print(f"⏱️ Benchmark {nama}...")
+        mulai = time.perf_counter()
+        hasil[nama] = BAGIAN[nama]()
+        print(f"   ✅ selesai dalam {time.perf_counter() - mulai:.1f} detik")
+    return hasil
+
+
+def main():
+    bagian = [a for a in sys.argv[1:] if a in BAGIAN] or list(BAGIAN)
+    hasil = run_benchmarks(bagian)
+    with open(BENCH_OUTPUT_FILE, "w") as f:
+        json.dump(hasil, f, indent=2)
+
+    if "loop" in hasil:
+        print("\n🔁 Per iterasi loop (median ms): " + ", ".join(
+            f"{k} {v['median_ms']:.3f}" for k, v in hasil["loop"].items() if isinstance(v, dict) and "median_ms" in v))
+    if "histori" in hasil:
+        for n, v in hasil["histori"].items():
+            if isinstance(v, dict):
+                print(f"📚 Re-evaluasi {n} sinyal: batch {v['batch_sinyal_per_detik']:,} sinyal/detik, "
+                      f"per candle {v['skalar_sinyal_per_detik']:,} sinyal/detik")
+    if "dashboard" in hasil:
+        for n, v in hasil["dashboard"].items():
+            print(f"📊 Dashboard {int(n):,} sinyal ({v['file_mb']} MB): histori penuh {v['get_data_dingin']['median_ms']:.0f} ms, "
+                  f"agregat {v['get_summary_dingin']['median_ms']:.1f} ms, cache {v['get_summary_hangat']['median_ms']:.3f} ms")
+    print(f"\n💾 Hasil benchmark disimpan di: {BENCH_OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Penyimpanan candle OHLC lokal per simbol & interval.
+
+Setiap dataset disimpan sebagai record biner lebar tetap (timestamp epoch UTC
+int64 + open/high/low/close float64), terurut naik. Format ini ringkas, bisa
+di-append tanpa menulis ulang file, dan bisa langsung di-memory-map dengan numpy.
+Rentang waktu yang sudah pernah diambil dicatat di file sidecar `.ranges.json`
+supaya pemanggil tahu kapan data cukup dilayani dari disk.
+"""
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+# --- KONFIGURASI ---
+CANDLE_DIR = "candles"
+MAX_OUTPUTSIZE = 5000  # Batas outputsize per request TwelveData
+
+CANDLE_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+])
+
+INTERVAL_DETIK = {
+    "1min": 60, "5min": 300, "15min": 900, "30min": 1800, "45min": 2700,
+    "1h": 3600, "2h": 7200, "4h": 14400, "1day": 86400,
+}
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# --- KONVERSI ---
+
+def interval_seconds(interval):
+    try:
+        return INTERVAL_DETIK[interval]
+    except KeyError:
+        raise ValueError(f"Interval tidak dikenal: {interval}")
+
+def parse_datetime(text):
+    # TwelveData (dengan timezone=UTC) mengirim "YYYY-MM-DD HH:MM:SS" atau "YYYY-MM-DD"
+    dt = datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+def format_datetime(ts):
+    return datetime.fromtimestamp(int(ts), tz=timezone.utc).strftime(DATETIME_FORMAT)
+
+def last_closed_ts(interval, now_ts=None):
+    """Timestamp (waktu buka) candle terakhir yang sudah tutup pada `now_ts` (default: sekarang)."""
+    step = interval_seconds(interval)
+    if now_ts is None:
+        now_ts = datetime.now(timezone.utc).timestamp()
+    return int(now_ts) // step * step - step
+
+def values_to_records(values):
+    # Mengubah list 'values' TwelveData (terbaru dulu, field string) menjadi array terurut naik
+    records = np.empty(len(values), dtype=CANDLE_DTYPE)
+    for i, v in enumerate(reversed(values)):
+        records[i] = (parse_datetime(v["datetime"]), float(v["open"]), float(v["high"]), float(v["low"]), float(v["close"]))
+    order = np.argsort(records["ts"], kind="stable")
+    return records[order]
+
+def records_to_values(records):
+    # Kebalikan dari values_to_records: format yang sama dengan respons API (terbaru dulu)
+    return [
+        {
+            "datetime": format_datetime(r["ts"]),
+            "open": f"{r['open']:.5f}",
+            "high": f"{r['high']:.5f}",
+            "low": f"{r['low']:.5f}",
+            "close": f"{r['close']:.5f}",
+        }
+        for r in records[::-1]
+    ]
+
+
+# --- FILE ---
+
+def candle_path(symbol, interval):
+    nama = re.sub(r"[^A-Za-z0-9]+", "-", symbol).strip("-")
+    return os.path.join(CANDLE_DIR, f"{nama}_{interval}.bin")
+
+def _ranges_path(symbol, interval):
+    return candle_path(symbol, interval)[:-len(".bin")] + ".ranges.json"
+
+def load_candles(symbol, interval, mmap=True):
+    """Memuat seluruh candle (terurut naik). Default-nya di-memory-map, read-only."""
+    path = candle_path(symbol, interval)
+    if not os.path.exists(path) or os.path.getsize(path) < CANDLE_DTYPE.itemsize:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    count = os.path.getsize(path) // CANDLE_DTYPE.itemsize
+    if mmap:
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(count,))
+    return np.fromfile(path, dtype=CANDLE_DTYPE, count=count)
+
+def load_range(symbol, interval, start_ts, end_ts):
+    """Candle dengan start_ts <= ts <= end_ts (inklusif), salinan di memori."""
+    data = load_candles(symbol, interval)
+    lo = np.searchsorted(data["ts"], start_ts, side="left")
+    hi = np.searchsorted(data["ts"], end_ts, side="right")
+    return np.array(data[lo:hi])
+
+def slice_until(records, ts):
+    """Bagian `records` dengan timestamp <= ts (tanpa menyalin)."""
+    return records[:int(np.searchsorted(records["ts"], ts, side="right"))]
+
+def load_ranges(symbol, interval):
+    try:
+        with open(_ranges_path(symbol, interval), "r") as f:
+            return [tuple(r) for r in json.load(f)]
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+def _save_ranges(symbol, interval, ranges):
+    path = _ranges_path(symbol, interval)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump([list(r) for r in ranges], f)
+    os.replace(tmp, path)
+
+def _merge_ranges(ranges, step):
+    # Gabungkan rentang yang tumpang tindih atau bersebelahan (selisih <= satu bar)
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + step:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def is_covered(symbol, interval, start_ts, end_ts):
+    """True jika rentang [start_ts, end_ts] seluruhnya sudah pernah diambil ke disk."""
+    for start, end in load_ranges(symbol, interval):
+        if start <= start_ts and end_ts <= end:
+            return True
+    return False
+
+def _subtract_ranges(ranges, covered, step):
+    # Bagian dari `ranges` yang belum tercakup `covered` (keduanya inklusif, terurut)
+    sisa = []
+    for start, end in ranges:
+        for c_start, c_end in covered:
+            if c_end < start or c_start > end:
+                continue
+            if c_start > start:
+                sisa.append((start, c_start - step))
+            start = c_end + step
+            if start > end:
+                break
+        if start <= end:
+            sisa.append((start, end))
+    return sisa
+
+def plan_fetch_ranges(symbol, interval, windows, max_bars=MAX_OUTPUTSIZE):
+    """
+    Rencana request minimum untuk mencakup semua `windows` [(start_ts, end_ts), ...].
+    Jendela digabung, bagian yang sudah ada di disk dibuang, lalu sisanya dikemas
+    secara greedy ke rentang yang masing-masing paling banyak `max_bars` bar.
+    Rentang yang sudah tercakup boleh ikut terambil ulang jika itu menghemat request.
+    """
+    step = interval_seconds(interval)
+    span = (max_bars - 1) * step
+    perlu = _subtract_ranges(_merge_ranges(windows, step), _merge_ranges(load_ranges(symbol, interval), step), step)
+
+    plan = []
+    for start, end in perlu:
+        if plan and end <= plan[-1][0] + span:
+            plan[-1] = (plan[-1][0], end)
+            continue
+        if plan and start <= plan[-1][0] + span:
+            # Sebagian muat di rentang sebelumnya, sisanya lanjut di rentang baru
+            plan[-1] = (plan[-1][0], plan[-1][0] + span)
+            start = plan[-1][1] + step
+        while end - start > span:
+            plan.append((start, start + span))
+            start += span + step
+        plan.append((start, end))
+    return plan
+
+def write_candles(symbol, interval, records, covered=None, now_ts=None):
+    """
+    Menulis candle ke store. Jika data baru berada di ekor (kasus normal sinkronisasi),
+    file hanya ditimpa mulai dari candle pertama yang tumpang tindih lalu di-append;
+    candle terakhir yang masih berjalan ikut diperbarui. Posisinya dicari lewat memmap,
+    jadi histori tidak dibaca seluruhnya. Selain itu data digabung dan
+    file ditulis ulang secara atomik. `covered` = rentang (start_ts, end_ts) yang diminta;
+    yang dicatat di `.ranges.json` dipotong sampai candle terakhir yang sudah tutup pada `now_ts`.
+    """
+    step = interval_seconds(interval)
+    if len(records):
+        records = np.asarray(records, dtype=CANDLE_DTYPE)
+        path = candle_path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Memmap: hanya halaman yang disentuh (ujung file & binary search) yang dibaca dari disk
+        existing = load_candles(symbol, interval)
+
+        di_ekor = len(existing) == 0 or (
+            existing["ts"][0] <= records["ts"][0] <= existing["ts"][-1] + step and records["ts"][-1] >= existing["ts"][-1]
+        )
+        if di_ekor:
+            pos = int(np.searchsorted(existing["ts"], records["ts"][0], side="left")) if len(existing) else 0
+            del existing  # Memmap dilepas sebelum file dipotong
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(pos * CANDLE_DTYPE.itemsize)
+                records.tofile(f)
+                f.truncate()
+        else:
+            gabungan = np.concatenate([records, existing])
+            del existing
+            # np.unique mengambil kemunculan pertama -> data baru menang atas data lama
+            _, idx = np.unique(gabungan["ts"], return_index=True)
+            gabungan = gabungan[idx]
+            tmp = path + ".tmp"
+            gabungan.tofile(tmp)
+            os.replace(tmp, path)
+
+        if covered is None:
+            covered = (int(records["ts"][0]), int(records["ts"][-1]))
+
+    if covered is not None:
+        # Candle yang masih terbentuk belum final, jadi tidak boleh dianggap sudah diambil
+        covered = (int(covered[0]), min(int(covered[1]), last_closed_ts(interval, now_ts)))
+        if covered[1] >= covered[0]:
+            ranges = _merge_ranges(load_ranges(symbol, interval) + [covered], step)
+            _save_ranges(symbol, interval, ranges)
+
+
+# --- SINKRONISASI ---
+
+def sync_candles(symbol, interval, fetch_values, warmup, now_ts=None):
+    """
+    Sinkronisasi inkremental dari API. `fetch_values(params)` harus mengembalikan list
+    'values' TwelveData (atau None jika gagal). Jika store masih kosong, diambil `warmup`
+    candle terakhir; jika tidak, hanya candle sejak timestamp terakhir yang tersimpan
+    (candle terakhir ikut diminta ulang karena mungkin belum close).
+    Mengembalikan jumlah candle yang ditulis, atau None jika request gagal.
+    """
+    step = interval_seconds(interval)
+    existing = load_candles(symbol, interval)
+    if now_ts is None:
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+
+    if len(existing) == 0:
+        values = fetch_values({"symbol": symbol, "interval": interval, "outputsize": min(warmup, MAX_OUTPUTSIZE), "timezone": "UTC"})
+        if not values:
+            return None
+        records = values_to_records(values)
+        write_candles(symbol, interval, records, now_ts=now_ts)
+        return len(records)
+
+    start_ts = int(existing["ts"][-1])
+    del existing  # lepas memmap sebelum file ditulis
+    total = 0
+    # Jika bot lama mati, ambil maju per potongan MAX_OUTPUTSIZE supaya tidak ada celah
+    while start_ts <= now_ts:
+        end_ts = start_ts + (MAX_OUTPUTSIZE - 1) * step
+        params = {"symbol": symbol, "interval": interval, "outputsize": MAX_OUTPUTSIZE, "timezone": "UTC",
+                  "start_date": format_datetime(start_ts)}
+        if end_ts < now_ts:
+            params["end_date"] = format_datetime(end_ts)
+        values = fetch_values(params)
+        if values is None:
+            return None if total == 0 else total
+        records = values_to_records(values)
+        write_candles(symbol, interval, records, covered=(start_ts, min(end_ts, now_ts)), now_ts=now_ts)
+        total += len(records)
+        if end_ts >= now_ts:
+            break
+        start_ts = end_ts + step
+    return total
@@ -0,0 +1,166 @@
+"""
+Lapisan data untuk Dashboard.py.
+
+Histori sinyal (snapshot + jurnal) hanya dibaca dan diolah ulang jika mtime/ukuran salah
+satu file berubah. Semua frame turunan (metrik, distribusi hasil, PnL kumulatif, PnL per
+minggu, rata-rata win/loss, tabel trade) dihitung sekali per versi data dengan operasi
+kolom (vektor), lalu dipakai ulang di setiap refresh dan oleh semua sesi browser.
+
+Metrik & grafik utama dibaca dari file agregat bot (get_summary, lihat signal_stats.py);
+histori lengkap hanya dimuat untuk tabel trade (get_trades).
+"""
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import signal_journal
+import signal_stats
+
+# --- KONFIGURASI ---
+PNL_MULTIPLIER = signal_stats.PNL_MULTIPLIER
+ZONA_WAKTU = "Asia/Jakarta"
+KOLOM_TRADES = ['Waktu', 'Symbol', 'Tipe', 'Hasil', 'Entry', 'SL', 'TP', 'Net PnL', 'Alasan', 'Probabilitas']
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def calculate_pnl(df):
+    # TP: +|TP - Entry|, SL: -|SL - Entry|, lainnya 0 (dikali PNL_MULTIPLIER)
+    hasil = df['Hasil'].astype(str).str.upper()
+    return pd.Series(np.select(
+        [hasil == "TP", hasil == "SL"],
+        [(df['TP'] - df['Entry']).abs() * PNL_MULTIPLIER, -(df['SL'] - df['Entry']).abs() * PNL_MULTIPLIER],
+        0.0), index=df.index)
+
+
+def prepare_frame(signals):
+    """DataFrame bertipe dari list sinyal: Waktu tz-aware (WIB), angka float, Hasil terisi, Net_PnL."""
+    df = pd.DataFrame(signals)
+    if df.empty:
+        return df
+    # Waktu lama tersimpan dengan offset +07:00, yang baru UTC: disamakan dulu ke UTC lalu ke WIB
+    df['Waktu'] = pd.to_datetime(df['Waktu'], errors='coerce', utc=True, format='ISO8601').dt.tz_convert(ZONA_WAKTU)
+    df = df.dropna(subset=['Waktu'])
+    if 'Hasil' not in df.columns: df['Hasil'] = None
+    df['Hasil'] = df['Hasil'].fillna('pending')
+    for col in ['Entry', 'SL', 'TP', 'Probabilitas']:
+        if col in df.columns: df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    df['Net_PnL'] = calculate_pnl(df)
+    return df.sort_values('Waktu', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _week_display(weekly_pnl):
+    if not weekly_pnl.empty:
+        weekly_pnl['WeekDisplay'] = (weekly_pnl['Waktu'].dt.strftime('%b %d') + " - "
+                                     + (weekly_pnl['Waktu'] + timedelta(days=6)).dt.strftime('%b %d'))
+    return weekly_pnl
+
+
+def derive(df):
+    """Metrik & frame turunan yang dipakai semua bagian dashboard."""
+    hasil = df['Hasil']
+    outcome_df = hasil.value_counts().reset_index(); outcome_df.columns = ['Hasil', 'Count']
+    total_signals = len(df)
+    total_win = int((hasil == "TP").sum())
+    total_loss = int((hasil == "SL").sum())
+    executed_trades = total_win + total_loss
+    dieksekusi = hasil.isin(['TP', 'SL'])
+    metrics = {
+        'total_pnl': float(df.loc[dieksekusi, 'Net_PnL'].sum()),
+        'win_rate': (total_win / executed_trades * 100) if executed_trades > 0 else 0,
+        'execution_rate': (executed_trades / total_signals * 100) if total_signals > 0 else 0,
+        'total_signals': total_signals, 'total_win': total_win, 'total_loss': total_loss,
+        'total_invalid': int(hasil.str.contains('invalid', na=False).sum()),
+        'total_expired': int((hasil == "expired").sum()),
+        'outcome_df': outcome_df,
+    }
+
+    chart_df = df[dieksekusi].sort_values('Waktu', kind='stable')
+    chart_df = chart_df.assign(Cum_PnL=chart_df['Net_PnL'].cumsum())
+    weekly_pnl = _week_display(chart_df.set_index('Waktu').resample('W-MON')['Net_PnL'].sum().reset_index())
+    net = chart_df['Net_PnL']
+    avg_data = pd.DataFrame([{'Jenis': 'Rata-rata Win', 'Nilai': net[net > 0].mean()},
+                             {'Jenis': 'Rata-rata Loss', 'Nilai': net[net < 0].mean()}]).fillna(0)
+
+    return {'df': df, 'metrics': metrics, 'chart_df': chart_df, 'weekly_pnl': weekly_pnl, 'avg_data': avg_data, 'trades': trades_frame(df)}
+
+
+def trades_frame(df):
+    trades = df.rename(columns={'Net_PnL': 'Net PnL'})
+    return trades[[k for k in KOLOM_TRADES if k in trades.columns]]
+
+
+def get_data(json_file=signal_journal.SNAPSHOT_FILE, journal_file=signal_journal.JOURNAL_FILE):
+    """
+    Data dashboard untuk versi file saat ini. Dibangun ulang hanya jika snapshot atau
+    jurnal berubah (mtime/ukuran); jika tidak, objek yang sama dikembalikan.
+    Hasilnya hanya untuk dibaca. None jika tidak ada sinyal.
+    """
+    kunci = (json_file, journal_file)
+    versi = signal_journal.file_version(json_file, journal_file)
+    with _lock:
+        item = _cache.get(kunci)
+        if item is not None and item[0] == versi:
+            return item[1]
+        df = prepare_frame(signal_journal.load_signals(json_file, journal_file))
+        data = derive(df) if not df.empty else None
+        _cache[kunci] = (versi, data)
+        return data
+
+
+def get_trades(json_file=signal_journal.SNAPSHOT_FILE, journal_file=signal_journal.JOURNAL_FILE):
+    """Tabel trade lengkap (urut terbaru), hanya dimuat saat tab Trades dibuka. None jika kosong."""
+    data = get_data(json_file, journal_file)
+    return data['trades'] if data is not None else None
+
+
+# --- RINGKASAN DARI FILE AGREGAT (signal_stats.py) ---
+
+def summary_frames(stats):
+    """Metrik & frame grafik dari agregat, dengan bentuk yang sama seperti derive()."""
+    ringkasan = stats.summary()
+    outcome_df = pd.DataFrame(sorted(stats.counts.items(), key=lambda kv: -kv[1]), columns=['Hasil', 'Count'])
+    metrics = {k: ringkasan[k] for k in ('total_pnl', 'win_rate', 'execution_rate', 'total_signals',
+                                         'total_win', 'total_loss', 'total_invalid', 'total_expired')}
+    metrics['outcome_df'] = outcome_df
+
+    equity = np.array(stats.equity, dtype=np.float64).reshape(-1, 3)
+    chart_df = pd.DataFrame({
+        'Waktu': pd.to_datetime(equity[:, 0], unit='s', utc=True).tz_convert(ZONA_WAKTU),
+        'Net_PnL': equity[:, 1], 'Cum_PnL': equity[:, 2]})
+
+    weekly = pd.Series(stats.weekly, dtype=np.float64)
+    if not weekly.empty:
+        weekly.index = pd.to_datetime(weekly.index).tz_localize(ZONA_WAKTU)
+        # Minggu tanpa trade tetap tampil dengan PnL 0, seperti resample('W-MON')
+        weekly = weekly.sort_index().reindex(pd.date_range(weekly.index.min(), weekly.index.max(), freq='7D'), fill_value=0.0)
+    weekly_pnl = _week_display(weekly.rename_axis('Waktu').rename('Net_PnL').reset_index())
+
+    avg_data = pd.DataFrame([{'Jenis': 'Rata-rata Win', 'Nilai': ringkasan['avg_win']},
+                             {'Jenis': 'Rata-rata Loss', 'Nilai': ringkasan['avg_loss']}])
+    return {'metrics': metrics, 'chart_df': chart_df, 'weekly_pnl': weekly_pnl, 'avg_data': avg_data}
+
+
+def get_summary(aggregates_file=signal_stats.AGGREGATES_FILE, json_file=signal_journal.SNAPSHOT_FILE,
+                journal_file=signal_journal.JOURNAL_FILE):
+    """
+    Metrik & grafik dashboard dari file agregat yang ditulis bot, tanpa membaca histori.
+    Jika agregat tidak ada / tertinggal dari snapshot + jurnal, dibangun ulang di memori
+    dari histori (file agregat tetap milik bot). None jika tidak ada sinyal.
+    """
+    kunci = ('summary', aggregates_file, json_file, journal_file)
+    versi = signal_journal.file_version(aggregates_file, json_file, journal_file)
+    with _lock:
+        item = _cache.get(kunci)
+        if item is not None and item[0] == versi:
+            return item[1]
+    stats = signal_stats.SignalStats(aggregates_file, json_file, journal_file)
+    if not stats.load():
+        stats.rebuild(signal_journal.load_signals(json_file, journal_file))
+    data = summary_frames(stats) if stats.counts else None
+    with _lock:
+        _cache[kunci] = (versi, data)
+    return data
@@ -1,4 +1,3 @@
-import requests
 import json
 import time
 from datetime import datetime, timedelta, timezone
@@ -6,110 +5,121 @@ from zoneinfo import ZoneInfo
 import os
 from dotenv import load_dotenv
 
+import numpy as np
+
+import batch_eval
+import candle_store
+import http_client
+import intrabar
+import rate_limiter
+import signal_journal
+
 # --- KONFIGURASI ---
 load_dotenv()
 TWELVE_DATA_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
 
-# Karena total sinyal Anda hanya 22, kita bisa proses semuanya sekaligus.
-# Atur BATCH_SIZE lebih besar dari total sinyal Anda.
-BATCH_SIZE = 50 
+# Jendela semua sinyal digabung menjadi rentang request (maks. 5000 candle per rentang).
+# Progres disimpan per rentang di candle store, jadi eksekusi berikutnya melanjutkan sisanya.
+RANGE_PER_EKSEKUSI = 50
+JENDELA_EVALUASI = timedelta(days=1)
+INTRABAR_DRILLDOWN = True # Candle 15min yang ambigu (SL & TP / TP & Entry tersentuh bersamaan) dicek dengan candle 1min
 
 SYMBOL = "BTC/USD:Binance"
 INTERVAL = "15min"
 WIB = ZoneInfo("Asia/Jakarta")
 
-INPUT_JSON_FILE = "sinyal_trading.json"
+INPUT_JSON_FILE = signal_journal.SNAPSHOT_FILE # + jurnal-nya
 OUTPUT_JSON_FILE = "sinyal_trading_re-evaluated.json"
 
 print(f"🚀 Memulai skrip re-evaluasi history (Mode Batch).")
-print(f"📦 Ukuran Batch : {BATCH_SIZE} sinyal per eksekusi")
-
-
-# --- FUNGSI-FUNGSI BANTU (Sama seperti sebelumnya, tidak ada perubahan) ---
-def fetch_data_with_retry(url, max_retry=3):
-    for attempt in range(max_retry):
-        try:
-            response = requests.get(url, timeout=20)
-            response.raise_for_status()
-            data = response.json()
-            if "values" in data: return data["values"]
-            elif "message" in data:
-                print(f"   ⚠️ API Error: {data['message']}")
-                if "credits for the current minute" in data['message'].lower(): return "LIMIT_EXCEEDED"
-                return None
-            return None
-        except requests.RequestException as e:
-            print(f"   ⚠️ Percobaan {attempt + 1} gagal: {e}")
-            time.sleep(5)
-    return None
-
-def evaluasi_sinyal(sinyal, candle):
-    # Fungsi ini sama persis dengan versi sebelumnya, tidak perlu diubah.
-    entry = sinyal["Entry"]; tp = sinyal["TP"]; sl = sinyal["SL"]
-    open_, high, low, close = map(float, [candle["open"], candle["high"], candle["low"], candle["close"]])
-    if sinyal["Status"] == "pending":
-        if sinyal["Tipe"] == "BUY LIMIT" and high >= tp: sinyal["Status"] = "invalid"; sinyal["Hasil"] = "invalid_tp_hit_first"; return "invalid"
-        elif sinyal["Tipe"] == "SELL LIMIT" and low <= tp: sinyal["Status"] = "invalid"; sinyal["Hasil"] = "invalid_tp_hit_first"; return "invalid"
-        if sinyal["Tipe"] == "BUY LIMIT" and low <= entry: sinyal["Status"] = "active"
-        elif sinyal["Tipe"] == "SELL LIMIT" and high >= entry: sinyal["Status"] = "active"
-        else: return None
-    if sinyal["Status"] == "active":
-        if sinyal["Tipe"] == "BUY LIMIT":
-            if low <= sl: sinyal["Hasil"] = "SL"; sinyal["Status"] = "SL"; return "SL"
-            elif high >= tp: sinyal["Hasil"] = "TP"; sinyal["Status"] = "TP"; return "TP"
-        elif sinyal["Tipe"] == "SELL LIMIT":
-            if high >= sl: sinyal["Hasil"] = "SL"; sinyal["Status"] = "SL"; return "SL"
-            elif low <= tp: sinyal["Hasil"] = "TP"; sinyal["Status"] = "TP"; return "TP"
-    return None
+print(f"📦 Ukuran Batch : {RANGE_PER_EKSEKUSI} rentang data per eksekusi")
+
+
+# --- FUNGSI-FUNGSI BANTU ---
+def fetch_data_with_retry(params, max_retry=3):
+    # Mengembalikan list 'values', None, atau "LIMIT_EXCEEDED" (lihat http_client).
+    # Prioritas backfill: kredit dibagi dengan bot live, yang selalu didahulukan.
+    return http_client.twelvedata_time_series(params, max_retry=max_retry, timeout=20, priority=rate_limiter.PRIORITAS_BACKFILL)
+
+def evaluasi_batch(antrian):
+    # Semua sinyal dalam antrian dievaluasi sekaligus terhadap candle di store lokal
+    if not antrian: return {}
+    print(f"\n🧮 Mengevaluasi {len(antrian)} sinyal secara batch...")
+    candles = candle_store.load_candles(SYMBOL, INTERVAL)
+    tipe, entry, sl, tp = batch_eval.signals_to_arrays([a[1] for a in antrian])
+    start_ts = np.array([a[2] for a in antrian]); end_ts = np.array([a[3] for a in antrian])
+    hasil = batch_eval.evaluate_batch(candles, tipe, entry, sl, tp, start_ts, end_ts)
+    if INTRABAR_DRILLDOWN:
+        fine = intrabar.FineCandles(SYMBOL, fetch_values=lambda params: fetch_data_with_retry({**params, "apikey": TWELVE_DATA_API_KEY}))
+        ambigu, selesai = intrabar.refine_batch(candles, tipe, entry, sl, tp, start_ts, end_ts, hasil, fine, INTERVAL)
+        if ambigu:
+            print(f"   🔬 {ambigu} sinyal berakhir di candle ambigu, {selesai} diselesaikan dengan candle {fine.interval} ({fine.fetches} request)")
+    # Indeks candle terakhir di jendela tiap sinyal, untuk heuristik expired
+    last_idx = np.searchsorted(candles["ts"], end_ts, side="right") - 1
+    corrected = {}
+    for i, (idx, sinyal, start, _) in enumerate(antrian):
+        sinyal_copy = sinyal.copy(); sinyal_copy["Status"] = hasil["Status"][i]; sinyal_copy["Hasil"] = hasil["Hasil"][i]
+        if sinyal_copy["Hasil"]:
+            print(f"   ✔️ {sinyal.get('Waktu')}: {sinyal_copy['Hasil'].upper()} pada {candle_store.format_datetime(hasil['exit_ts'][i])}")
+        if sinyal_copy["Status"] == "pending":
+            if last_idx[i] < 0 or candles["ts"][last_idx[i]] < start or candles["ts"][last_idx[i]] > start + 3600:
+                sinyal_copy["Status"] = "expired"; sinyal_copy["Hasil"] = "expired"; print(f"   ✔️ {sinyal.get('Waktu')}: EXPIRED")
+        if sinyal.get("Hasil") != sinyal_copy.get("Hasil"):
+            print(f"   📊 Hasil Lama: {sinyal.get('Hasil')} -> Hasil Baru: {sinyal_copy.get('Hasil')}")
+        corrected[idx] = sinyal_copy
+    return corrected
+
+def jendela_sinyal(sinyal, now_ts):
+    # Jendela evaluasi [start_ts, end_ts] dalam epoch UTC, atau None jika 'Waktu' tidak valid.
+    # Ujungnya candle terakhir yang sudah tutup: hanya rentang itu yang bisa tercatat lengkap di store,
+    # jadi end_ts < start_ts berarti belum ada candle tutup untuk dievaluasi.
+    try: start_time = datetime.fromisoformat(sinyal["Waktu"])
+    except (KeyError, ValueError, TypeError): return None
+    if start_time.tzinfo is None: start_time = start_time.replace(tzinfo=timezone.utc)
+    start_ts = int(start_time.timestamp())
+    return start_ts, min(int((start_time + JENDELA_EVALUASI).timestamp()), candle_store.last_closed_ts(INTERVAL, now_ts))
 
 def main():
     try:
-        with open(INPUT_JSON_FILE, "r") as f: all_signals = json.load(f); all_signals.sort(key=lambda s: s.get("Waktu", ""))
+        all_signals = signal_journal.load_signals(INPUT_JSON_FILE); all_signals.sort(key=lambda s: s.get("Waktu", ""))
     except (FileNotFoundError, json.JSONDecodeError) as e: print(f"❌ ERROR: Tidak dapat memuat file input '{INPUT_JSON_FILE}': {e}"); return
-    corrected_signals = []
-    try:
-        with open(OUTPUT_JSON_FILE, "r") as f: corrected_signals = json.load(f)
-        print(f"📖 File output ditemukan, berisi {len(corrected_signals)} sinyal yang sudah diproses.")
-    except FileNotFoundError: print("📖 File output tidak ditemukan. Memulai dari awal.")
-    num_processed = len(corrected_signals)
-    if num_processed >= len(all_signals): print("\n✅ Semua sinyal sudah dievaluasi."); return
-    start_index = num_processed; end_index = num_processed + BATCH_SIZE
-    signals_to_process = all_signals[start_index:end_index]
-    print(f"\n🎯 Akan memproses batch berikutnya: sinyal ke-{start_index + 1} hingga {min(end_index, len(all_signals))}.")
+    now_ts = int(time.time())
+    jendela = [jendela_sinyal(s, now_ts) for s in all_signals]
+    for s, j in zip(all_signals, jendela):
+        if j is None: print(f"   ⚠️ Sinyal dilewati (tidak ada 'Waktu' / format salah): {s.get('Tipe')} @ {s.get('Entry')}")
+
+    # Satu request per rentang gabungan, bukan satu request per sinyal
+    siap = [j for j in jendela if j and j[1] >= j[0]]
+    rencana = candle_store.plan_fetch_ranges(SYMBOL, INTERVAL, siap)
+    print(f"\n🎯 {len(all_signals)} sinyal, {len(rencana)} rentang data belum ada di store lokal.")
     print("--------------------------------------------------")
-    for i, sinyal in enumerate(signals_to_process):
-        print(f"\n🔄 Memproses sinyal {start_index + i + 1}/{len(all_signals)} (Tipe: {sinyal.get('Tipe')}, Waktu: {sinyal.get('Waktu')})")
-        if "Waktu" not in sinyal: print("   ⚠️ Sinyal dilewati (tidak ada 'Waktu')."); corrected_signals.append(sinyal); continue
-        sinyal_copy = sinyal.copy(); sinyal_copy["Status"] = "pending"; sinyal_copy["Hasil"] = None
-        try: start_time = datetime.fromisoformat(sinyal_copy["Waktu"])
-        except (ValueError, TypeError): print(f"   ⚠️ Sinyal dilewati (format 'Waktu' salah)."); corrected_signals.append(sinyal); continue
-        end_time = start_time + timedelta(days=1)
-        start_date_str = start_time.strftime('%Y-%m-%d %H:%M:%S'); end_date_str = end_time.strftime('%Y-%m-%d %H:%M:%S')
-        print(f"   ⬇️  Mengambil data OHLC...");
-        url = f"https://api.twelvedata.com/time_series?symbol={SYMBOL}&interval={INTERVAL}&start_date={start_date_str}&end_date={end_date_str}&apikey={TWELVE_DATA_API_KEY}&outputsize=5000"
-        historical_candles = fetch_data_with_retry(url)
-        if historical_candles == "LIMIT_EXCEEDED": print("\n🛑 BATAS API PER MENIT TERCAPAI! Proses batch dihentikan."); break
-        if not historical_candles: print("   ⚠️ Gagal dapat data. Sinyal asli digunakan."); corrected_signals.append(sinyal); continue
-        historical_candles.reverse()
-        print(f"   ✅ Berhasil mendapatkan {len(historical_candles)} candle.")
-        for candle in historical_candles:
-            if evaluasi_sinyal(sinyal_copy, candle):
-                print(f"   ✔️ Hasil ditemukan: {sinyal_copy['Hasil'].upper()} pada {candle['datetime']}"); break
-        if sinyal_copy["Status"] == "pending":
-            if not historical_candles or datetime.fromisoformat(historical_candles[-1]["datetime"]).replace(tzinfo=timezone.utc) > start_time.astimezone(timezone.utc) + timedelta(hours=1):
-                 sinyal_copy["Status"] = "expired"; sinyal_copy["Hasil"] = "expired"; print("   ✔️ Hasil ditemukan: EXPIRED")
-        print(f"   📊 Hasil Lama: {sinyal.get('Hasil')} -> Hasil Baru: {sinyal_copy.get('Hasil')}")
-        corrected_signals.append(sinyal_copy)
-        
-        # --- PERUBAHAN UTAMA ADA DI SINI ---
-        print("   ⏳ Menunggu 8 detik untuk menghindari limit per menit...")
-        time.sleep(8)
+    for i, (start_ts, end_ts) in enumerate(rencana[:RANGE_PER_EKSEKUSI]):
+        print(f"\n⬇️  Rentang {i + 1}/{len(rencana)}: {candle_store.format_datetime(start_ts)} s/d {candle_store.format_datetime(end_ts)}")
+        params = {"symbol": SYMBOL, "interval": INTERVAL, "timezone": "UTC", "start_date": candle_store.format_datetime(start_ts),
+                  "end_date": candle_store.format_datetime(end_ts), "apikey": TWELVE_DATA_API_KEY, "outputsize": candle_store.MAX_OUTPUTSIZE}
+        # Laju request diatur token bucket bersama; jika API tetap menolak, bucket dikosongkan lalu dicoba lagi
+        for _ in range(3):
+            fetched = fetch_data_with_retry(params)
+            if fetched != http_client.LIMIT_EXCEEDED: break
+            print("   ⏳ Batas API per menit tercapai, menunggu kredit berikutnya...")
+        if fetched == http_client.LIMIT_EXCEEDED: print("\n🛑 BATAS API PER MENIT TERCAPAI! Proses batch dihentikan."); break
+        if not fetched: print("   ⚠️ Gagal dapat data untuk rentang ini."); continue
+        candle_store.write_candles(SYMBOL, INTERVAL, candle_store.values_to_records(fetched), covered=(start_ts, end_ts), now_ts=now_ts)
+        print(f"   ✅ Berhasil mendapatkan {len(fetched)} candle.")
+
+    # Semua sinyal yang jendelanya sudah lengkap di store dievaluasi terhadap buffer candle yang sama
+    antrian = [(i, s, j[0], j[1]) for i, (s, j) in enumerate(zip(all_signals, jendela))
+               if j and j[1] >= j[0] and candle_store.is_covered(SYMBOL, INTERVAL, j[0], j[1])]
+    corrected = evaluasi_batch(antrian)
+    corrected_signals = [corrected.get(i, s) for i, s in enumerate(all_signals)]
+    belum = sum(1 for j in jendela if j) - len(antrian)
 
     with open(OUTPUT_JSON_FILE, "w") as f: json.dump(corrected_signals, f, indent=2)
     print("\n--------------------------------------------------")
     print(f"✅ Batch selesai diproses!")
     print(f"💾 Total {len(corrected_signals)} sinyal telah disimpan di: {OUTPUT_JSON_FILE}")
+    if belum: print(f"⏭️  {belum} sinyal belum punya data lengkap (hasil lama dipakai). Jalankan lagi untuk melanjutkan.")
     print("--------------------------------------------------")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,178 @@
+"""
+Klien HTTP bersama untuk semua skrip (TwelveData & LLM).
+
+- Satu requests.Session dengan connection pool (keep-alive), bukan koneksi baru per call
+- Retry dengan exponential backoff + jitter
+- Deteksi respons TwelveData "credits for the current minute" -> LIMIT_EXCEEDED
+- Circuit breaker per host: setelah beberapa kegagalan beruntun, request ke host itu
+  langsung ditolak selama masa cooldown supaya endpoint yang bermasalah tidak dibanjiri
+- Varian async (asyncio) untuk menjalankan beberapa request sekaligus
+"""
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import rate_limiter
+
+# --- KONFIGURASI ---
+POOL_SIZE = 10
+BACKOFF_DASAR = 1.0  # detik
+BACKOFF_MAKS = 30.0
+BREAKER_AMBANG_GAGAL = 5  # kegagalan beruntun sebelum circuit terbuka
+BREAKER_COOLDOWN = 60.0  # detik circuit tetap terbuka
+
+TWELVE_DATA_URL = "https://api.twelvedata.com"
+LIMIT_EXCEEDED = "LIMIT_EXCEEDED"
+
+
+class CircuitOpenError(requests.RequestException):
+    """Request ditolak karena circuit breaker host tujuan sedang terbuka."""
+
+
+class CircuitBreaker:
+    def __init__(self, ambang=BREAKER_AMBANG_GAGAL, cooldown=BREAKER_COOLDOWN, clock=time.monotonic):
+        self.ambang = ambang
+        self.cooldown = cooldown
+        self.clock = clock
+        self.gagal = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = self.clock()
+            if now < self.open_until:
+                return False
+            if self.gagal >= self.ambang:
+                # Half-open: satu request percobaan lewat, sisanya ditahan sampai hasilnya jelas
+                self.open_until = now + self.cooldown
+            return True
+
+    def success(self):
+        with self._lock:
+            self.gagal = 0
+            self.open_until = 0.0
+
+    def failure(self):
+        with self._lock:
+            self.gagal += 1
+            if self.gagal >= self.ambang:
+                self.open_until = self.clock() + self.cooldown
+
+
+_session = None
+_session_lock = threading.Lock()
+_breakers = {}
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def get_breaker(url):
+    host = urlparse(url).netloc
+    with _session_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+def backoff_delay(attempt):
+    # "Full jitter": acak antara 0 dan BACKOFF_DASAR * 2^attempt (dibatasi BACKOFF_MAKS)
+    return random.uniform(0, min(BACKOFF_MAKS, BACKOFF_DASAR * (2 ** attempt)))
+
+def is_credit_limit(data):
+    return isinstance(data, dict) and "credits for the current minute" in str(data.get("message", "")).lower()
+
+def request_json(method, url, max_retry=3, timeout=10, **kwargs):
+    """
+    Request dengan retry + backoff. Mengembalikan JSON hasil decode, atau None jika
+    semua percobaan gagal. Raise CircuitOpenError jika circuit host sedang terbuka.
+    """
+    breaker = get_breaker(url)
+    host = urlparse(url).netloc
+    for attempt in range(max_retry):
+        if not breaker.allow():
+            metrics.CIRCUIT_OPEN.inc(host=host)
+            raise CircuitOpenError(f"Circuit terbuka untuk {urlparse(url).netloc}, request dilewati")
+        try:
+            response = get_session().request(method, url, timeout=timeout, **kwargs)
+            response.raise_for_status()
+            data = response.json()
+            breaker.success()
+            return data
+        except (requests.RequestException, ValueError) as e:
+            breaker.failure()
+            print(f"⚠️  Percobaan {attempt + 1} gagal: {e}")
+            if attempt + 1 < max_retry:
+                metrics.HTTP_RETRIES.inc(host=host)
+                time.sleep(backoff_delay(attempt))
+    metrics.HTTP_FAILURES.inc(host=host)
+    return None
+
+def get_json(url, params=None, max_retry=3, timeout=10):
+    try:
+        return request_json("GET", url, max_retry=max_retry, timeout=timeout, params=params)
+    except CircuitOpenError as e:
+        print(f"⛔ {e}")
+        return None
+
+def post_json(url, body, headers=None, max_retry=1, timeout=45):
+    # Error dilempar ke pemanggil (sama seperti requests.post + raise_for_status)
+    data = request_json("POST", url, max_retry=max_retry, timeout=timeout, json=body, headers=headers)
+    if data is None:
+        raise requests.RequestException(f"Request ke {url} gagal")
+    return data
+
+def twelvedata_time_series(params, max_retry=3, timeout=20, priority=rate_limiter.PRIORITAS_LIVE):
+    """
+    Endpoint time_series TwelveData. Mengembalikan list 'values', None jika gagal,
+    atau LIMIT_EXCEEDED jika kredit per menit habis (tidak dihitung sebagai kegagalan host).
+    Satu kredit diambil dulu dari token bucket bersama sesuai `priority`.
+    """
+    limiter = rate_limiter.get_limiter()
+    with metrics.span("antre_kredit"):
+        limiter.acquire(1, priority)
+    with metrics.span("twelvedata", interval=params.get("interval")):
+        data = get_json(f"{TWELVE_DATA_URL}/time_series", params=params, max_retry=max_retry, timeout=timeout)
+    if not data:
+        return None
+    if "values" in data:
+        return data["values"]
+    if "message" in data:
+        print(f"   ⚠️ API Error: {data['message']}")
+        if is_credit_limit(data):
+            metrics.RATE_LIMIT_HITS.inc(sumber="twelvedata")
+            limiter.drain()
+            return LIMIT_EXCEEDED
+    return None
+
+
+# --- VARIAN ASYNC ---
+# Session dipakai bersama lintas thread; pool HTTPAdapter aman untuk akses paralel.
+
+async def get_json_async(url, params=None, max_retry=3, timeout=10):
+    return await asyncio.to_thread(get_json, url, params, max_retry, timeout)
+
+async def post_json_async(url, body, headers=None, max_retry=1, timeout=45):
+    return await asyncio.to_thread(post_json, url, body, headers, max_retry, timeout)
+
+async def twelvedata_time_series_async(params, max_retry=3, timeout=20, priority=rate_limiter.PRIORITAS_LIVE):
+    return await asyncio.to_thread(twelvedata_time_series, params, max_retry, timeout, priority)
+
+def fetch_many(param_list, max_retry=3, timeout=20, priority=rate_limiter.PRIORITAS_LIVE):
+    """Beberapa request time_series sekaligus; hasil berurutan sesuai param_list."""
+    async def _run():
+        return await asyncio.gather(*(twelvedata_time_series_async(p, max_retry, timeout, priority) for p in param_list))
+    return asyncio.run(_run())
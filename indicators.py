@@ -0,0 +1,312 @@
+"""
+Mesin indikator inkremental: setiap candle baru memperbarui semua indikator dalam O(1).
+
+- Bar H1 & Daily diagregasi bertahap (bar terakhir boleh parsial, sama dengan
+  resample.last_bars), dengan ring buffer N bar terakhir dan jumlah range berjalan
+- Max/min bergulir (Support/Resistance) memakai monotonic deque
+- EMA, ATR (Wilder), swing high/low (fraktal) dan Fair Value Gap terakhir dari candle dasar
+- Candle terakhir boleh dikirim ulang dengan nilai baru (candle yang masih terbentuk);
+  efeknya diganti, bukan ditambahkan dua kali
+- State bisa di-checkpoint ke file JSON, jadi restart tidak perlu warm-up dari awal
+"""
+import json
+import os
+from collections import deque
+
+import candle_store
+import prompt_builder
+from resample import SESSION_OFFSET
+
+# --- KONFIGURASI ---
+H1_BARS = 24  # Bar H1 untuk tren & volatilitas
+DAILY_BARS = 5  # Bar Daily untuk Support/Resistance
+EMA_PERIODE = (20, 50)
+ATR_PERIODE = 14
+SWING_K = 2  # Bar di kiri & kanan untuk fraktal swing
+CHECKPOINT_VERSION = 1
+
+
+class RollingExtreme:
+    """Max (atau min) dari `window` nilai terakhir dengan monotonic deque, amortized O(1)."""
+
+    def __init__(self, window, mode="max"):
+        self.window = window
+        self.is_max = mode == "max"
+        self.dq = deque()  # (seq, nilai), nilai monoton
+
+    def push(self, seq, value):
+        dq = self.dq
+        if self.is_max:
+            while dq and dq[-1][1] <= value:
+                dq.pop()
+        else:
+            while dq and dq[-1][1] >= value:
+                dq.pop()
+        dq.append((seq, value))
+        while dq[0][0] <= seq - self.window:
+            dq.popleft()
+
+    def value(self):
+        return self.dq[0][1] if self.dq else None
+
+
+class TimeframeAggregator:
+    """`count` bar terakhir timeframe `period` detik, termasuk bar yang masih parsial."""
+
+    def __init__(self, period, count, offset=0):
+        self.period = period
+        self.count = count
+        self.offset = offset
+        self.closed = deque(maxlen=count - 1)  # [ts, open, high, low, close] bar yang sudah lewat
+        self.range_sum = 0.0
+        self.seq = 0
+        self.max_high = RollingExtreme(count - 1, "max")
+        self.min_low = RollingExtreme(count - 1, "min")
+        self.partial = None
+        self._undo = None  # bar parsial sebelum candle dasar terakhir diterapkan
+
+    def update(self, ts, o, h, l, c, revisi=False):
+        if revisi:
+            self.partial = list(self._undo) if self._undo else None
+        bucket = (ts + self.offset) // self.period * self.period - self.offset
+        if self.partial is not None and self.partial[0] != bucket:
+            self._close_partial()
+        self._undo = list(self.partial) if self.partial else None
+        if self.partial is None:
+            self.partial = [bucket, o, h, l, c]
+        else:
+            p = self.partial
+            p[2] = max(p[2], h)
+            p[3] = min(p[3], l)
+            p[4] = c
+
+    def _close_partial(self):
+        bar = self.partial
+        if self.count > 1:
+            if len(self.closed) == self.closed.maxlen:
+                lama = self.closed[0]
+                self.range_sum -= lama[2] - lama[3]
+            self.closed.append(bar)
+            self.range_sum += bar[2] - bar[3]
+            self.seq += 1
+            self.max_high.push(self.seq, bar[2])
+            self.min_low.push(self.seq, bar[3])
+        self.partial = None
+
+    def __len__(self):
+        return len(self.closed) + (1 if self.partial else 0)
+
+    def first_close(self):
+        return self.closed[0][4] if self.closed else self.partial[4]
+
+    def avg_range(self):
+        p = self.partial
+        return (self.range_sum + p[2] - p[3]) / len(self)
+
+    def highest(self):
+        v = self.max_high.value()
+        return self.partial[2] if v is None else max(v, self.partial[2])
+
+    def lowest(self):
+        v = self.min_low.value()
+        return self.partial[3] if v is None else min(v, self.partial[3])
+
+    def to_state(self):
+        return {
+            "closed": list(self.closed), "range_sum": self.range_sum, "seq": self.seq,
+            "max_high": list(self.max_high.dq), "min_low": list(self.min_low.dq),
+            "partial": self.partial, "undo": self._undo,
+        }
+
+    def load_state(self, state):
+        self.closed = deque(state["closed"], maxlen=self.count - 1)
+        self.range_sum = state["range_sum"]
+        self.seq = state["seq"]
+        self.max_high.dq = deque(tuple(x) for x in state["max_high"])
+        self.min_low.dq = deque(tuple(x) for x in state["min_low"])
+        self.partial = state["partial"]
+        self._undo = state["undo"]
+
+
+class IndicatorEngine:
+    def __init__(self, base_interval, session="UTC", h1_bars=H1_BARS, daily_bars=DAILY_BARS,
+                 ema_periode=EMA_PERIODE, atr_periode=ATR_PERIODE, swing_k=SWING_K):
+        self.base_interval = base_interval
+        self.config = {"base_interval": base_interval, "session": session, "h1_bars": h1_bars, "daily_bars": daily_bars,
+                       "ema_periode": list(ema_periode), "atr_periode": atr_periode, "swing_k": swing_k}
+        self.h1 = TimeframeAggregator(3600, h1_bars)
+        self.daily = TimeframeAggregator(86400, daily_bars, SESSION_OFFSET[session])
+        self.ema_periode = tuple(ema_periode)
+        self.atr_periode = atr_periode
+        self.swing_k = swing_k
+        self.ring = deque(maxlen=max(2 * swing_k + 1, 3))  # [ts, high, low, close] candle dasar terakhir
+        self.last_ts = None
+        self.bars = 0
+        self.s = self._scalar_awal()
+        self._undo = None
+        self._ring_drop = None  # candle yang terdorong keluar ring oleh candle terakhir
+
+    @staticmethod
+    def _scalar_awal():
+        return {"prev_close": None, "ema": {}, "atr": None, "tr_sum": 0.0, "tr_n": 0,
+                "swing_high": None, "swing_low": None, "fvg": None}
+
+    def update(self, ts, o, h, l, c):
+        """Menerapkan satu candle dasar. Candle dengan ts sama dengan yang terakhir = revisi."""
+        ts = int(ts)
+        o, h, l, c = float(o), float(h), float(l), float(c)
+        if self.last_ts is not None and ts < self.last_ts:
+            return False
+        revisi = ts == self.last_ts
+        if revisi:
+            self.s = self._undo
+            self.ring.pop()
+            if self._ring_drop is not None:
+                self.ring.appendleft(self._ring_drop)
+        else:
+            self.bars += 1
+        self._undo = self.s
+        self.s = s = dict(self.s, ema=dict(self.s["ema"]))
+
+        self.h1.update(ts, o, h, l, c, revisi)
+        self.daily.update(ts, o, h, l, c, revisi)
+
+        prev_close = s["prev_close"]
+        tr = h - l if prev_close is None else max(h - l, abs(h - prev_close), abs(l - prev_close))
+        if s["tr_n"] < self.atr_periode:
+            s["tr_sum"] += tr
+            s["tr_n"] += 1
+            if s["tr_n"] == self.atr_periode:
+                s["atr"] = s["tr_sum"] / self.atr_periode
+        else:
+            s["atr"] = (s["atr"] * (self.atr_periode - 1) + tr) / self.atr_periode
+        for n in self.ema_periode:
+            lama = s["ema"].get(str(n))
+            s["ema"][str(n)] = c if lama is None else lama + 2.0 / (n + 1) * (c - lama)
+        s["prev_close"] = c
+
+        self._ring_drop = self.ring[0] if len(self.ring) == self.ring.maxlen else None
+        self.ring.append([ts, h, l, c])
+        self._update_swing(s)
+        self._update_fvg(s, h, l)
+        self.last_ts = ts
+        return True
+
+    def update_records(self, records):
+        """Menerapkan array CANDLE_DTYPE terurut naik; candle yang lebih lama dari state dilewati."""
+        if self.last_ts is not None and len(records):
+            records = records[records["ts"] >= self.last_ts]
+        for r in records:
+            self.update(r["ts"], r["open"], r["high"], r["low"], r["close"])
+
+    def _update_swing(self, s):
+        k = self.swing_k
+        if len(self.ring) < 2 * k + 1:
+            return
+        bars = list(self.ring)[-(2 * k + 1):]
+        tengah = bars[k]
+        lain = bars[:k] + bars[k + 1:]
+        if all(tengah[1] > b[1] for b in lain):
+            s["swing_high"] = [tengah[0], tengah[1]]
+        if all(tengah[2] < b[2] for b in lain):
+            s["swing_low"] = [tengah[0], tengah[2]]
+
+    def _update_fvg(self, s, h, l):
+        fvg = s["fvg"]
+        if fvg is not None:
+            # FVG dianggap terisi begitu harga kembali masuk ke celahnya
+            if (fvg["tipe"] == "bullish" and l <= fvg["bawah"]) or (fvg["tipe"] == "bearish" and h >= fvg["atas"]):
+                s["fvg"] = None
+        if len(self.ring) >= 3:
+            a, c = self.ring[-3], self.ring[-1]
+            if c[2] > a[1]:
+                s["fvg"] = {"tipe": "bullish", "ts": c[0], "bawah": a[1], "atas": c[2]}
+            elif c[1] < a[2]:
+                s["fvg"] = {"tipe": "bearish", "ts": c[0], "bawah": c[1], "atas": a[2]}
+
+    # --- RINGKASAN UNTUK PROMPT ---
+
+    def trend_volatility(self):
+        # Sama dengan ringkasan lama: tren dari close H1 pertama vs terakhir, volatilitas dari range
+        if len(self.h1) < 2:
+            return "Tidak diketahui", "Tidak diketahui"
+        p = self.h1.partial
+        trend = "Uptrend" if p[4] > self.h1.first_close() else "Downtrend"
+        avg_range = self.h1.avg_range()
+        last_range = p[2] - p[3]
+        if last_range > avg_range * 1.5:
+            volatility = "Tinggi"
+        elif last_range < avg_range * 0.7:
+            volatility = "Rendah"
+        else:
+            volatility = "Sedang"
+        return trend, volatility
+
+    def _format_harga(self):
+        # Jumlah desimal sama dengan deret harga di prompt, jadi harga kecil (forex, altcoin) tetap presisi
+        _, desimal = prompt_builder.price_scale(self.s["prev_close"] or 0.0)
+        return lambda harga: f"{harga:,.{desimal}f}"
+
+    def support_resistance(self):
+        if len(self.daily) == 0:
+            return "Tidak diketahui", "Tidak diketahui"
+        fmt = self._format_harga()
+        return fmt(self.daily.lowest()), fmt(self.daily.highest())
+
+    def summary(self):
+        """Satu baris indikator tambahan (EMA, ATR, swing, FVG) untuk prompt."""
+        s = self.s
+        fmt = self._format_harga()
+        bagian = [f"EMA{n} {fmt(s['ema'][str(n)])}" for n in self.ema_periode if str(n) in s["ema"]]
+        if s["atr"] is not None:
+            bagian.append(f"ATR{self.atr_periode} {fmt(s['atr'])}")
+        if s["swing_high"]:
+            bagian.append(f"Swing High {fmt(s['swing_high'][1])} ({candle_store.format_datetime(s['swing_high'][0])[5:16]})")
+        if s["swing_low"]:
+            bagian.append(f"Swing Low {fmt(s['swing_low'][1])} ({candle_store.format_datetime(s['swing_low'][0])[5:16]})")
+        if s["fvg"]:
+            f = s["fvg"]
+            bagian.append(f"FVG {f['tipe']} {fmt(f['bawah'])}-{fmt(f['atas'])} belum terisi")
+        return " | ".join(bagian)
+
+    # --- CHECKPOINT ---
+
+    def to_state(self):
+        return {
+            "version": CHECKPOINT_VERSION, "config": self.config, "last_ts": self.last_ts, "bars": self.bars,
+            "h1": self.h1.to_state(), "daily": self.daily.to_state(), "ring": list(self.ring),
+            "scalar": self.s, "undo": self._undo, "ring_drop": self._ring_drop,
+        }
+
+    @classmethod
+    def from_state(cls, state, **config):
+        """Engine dari state checkpoint, atau None jika versi/konfigurasi berbeda."""
+        engine = cls(**config)
+        if state.get("version") != CHECKPOINT_VERSION or state.get("config") != engine.config:
+            return None
+        engine.last_ts = state["last_ts"]
+        engine.bars = state["bars"]
+        engine.h1.load_state(state["h1"])
+        engine.daily.load_state(state["daily"])
+        engine.ring.extend(state["ring"])
+        engine.s = state["scalar"]
+        engine._undo = state["undo"]
+        engine._ring_drop = state["ring_drop"]
+        return engine
+
+
+def checkpoint_path(symbol, interval):
+    return candle_store.candle_path(symbol, interval)[:-len(".bin")] + ".indicators.json"
+
+def save_checkpoint(engine, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(engine.to_state(), f)
+    os.replace(tmp, path)
+
+def load_checkpoint(path, **config):
+    try:
+        with open(path, "r") as f:
+            return IndicatorEngine.from_state(json.load(f), **config)
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
@@ -0,0 +1,177 @@
+"""
+Drill-down intrabar untuk candle yang ambigu.
+
+Pada satu candle 15min, urutan kejadian tidak diketahui jika:
+- sinyal pending: TP dan Entry sama-sama tersentuh (aturan lama: dianggap invalid)
+- sinyal active : SL dan TP sama-sama tersentuh (aturan lama: dianggap SL)
+
+Hanya untuk candle seperti ini, candle yang lebih halus (1min) dimuat dari candle store
+(diambil dari API jika belum ada) lalu dievaluasi dengan state machine yang sama untuk
+mengetahui urutan yang sebenarnya. Jika data halus tidak tersedia, aturan lama dipakai.
+Ambiguitas di dalam satu candle 1min tetap diselesaikan dengan aturan lama.
+"""
+import threading
+
+import numpy as np
+
+import batch_eval
+import candle_store
+import http_client
+
+# --- KONFIGURASI ---
+FINE_INTERVAL = "1min"
+MAKS_DRILLDOWN = 5  # Candle ambigu berturut-turut per sinyal yang boleh di-drill-down
+
+
+class FineCandles:
+    """
+    Sumber candle halus: candle store lokal, fetch ke API hanya saat rentang belum ada.
+    Satu objek per simbol boleh dipakai bersama beberapa pipeline (thread): cek rentang,
+    fetch, tulis dan baca store berjalan di bawah satu lock.
+    """
+
+    def __init__(self, symbol, interval=FINE_INTERVAL, fetch_values=None):
+        self.symbol = symbol
+        self.interval = interval
+        self.fetch_values = fetch_values
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def _fetch(self, start_ts, end_ts):
+        if self.fetch_values is None:
+            return False
+        params = {"symbol": self.symbol, "interval": self.interval, "timezone": "UTC",
+                  "start_date": candle_store.format_datetime(start_ts), "end_date": candle_store.format_datetime(end_ts),
+                  "outputsize": candle_store.MAX_OUTPUTSIZE}
+        self.fetches += 1
+        values = self.fetch_values(params)
+        if not values or values == http_client.LIMIT_EXCEEDED:
+            return False
+        records = candle_store.values_to_records(values)
+        # Hanya bagian yang benar-benar diterima yang dicatat sebagai tercakup (candle terbaru bisa belum ada)
+        candle_store.write_candles(self.symbol, self.interval, records,
+                                   covered=(start_ts, min(end_ts, int(records["ts"][-1]))))
+        return True
+
+    def prefetch(self, windows):
+        """Mengambil sekaligus semua `windows` [(start_ts, end_ts)] yang belum ada di store."""
+        with self._lock:
+            for start_ts, end_ts in candle_store.plan_fetch_ranges(self.symbol, self.interval, windows):
+                if not self._fetch(start_ts, end_ts):
+                    break
+
+    def get(self, start_ts, end_ts):
+        """Candle halus start_ts..end_ts (inklusif), atau None jika tidak tersedia."""
+        with self._lock:
+            # Pipeline lain tidak menulis ulang file selama rentang ini dicek & disalin dari memmap
+            if not candle_store.is_covered(self.symbol, self.interval, start_ts, end_ts):
+                if not self._fetch(start_ts, end_ts):
+                    return None
+            data = candle_store.load_range(self.symbol, self.interval, start_ts, end_ts)
+        return data if len(data) else None
+
+
+def _touches(tipe, entry, sl, tp, high, low):
+    buy = tipe == "BUY LIMIT"
+    tp_touch = high >= tp if buy else low <= tp
+    fill_touch = low <= entry if buy else high >= entry
+    sl_touch = low <= sl if buy else high >= sl
+    return tp_touch, fill_touch, sl_touch
+
+def _touches_array(tipe, entry, sl, tp, high, low):
+    buy = tipe == "BUY LIMIT"
+    tp_touch = np.where(buy, high >= tp, low <= tp)
+    fill_touch = np.where(buy, low <= entry, high >= entry)
+    sl_touch = np.where(buy, low <= sl, high >= sl)
+    return tp_touch, fill_touch, sl_touch
+
+def is_ambiguous(sinyal, candle):
+    """True jika hasil `evaluasi_sinyal` pada candle ini bergantung pada urutan cek di kode."""
+    if sinyal.get("Status") not in ("pending", "active"):
+        return False
+    tp_touch, fill_touch, sl_touch = _touches(sinyal["Tipe"], sinyal["Entry"], sinyal["SL"], sinyal["TP"],
+                                              float(candle["high"]), float(candle["low"]))
+    if sinyal["Status"] == "pending":
+        return tp_touch and fill_touch
+    return tp_touch and sl_touch
+
+
+def resolve_bar(sinyal, candle, interval, fine, fallback):
+    """
+    Seperti evaluasi_sinyal(sinyal, candle) tetapi urutan di dalam candle ditentukan dari
+    candle halus. `fallback` (evaluasi_sinyal) dipakai jika data halus tidak tersedia.
+    """
+    ts = candle_store.parse_datetime(candle["datetime"])
+    end = ts + candle_store.interval_seconds(interval) - candle_store.interval_seconds(fine.interval)
+    data = fine.get(ts, end)
+    if data is None:
+        return fallback(sinyal, candle)
+    hasil = batch_eval.evaluate_batch(data, [sinyal["Tipe"]], [sinyal["Entry"]], [sinyal["SL"]], [sinyal["TP"]],
+                                      [ts], [end], active=[sinyal["Status"] == "active"])
+    status = int(hasil["status"][0])
+    sinyal["Status"] = hasil["Status"][0]
+    if status == batch_eval.INVALID:
+        sinyal["Hasil"] = "invalid_tp_hit_first"
+        return "invalid"
+    if status in (batch_eval.SL, batch_eval.TP):
+        sinyal["Hasil"] = hasil["Hasil"][0]
+        return sinyal["Hasil"]
+    return None
+
+
+def refine_batch(candles, tipe, entry, sl, tp, start_ts, end_ts, hasil, fine, interval):
+    """
+    Memperbaiki hasil batch_eval.evaluate_batch (`hasil`, diubah di tempat) untuk sinyal yang
+    candle exit-nya ambigu. Mengembalikan (jumlah_ambigu, jumlah_terselesaikan).
+    """
+    ts = np.asarray(candles["ts"])
+    step = candle_store.interval_seconds(interval)
+    lebar = step - candle_store.interval_seconds(fine.interval)
+    tipe = np.asarray(tipe); entry = np.asarray(entry, dtype=np.float64)
+    sl = np.asarray(sl, dtype=np.float64); tp = np.asarray(tp, dtype=np.float64)
+    start_ts = np.asarray(start_ts); end_ts = np.asarray(end_ts)
+
+    def ambigu(idx):
+        # Sinyal (dari `idx`) yang candle exit-nya juga menyentuh level yang bersaing
+        status = hasil["status"][idx]
+        pos = np.searchsorted(ts, np.maximum(hasil["exit_ts"][idx], 0))
+        pos = np.minimum(pos, len(ts) - 1)
+        tp_touch, fill_touch, _ = _touches_array(tipe[idx], entry[idx], sl[idx], tp[idx], candles["high"][pos], candles["low"][pos])
+        return idx[((status == batch_eval.INVALID) & fill_touch) | ((status == batch_eval.SL) & tp_touch)]
+
+    if len(ts) == 0:
+        return 0, 0
+    kandidat = ambigu(np.arange(len(tipe)))
+    if len(kandidat) == 0:
+        return 0, 0
+    fine.prefetch([(int(hasil["exit_ts"][i]), int(hasil["exit_ts"][i]) + lebar) for i in kandidat])
+
+    selesai = 0
+    for i in kandidat:
+        for _ in range(MAKS_DRILLDOWN):
+            bar = int(hasil["exit_ts"][i])
+            data = fine.get(bar, bar + lebar)
+            if data is None:
+                break
+            aktif = hasil["status"][i] == batch_eval.SL
+            r = batch_eval.evaluate_batch(data, tipe[i:i + 1], entry[i:i + 1], sl[i:i + 1], tp[i:i + 1],
+                                          [bar], [bar + lebar], active=[aktif])
+            status = int(r["status"][0])
+            if not aktif and r["fill_ts"][0] != batch_eval.NO_TS:
+                hasil["fill_ts"][i] = r["fill_ts"][0]
+            if status not in (batch_eval.PENDING, batch_eval.ACTIVE):
+                hasil["status"][i] = status; hasil["exit_ts"][i] = r["exit_ts"][0]
+                selesai += 1
+                break
+            # Candle ambigu ternyata tidak berakhir di situ: lanjutkan evaluasi 15min dari candle berikutnya
+            lanjut = batch_eval.evaluate_batch(candles, tipe[i:i + 1], entry[i:i + 1], sl[i:i + 1], tp[i:i + 1],
+                                               [bar + step], [end_ts[i]], active=[status == batch_eval.ACTIVE])
+            hasil["status"][i] = lanjut["status"][0]; hasil["exit_ts"][i] = lanjut["exit_ts"][0]
+            if status == batch_eval.PENDING and lanjut["fill_ts"][0] != batch_eval.NO_TS:
+                hasil["fill_ts"][i] = lanjut["fill_ts"][0]
+            if len(ambigu(np.array([i]))) == 0:
+                selesai += 1
+                break
+    hasil["Status"] = batch_eval.STATUS_NAMA[hasil["status"]]
+    hasil["Hasil"] = batch_eval.HASIL_NAMA[hasil["status"]]
+    return len(kandidat), selesai
@@ -0,0 +1,94 @@
+"""
+Cache keputusan LLM berdasarkan sidik jari (fingerprint) kondisi pasar.
+
+Fingerprint = candle terbaru + tren/volatilitas H1 + S/R + id & hasil histori sinyal
+yang masuk ke prompt. Selama fingerprint sama (dan TTL belum lewat), keputusan LLM
+yang tersimpan, termasuk "tidak ada trade" (`{}`), dipakai ulang tanpa memanggil LLM.
+Cache berukuran terbatas (LRU) dan opsional disimpan ke file agar tetap berlaku
+setelah bot di-restart.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- KONFIGURASI ---
+CACHE_FILE = "llm_cache.json"
+CACHE_MAKS = 64
+CACHE_TTL_DETIK = 15 * 60  # Satu candle 15min
+
+
+def fingerprint(latest_candle_datetime, context, history, instrument=None):
+    """`history` = list (id, Hasil) sinyal yang dikirim ke prompt, `instrument` = (symbol, interval)."""
+    kunci = {
+        "instrument": list(instrument) if instrument else None,
+        "candle": latest_candle_datetime,
+        "context": [context.get(k) for k in ("trend_h1", "volatility_h1", "support", "resistance")],
+        "history": [list(h) for h in history],
+    }
+    return hashlib.sha1(json.dumps(kunci, sort_keys=True).encode()).hexdigest()
+
+
+class DecisionCache:
+    def __init__(self, max_entries=CACHE_MAKS, ttl=CACHE_TTL_DETIK, path=None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # fingerprint -> (waktu_simpan, keputusan)
+        self._lock = threading.Lock()  # Satu cache dipakai bersama beberapa pipeline (thread)
+        if path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                for key, (saved_at, value) in json.load(f).items():
+                    self._data[key] = (saved_at, value)
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            pass
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._data, f)
+        os.replace(tmp, self.path)
+
+    def get(self, key):
+        """Keputusan tersimpan (salinan) atau None jika tidak ada / kadaluarsa."""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        item = self._data.get(key)
+        if item is not None and self.clock() - item[0] <= self.ttl:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(item[1])
+        if item is not None:
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, decision):
+        with self._lock:
+            self._data[key] = (self.clock(), copy.deepcopy(decision))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._data),
+        }
@@ -0,0 +1,169 @@
+"""
+Klien LLM (chat completions, kompatibel OpenAI/Together) dengan mode streaming.
+
+Respons dibaca sebagai server-sent events dan teksnya dipindai secara inkremental
+dengan parser yang paham kurung kurawal & string JSON. Begitu objek JSON pertama
+lengkap, koneksi ditutup: sisa penjelasan dari model tidak perlu ditunggu (dan tidak
+dibayar). Balasan `{}` ("tidak ada trade") langsung dikembalikan, dan field yang
+jelas tidak valid (Tipe/Entry/SL/TP) membuat stream dihentikan lebih awal.
+"""
+import json
+import re
+
+import http_client
+import metrics
+
+# --- KONFIGURASI ---
+LLM_API_URL = "https://api.together.ai/v1/chat/completions"
+LLM_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
+LLM_TIMEOUT = 45
+TIPE_VALID = ("BUY LIMIT", "SELL LIMIT")
+FIELD_ANGKA = ("Entry", "SL", "TP")
+
+_RE_TIPE = re.compile(r'"Tipe"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_RE_ANGKA = {f: re.compile(r'"%s"\s*:\s*([^,}\s]+)[,}\s]' % f) for f in FIELD_ANGKA}
+
+
+class InvalidSignalError(ValueError):
+    """Field sinyal yang sedang di-stream sudah pasti tidak valid."""
+
+
+class JsonObjectScanner:
+    """
+    Menemukan objek JSON top-level pertama dari teks yang datang bertahap.
+    `feed(teks)` mengembalikan string objek lengkap begitu kurung penutupnya diterima.
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+
+    def feed(self, text):
+        for ch in text:
+            if not self.started:
+                if ch != "{":
+                    continue
+                self.started = True
+            self.buffer.append(ch)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return "".join(self.buffer)
+        return None
+
+    def partial(self):
+        return "".join(self.buffer)
+
+
+def check_partial_fields(partial):
+    """Validasi field yang sudah lengkap di objek parsial; raise InvalidSignalError jika salah."""
+    m = _RE_TIPE.search(partial)
+    if m and m.group(1) not in TIPE_VALID:
+        raise InvalidSignalError(f"Tipe tidak valid: {m.group(1)}")
+    for field, pattern in _RE_ANGKA.items():
+        m = pattern.search(partial)
+        if m:
+            try:
+                float(m.group(1).strip('"'))
+            except ValueError:
+                raise InvalidSignalError(f"{field} bukan angka: {m.group(1)}")
+
+def validate_signal(obj):
+    """Sinyal lengkap yang valid, {} untuk 'tidak ada trade', atau raise InvalidSignalError."""
+    if not isinstance(obj, dict):
+        raise InvalidSignalError("Respons bukan objek JSON")
+    if not obj:
+        return {}
+    if obj.get("Tipe") not in TIPE_VALID:
+        raise InvalidSignalError(f"Tipe tidak valid: {obj.get('Tipe')}")
+    for field in FIELD_ANGKA:
+        nilai = obj.get(field)
+        try:
+            if isinstance(nilai, bool):
+                raise TypeError
+            obj[field] = float(nilai)
+        except (TypeError, ValueError):
+            raise InvalidSignalError(f"{field} tidak ada / bukan angka: {nilai}")
+    return obj
+
+
+def _iter_sse_content(response):
+    # Potongan teks 'delta.content' dari stream SSE chat completions
+    for raw in response.iter_lines(decode_unicode=True):
+        if not raw or not raw.startswith("data:"):
+            continue
+        payload = raw[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+        choices = chunk.get("choices") or []
+        if choices:
+            delta = choices[0].get("delta") or {}
+            if delta.get("content"):
+                yield delta["content"]
+
+
+def stream_signal(prompt, api_key, model=LLM_MODEL, url=LLM_API_URL, temperature=0.7, timeout=LLM_TIMEOUT, cancel_event=None):
+    """
+    Mengirim prompt dalam mode streaming. Mengembalikan (sinyal, teks_yang_diterima);
+    sinyal berupa dict valid, {} (model memutuskan tidak ada trade), atau None jika respons
+    tidak bisa dipakai (JSON rusak / terpotong / tidak ada / tidak valid, atau dibatalkan).
+    None jangan di-cache sebagai keputusan. Error jaringan dilempar ke pemanggil. `cancel_event` (threading.Event) opsional
+    untuk menghentikan stream dari luar.
+    """
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    body = {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": temperature, "stream": True}
+
+    breaker = http_client.get_breaker(url)
+    if not breaker.allow():
+        raise http_client.CircuitOpenError(f"Circuit terbuka untuk {url}, request dilewati")
+    scanner = JsonObjectScanner()
+    diterima = []
+    try:
+        with http_client.get_session().post(url, headers=headers, json=body, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            for text in _iter_sse_content(response):
+                diterima.append(text)
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                obj_text = scanner.feed(text)
+                if obj_text is not None:
+                    # Objek pertama lengkap: tutup koneksi, sisa token tidak dibaca
+                    breaker.success()
+                    return validate_signal(json.loads(obj_text)), "".join(diterima)
+                if scanner.started:
+                    check_partial_fields(scanner.partial())
+        breaker.success()
+    except InvalidSignalError as e:
+        breaker.success()
+        metrics.LLM_PARSE_FAILURES.inc(alasan="tidak_valid", model=model)
+        print(f"❌ Sinyal dari LLM tidak valid, stream dihentikan: {e}")
+        return None, "".join(diterima)
+    except json.JSONDecodeError:
+        breaker.success()
+        metrics.LLM_PARSE_FAILURES.inc(alasan="json_rusak", model=model)
+        return None, "".join(diterima)
+    except Exception:
+        breaker.failure()
+        raise
+    if cancel_event is None or not cancel_event.is_set():
+        # Stream selesai tanpa objek JSON lengkap (dibatalkan dari luar tidak dihitung)
+        metrics.LLM_PARSE_FAILURES.inc(alasan="json_terpotong" if scanner.started else "tanpa_json", model=model)
+    return None, "".join(diterima)
@@ -0,0 +1,126 @@
+"""
+Ensemble beberapa model / endpoint LLM untuk satu prompt yang sama.
+
+Semua backend dipanggil bersamaan (stream_signal di thread, dikoordinasi asyncio)
+dengan satu batas waktu keseluruhan. Dua mode:
+
+- MODE_PERTAMA : sinyal valid pertama menang, stream lain dihentikan lewat cancel_event.
+                 "Tidak ada trade" ({}) baru menang jika sudah mayoritas backend menjawab {}.
+- MODE_VOTING  : arah (Tipe / tidak ada trade) dipilih mayoritas backend; level
+                 Entry/SL/TP = median dari kelompok pemenang. Selesai lebih awal begitu
+                 satu pilihan sudah pasti mayoritas.
+
+Tanpa pemenang sebelum batas waktu (hanya jawaban minoritas) hasilnya None, sama seperti
+gagal menghubungi LLM, supaya tidak di-cache sebagai keputusan "tidak ada trade".
+
+Latensi jadi ditentukan backend sehat yang tercepat, bukan yang paling lambat.
+Backend berupa dict: {"model": ..., "url": ..., "api_key": ...} (url/api_key opsional).
+"""
+import asyncio
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_client
+
+# --- KONFIGURASI ---
+MODE_PERTAMA = "first"
+MODE_VOTING = "voting"
+ENSEMBLE_DEADLINE = 20.0  # detik, batas waktu keseluruhan
+TIDAK_ADA_TRADE = "NO TRADE"
+
+# Thread sendiri (bukan executor bawaan asyncio) supaya asyncio.run tidak ikut menunggu
+# stream yang sudah dibatalkan / lewat batas waktu
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-ensemble")
+
+
+def _vote(sinyal):
+    return sinyal.get("Tipe") if sinyal else TIDAK_ADA_TRADE
+
+def consensus(jawaban):
+    """
+    Hasil voting dari list (nama_backend, sinyal). Mengembalikan sinyal gabungan,
+    atau {} jika pemenangnya 'tidak ada trade' / tidak ada mayoritas.
+    """
+    if not jawaban:
+        return {}
+    suara = Counter(_vote(s) for _, s in jawaban)
+    pilihan, jumlah = suara.most_common(1)[0]
+    if pilihan == TIDAK_ADA_TRADE or jumlah * 2 <= len(jawaban):
+        return {}
+    kelompok = [s for _, s in jawaban if _vote(s) == pilihan]
+    hasil = dict(kelompok[0])
+    for field in llm_client.FIELD_ANGKA:
+        hasil[field] = float(statistics.median(s[field] for s in kelompok))
+    hasil["Probabilitas"] = float(statistics.mean(float(s.get("Probabilitas", 0.0) or 0.0) for s in kelompok))
+    hasil["Alasan"] = f"{hasil.get('Alasan', '')} (konsensus {jumlah}/{len(jawaban)} model)".strip()
+    return hasil
+
+
+def _nama(backend):
+    return backend.get("name") or backend["model"]
+
+def _panggil(prompt, backend, default_url, default_key, timeout, cancel_event):
+    sinyal, _ = llm_client.stream_signal(
+        prompt, backend.get("api_key") or default_key, model=backend["model"],
+        url=backend.get("url") or default_url, timeout=timeout, cancel_event=cancel_event)
+    if sinyal is None and not cancel_event.is_set():
+        # Respons rusak / tidak valid dihitung gagal, bukan suara "tidak ada trade"
+        raise llm_client.InvalidSignalError("respons tidak bisa dijadikan sinyal")
+    return sinyal
+
+
+async def ensemble_signal_async(prompt, backends, mode=MODE_PERTAMA, deadline=ENSEMBLE_DEADLINE,
+                                default_url=llm_client.LLM_API_URL, default_key=None):
+    """
+    Mengembalikan (sinyal, laporan). Sinyal None jika belum ada pemenang sebelum batas
+    waktu (semua gagal / timeout, atau jawaban yang masuk belum mayoritas).
+    """
+    loop = asyncio.get_running_loop()
+    mulai = time.monotonic()
+    cancel_event = threading.Event()
+    tasks = {}
+    for backend in backends:
+        fut = loop.run_in_executor(_executor, _panggil, prompt, backend, default_url, default_key, deadline, cancel_event)
+        tasks[fut] = _nama(backend)
+
+    jawaban = []  # (nama, sinyal) sesuai urutan selesai
+    laporan = {"mode": mode, "backend": len(backends), "jawaban": {}, "gagal": {}}
+    pemenang = None
+    pending = set(tasks)
+    mayoritas = len(backends) // 2 + 1
+    while pending and pemenang is None:
+        sisa = deadline - (time.monotonic() - mulai)
+        if sisa <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=sisa, return_when=asyncio.FIRST_COMPLETED)
+        for fut in done:
+            nama = tasks[fut]
+            try:
+                sinyal = fut.result()
+            except Exception as e:
+                laporan["gagal"][nama] = str(e)
+                continue
+            jawaban.append((nama, sinyal))
+            laporan["jawaban"][nama] = round(time.monotonic() - mulai, 3)
+        suara = Counter(_vote(s) for _, s in jawaban)
+        if mode == MODE_PERTAMA:
+            valid = [s for _, s in jawaban if s]
+            if valid:
+                pemenang = valid[0]
+            elif suara[TIDAK_ADA_TRADE] >= mayoritas:
+                pemenang = {}
+        elif suara and suara.most_common(1)[0][1] >= mayoritas:
+            pemenang = consensus(jawaban)
+
+    cancel_event.set()  # Stream yang masih berjalan berhenti di potongan berikutnya
+    laporan["batal"] = [tasks[f] for f in pending]
+    laporan["durasi"] = round(time.monotonic() - mulai, 3)
+    return pemenang, laporan
+
+
+def ensemble_signal(prompt, backends, mode=MODE_PERTAMA, deadline=ENSEMBLE_DEADLINE,
+                    default_url=llm_client.LLM_API_URL, default_key=None):
+    return asyncio.run(ensemble_signal_async(prompt, backends, mode, deadline, default_url, default_key))
@@ -0,0 +1,272 @@
+"""
+Instrumentasi bawaan: counter, histogram durasi per tahap, log JSONL terstruktur, dan
+hook cProfile untuk satu iterasi.
+
+- span("tahap")      : context manager; durasi masuk histogram bot_stage_seconds{stage=...}
+                       dan (jika log aktif) satu baris {"event": "span", ...} di METRICS_LOG_FILE
+- COUNTER.inc(...)   : retry HTTP, rate limit, parse LLM gagal, penolakan RR, hasil sinyal
+- SIGNAL_LATENCY     : histogram latensi candle tutup -> sinyal
+- start_http_server(): endpoint teks gaya Prometheus di http://127.0.0.1:<port>/metrics;
+                       GET /profile meminta iterasi berikutnya diprofil
+- profile_iteration(): cProfile untuk satu iterasi jika diminta (endpoint /profile,
+                       request_profile(), atau file PROFILE_TRIGGER_FILE ada)
+
+Registry hanya di memori dan aman dipakai lintas thread (pipeline_engine.py). Log JSONL
+mati sampai configure(log_file=...) dipanggil, jadi replay/sweep tidak menulis apa pun.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- KONFIGURASI ---
+METRICS_PORT = 9108  # None = endpoint tidak dijalankan
+METRICS_HOST = "127.0.0.1"
+METRICS_LOG_FILE = "metrics_log.jsonl"
+PROFILE_DIR = "profiles"
+PROFILE_TRIGGER_FILE = "profile.trigger"  # Buat file ini (mis. `touch profile.trigger`) untuk memprofil satu iterasi
+PROFILE_TOP = 30  # Jumlah fungsi teratas di ringkasan .txt
+
+BUCKET_TAHAP = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKET_LATENSI = (1, 2, 5, 10, 15, 20, 30, 45, 60, 120, 300)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key, extra=()):
+    pasangan = list(key) + list(extra)
+    if not pasangan:
+        return ""
+    isi = ",".join(f'{k}="{_escape(v)}"' for k, v in pasangan)
+    return "{" + isi + "}"
+
+def _format_value(v):
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Counter:
+    def __init__(self, name, help_):
+        self.name = name
+        self.help = help_
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def get(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def render(self):
+        baris = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self.values.items()):
+                baris.append(f"{self.name}{_format_labels(key)} {_format_value(v)}")
+        return baris
+
+
+class Histogram:
+    def __init__(self, name, help_, buckets):
+        self.name = name
+        self.help = help_
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # label -> [jumlah per bucket (non-kumulatif) + +Inf, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        pos = next((i for i, b in enumerate(self.buckets) if value <= b), len(self.buckets))
+        with self._lock:
+            seri = self.values.get(key)
+            if seri is None:
+                seri = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            seri[0][pos] += 1
+            seri[1] += value
+            seri[2] += 1
+
+    def snapshot(self, **labels):
+        """{"count", "sum"} untuk satu kombinasi label (mis. untuk ringkasan benchmark)."""
+        seri = self.values.get(_label_key(labels))
+        return {"count": seri[2], "sum": seri[1]} if seri else {"count": 0, "sum": 0.0}
+
+    def render(self):
+        baris = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (per_bucket, total, count) in sorted(self.values.items()):
+                kumulatif = 0
+                for batas, n in zip(self.buckets + ("+Inf",), per_bucket):
+                    kumulatif += n
+                    baris.append(f"{self.name}_bucket{_format_labels(key, [('le', batas)])} {kumulatif}")
+                baris.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                baris.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return baris
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help_):
+        return self.metrics.setdefault(name, Counter(name, help_))
+
+    def histogram(self, name, help_, buckets=BUCKET_TAHAP):
+        return self.metrics.setdefault(name, Histogram(name, help_, buckets))
+
+    def render(self):
+        baris = []
+        for metric in self.metrics.values():
+            baris += metric.render()
+        return "\n".join(baris) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("bot_stage_seconds", "Durasi tiap tahap iterasi (detik)", BUCKET_TAHAP)
+SIGNAL_LATENCY = REGISTRY.histogram("bot_signal_latency_seconds", "Latensi candle tutup -> sinyal (detik)", BUCKET_LATENSI)
+HTTP_RETRIES = REGISTRY.counter("bot_http_retries_total", "Percobaan HTTP yang gagal dan diulang, per host")
+HTTP_FAILURES = REGISTRY.counter("bot_http_failures_total", "Request HTTP yang gagal setelah semua percobaan, per host")
+CIRCUIT_OPEN = REGISTRY.counter("bot_circuit_open_total", "Request yang ditolak karena circuit breaker terbuka, per host")
+RATE_LIMIT_HITS = REGISTRY.counter("bot_rate_limit_hits_total", "Respons 'kredit habis' API & antrean token bucket")
+LLM_PARSE_FAILURES = REGISTRY.counter("bot_llm_parse_failures_total", "Respons LLM yang tidak bisa dijadikan sinyal")
+LLM_DECISIONS = REGISTRY.counter("bot_llm_decisions_total", "Keputusan LLM per sumber (llm/cache/gagal)")
+RR_REJECTIONS = REGISTRY.counter("bot_rr_rejections_total", "Sinyal ditolak karena RR di bawah minimum")
+SIGNALS_CREATED = REGISTRY.counter("bot_signals_created_total", "Sinyal baru yang diterima")
+SIGNAL_OUTCOMES = REGISTRY.counter("bot_signal_outcomes_total", "Sinyal yang mencapai status akhir, per hasil")
+
+
+# --- log JSONL ---
+
+_log_file = None
+_log_lock = threading.Lock()
+
+def configure(log_file=None):
+    """Mengaktifkan (path) atau mematikan (None) log JSONL."""
+    global _log_file
+    _log_file = log_file
+
+def log_event(event, **fields):
+    if _log_file is None:
+        return
+    baris = json.dumps({"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event, **fields},
+                       default=str, ensure_ascii=False)
+    with _log_lock:
+        with open(_log_file, "a", encoding="utf-8") as f:
+            f.write(baris + "\n")
+
+
+def record_span(stage, durasi, ok=True, **fields):
+    """Mencatat durasi (detik) satu tahap yang diukur sendiri oleh pemanggil."""
+    STAGE_SECONDS.observe(durasi, stage=stage)
+    log_event("span", stage=stage, durasi_ms=round(durasi * 1000, 3), ok=ok, **fields)
+
+@contextmanager
+def span(stage, **fields):
+    """Mengukur satu tahap. Durasi tetap dicatat walau tahap melempar exception."""
+    mulai = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        record_span(stage, time.perf_counter() - mulai, ok, **fields)
+
+
+# --- cProfile ---
+
+_profile_requested = threading.Event()
+_profile_lock = threading.Lock()  # cProfile hanya bisa aktif satu per proses
+
+def request_profile():
+    """Iterasi berikutnya (yang memanggil profile_iteration) akan diprofil."""
+    _profile_requested.set()
+
+def _profile_diminta():
+    if _profile_requested.is_set():
+        _profile_requested.clear()
+        return True
+    if os.path.exists(PROFILE_TRIGGER_FILE):
+        try:
+            os.remove(PROFILE_TRIGGER_FILE)
+        except OSError:
+            return False  # Dihapus proses/pipeline lain lebih dulu
+        return True
+    return False
+
+@contextmanager
+def profile_iteration(label="iterasi"):
+    """
+    Jika diminta, memprofil blok ini dengan cProfile: PROFILE_DIR/<label>-<waktu>.prof
+    (untuk snakeviz/pstats) + ringkasan .txt fungsi teratas. Jika tidak, tanpa overhead.
+    """
+    if not _profile_diminta() or not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        nama = f"{label}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}".replace("/", "_").replace(" ", "_")
+        path = os.path.join(PROFILE_DIR, nama + ".prof")
+        profiler.dump_stats(path)
+        teks = io.StringIO()
+        pstats.Stats(profiler, stream=teks).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        with open(os.path.join(PROFILE_DIR, nama + ".txt"), "w", encoding="utf-8") as f:
+            f.write(teks.getvalue())
+        log_event("profile", label=label, path=path)
+        print(f"🔬 Profil iterasi disimpan: {path}")
+    finally:
+        _profile_lock.release()
+
+
+# --- endpoint HTTP ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, tipe = REGISTRY.render().encode(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.split("?")[0] == "/profile":
+            request_profile()
+            body, tipe = b"iterasi berikutnya akan diprofil\n", "text/plain; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", tipe)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Tidak mengotori output bot
+
+
+def start_http_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Menjalankan endpoint di thread daemon. Mengembalikan server (None jika port None / sudah dipakai)."""
+    if port is None:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"⚠️  Endpoint metrics tidak bisa dijalankan di {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    print(f"📊 Metrics tersedia di http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,184 @@
+"""
+Engine multi-instrumen: banyak pipeline (symbol, interval) dalam satu proses asyncio.
+
+Setiap pipeline punya state sendiri (bot.LoopState: SignalBook sinyal terbuka, candle
+terakhir yang diproses, mesin indikator per instrumen) dan coroutine sendiri yang tidur
+sampai candle interval-nya tutup. Yang dipakai bersama:
+
+- http_client (session & circuit breaker) dan token bucket kredit TwelveData
+- candle store (file per instrumen), jurnal + snapshot sinyal, file agregat, cache LLM
+- candle 1min untuk drill-down intrabar: satu intrabar.FineCandles (dengan lock) per simbol
+- id sinyal: satu penghitung global, dialokasikan bersamaan dengan penulisan jurnal
+
+process_bar() yang sama dengan bot tunggal dijalankan di thread (IO & LLM bersifat
+blocking); panggilan LLM dibatasi LLM_MAKS_PARALEL lewat semaphore, jadi jumlah instrumen
+dibatasi anggaran API, bukan jumlah proses.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import candle_store
+import intrabar
+import llm_cache
+import metrics
+import signal_stats
+import Signal_Trading_LLM as bot
+from scheduler import BarScheduler, next_bar_close
+
+# --- KONFIGURASI ---
+PIPELINES = [
+    (bot.SYMBOL, bot.INTERVAL),
+    # ("ETH/USD:Binance", "15min"),
+    # ("XAU/USD", "1h"),
+]
+LLM_MAKS_PARALEL = 4  # Panggilan LLM yang boleh berjalan bersamaan di semua pipeline
+GRACE_DETIK = 2.0  # Jeda setelah candle tutup sebelum request pertama
+RETRY_DELAYS = (2, 3, 5, 8, 13, 20, 30)
+
+
+class SharedIds:
+    """Penghitung id sinyal bersama; id = posisi sinyal di jurnal/snapshot."""
+
+    def __init__(self, next_id):
+        self.next_id = next_id
+        self.lock = threading.Lock()
+
+
+class PipelineState(bot.LoopState):
+    def __init__(self, ids, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ids = ids
+
+    def add_signal(self, sinyal):
+        # Alokasi id & penulisan jurnal di bawah satu lock, supaya urutan event "new" = urutan id
+        with self.ids.lock:
+            idx = self.ids.next_id
+            self.ids.next_id += 1
+            self.book.add(idx, sinyal)
+            bot.save_signal_event(idx, sinyal, baru=True, journal_file=self.journal_file)
+        return idx
+
+
+class Pipeline:
+    def __init__(self, state, llm_gate, get_signal=None):
+        self.state = state
+        self.llm_gate = llm_gate
+        self.get_signal_fn = get_signal or bot.get_signal_from_llm
+        self.scheduler = BarScheduler(state.interval, grace=GRACE_DETIK)  # Hanya untuk catatan latensi
+        self.llm_menunggu = 0.0
+
+    @property
+    def name(self):
+        return f"{self.state.symbol} {self.state.interval}"
+
+    def get_signal(self, prompt):
+        # Dipanggil dari thread process_bar; antre jika LLM_MAKS_PARALEL panggilan sedang berjalan
+        mulai = time.perf_counter()
+        with self.llm_gate:
+            menunggu = time.perf_counter() - mulai
+            self.llm_menunggu += menunggu
+            metrics.record_span("antre_llm", menunggu, symbol=self.state.symbol, interval=self.state.interval)
+            return self.get_signal_fn(prompt)
+
+    async def poll_new_bar(self, min_datetime_ts):
+        """Seperti BarScheduler.poll_new_bar, tetapi menunggu dengan asyncio.sleep."""
+        data = []
+        for attempt in range(len(RETRY_DELAYS) + 1):
+            data = await asyncio.to_thread(bot.get_market_data, self.state.symbol, self.state.interval)
+            if data and (min_datetime_ts is None or candle_store.parse_datetime(data[0]["datetime"]) >= min_datetime_ts):
+                return data
+            if attempt < len(RETRY_DELAYS):
+                print(f"⏳ [{self.name}] Candle baru belum muncul. Coba lagi dalam {RETRY_DELAYS[attempt]} detik...")
+                await asyncio.sleep(RETRY_DELAYS[attempt])
+        return data
+
+    def process_bar(self, data):
+        # cProfile hanya melihat thread tempat ia diaktifkan, jadi profil diambil di thread worker
+        with metrics.profile_iteration(self.name):
+            return bot.process_bar(self.state, data, datetime.now(timezone.utc), None, self.get_signal)
+
+    async def step(self, close_ts=None):
+        """Satu iterasi: ambil candle terbaru lalu process_bar. Mengembalikan ringkasan (atau None)."""
+        data = await self.poll_new_bar(close_ts)
+        if not data:
+            print(f"❗ [{self.name}] Data pasar tidak tersedia. Menunggu candle berikutnya...")
+            return None
+        ringkasan = await asyncio.to_thread(self.process_bar, data)
+        if not ringkasan["diproses"]:
+            return ringkasan
+        latency = None
+        if ringkasan["sinyal_baru"] is not None and close_ts is not None:
+            self.scheduler.bar_close_ts = close_ts
+            latency = self.scheduler.record_signal_latency()
+            print(f"⏱️ [{self.name}] Latensi candle tutup -> sinyal: {latency:.1f} detik")
+        bot.record_bar_metrics(self.state, ringkasan, latency)
+        return ringkasan
+
+    async def run(self, stop_event):
+        close_ts = None
+        while not stop_event.is_set():
+            try:
+                with metrics.span("iterasi", symbol=self.state.symbol, interval=self.state.interval):
+                    await self.step(close_ts)
+            except Exception as e:
+                # Satu instrumen yang gagal tidak boleh menghentikan pipeline lain
+                print(f"❌ [{self.name}] Iterasi gagal: {e}")
+            close_ts = next_bar_close(time.time(), self.state.interval)
+            tunggu = close_ts + GRACE_DETIK - time.time()
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=max(tunggu, 0))
+            except asyncio.TimeoutError:
+                pass
+
+
+def build_pipelines(pipelines=PIPELINES, signals=None, llm_maks_paralel=LLM_MAKS_PARALEL, get_signal=None,
+                    journal_file=None, stats=None, decision_cache=None, fine_candles=bot.INTRABAR_DRILLDOWN):
+    """
+    Pipeline untuk setiap (symbol, interval), berbagi id, jurnal, agregat dan cache LLM.
+    Histori sinyal dibaca sekali lalu dibagi per instrumen.
+    """
+    signals = bot.load_signals() if signals is None else signals
+    if stats is None:
+        stats = signal_stats.open_stats(signals, bot.AGGREGATES_FILE, bot.JSON_FILE, bot.JOURNAL_FILE)
+    if decision_cache is None:
+        decision_cache = llm_cache.DecisionCache(max_entries=llm_cache.CACHE_MAKS * len(pipelines),
+                                                 ttl=bot.LLM_CACHE_TTL_DETIK, path=bot.LLM_CACHE_FILE)
+    ids = SharedIds(len(signals))
+    llm_gate = threading.BoundedSemaphore(llm_maks_paralel)
+    # Pipeline dengan simbol sama (interval berbeda) memakai store 1min yang sama
+    fine = {symbol: intrabar.FineCandles(symbol, fetch_values=bot.fetch_time_series)
+            for symbol, _ in pipelines} if fine_candles else {}
+    hasil = []
+    for symbol, interval in pipelines:
+        state = PipelineState(
+            ids, bot.build_book(signals, symbol, interval), decision_cache, journal_file=journal_file,
+            fine_candles=fine.get(symbol), stats=stats, symbol=symbol, interval=interval)
+        hasil.append(Pipeline(state, llm_gate, get_signal))
+    return hasil
+
+
+async def run_engine(pipelines, stop_event=None):
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    # Setiap pipeline memegang satu thread selama process_bar (termasuk saat antre LLM)
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=len(pipelines) + LLM_MAKS_PARALEL,
+                                                 thread_name_prefix="pipeline"))
+    await asyncio.gather(*(p.run(stop_event) for p in pipelines))
+
+
+def main():
+    metrics.configure(bot.METRICS_LOG_FILE)
+    metrics.start_http_server(bot.METRICS_PORT)
+    pipelines = build_pipelines()
+    print(f"🚀 Engine berjalan untuk {len(pipelines)} instrumen: {', '.join(p.name for p in pipelines)} "
+          f"(LLM paralel maks. {LLM_MAKS_PARALEL})")
+    try:
+        asyncio.run(run_engine(pipelines))
+    except KeyboardInterrupt:
+        print("\n🛑 Engine dihentikan.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Penyusun prompt yang hemat token untuk format_prompt.
+
+- Preamble statis (peran, aturan, pelajaran, format output) dibangun sekali lalu dipakai ulang
+- Deret candle dikodekan ringkas: harga ditulis sebagai selisih terhadap satu harga basis
+  (basis & jumlah desimal mengikuti besarnya harga, lihat price_scale), jam saja
+  (tanggal hanya saat berganti), bar terbaru berupa close, bar yang lebih lama
+  diringkas menjadi OHLC per jam
+- Histori sinyal ditulis sebagai JSON minified satu baris per sinyal, Alasan dipotong
+- Semua dikemas ke anggaran token yang bisa diatur, dengan laporan jumlah token per bagian
+
+Kontrak output ke LLM (objek JSON Tipe/Entry/SL/TP/Probabilitas/Alasan) tidak berubah.
+"""
+import json
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+
+# --- KONFIGURASI ---
+TOKEN_BUDGET = 3000
+CANDLES_RAW_MAKS = 100  # Maksimal bar terbaru yang ditulis sebagai close per bar
+BAR_PER_RINGKASAN = 4  # 4 x 15min = ringkasan per jam
+ALASAN_MAKS = 80  # Karakter Alasan per sinyal histori
+FIELD_HISTORI = ("Tipe", "Entry", "SL", "TP", "Hasil", "Alasan")
+
+_RE_TOKEN = re.compile(r"\d{1,3}|[A-Za-z]+|[^\sA-Za-z\d]")
+
+
+@lru_cache(maxsize=16384)
+def estimate_tokens(text):
+    """
+    Perkiraan jumlah token ala BPE (Llama 3 / tiktoken): angka dipecah per 3 digit,
+    kata panjang ~5 karakter per token, tanda baca satu token.
+    """
+    total = 0
+    for piece in _RE_TOKEN.findall(text):
+        total += (len(piece) + 4) // 5 if piece[0].isalpha() else 1
+    return total
+
+
+@lru_cache(maxsize=8)
+def build_preamble(minimum_rr):
+    # Bagian statis: sama di setiap prompt, jadi dibangun sekali
+    return f"""Anda adalah seorang analis trading profesional yang menggunakan konsep ICT & Smart Money Concepts (SMC).
+
+## Tugas
+Berdasarkan data pasar dan histori sinyal di bawah, berikan sinyal trading berikutnya.
+
+**Aturan Analisis & Output:**
+1. **Prioritaskan sinyal yang searah dengan Tren H1**, kecuali ada Change of Character (CHoCH) yang valid.
+2. Gunakan konsep SMC/ICT: liquidity sweep, displacement, Fair Value Gap (FVG), order block.
+3. **Risk/Reward Ratio (RR) minimal {minimum_rr}:1.** Hitung dengan cermat.
+4. `Entry`, `TP`, `SL` harus pada level yang masuk akal dan belum dilewati harga saat ini.
+5. Jika tidak ada peluang yang jelas dan berisiko rendah, kembalikan JSON kosong: `{{}}`
+6. Output **HANYA JSON**, tanpa penjelasan lain:
+
+{{"Tipe": "BUY LIMIT" atau "SELL LIMIT", "Entry": float, "SL": float, "TP": float, "Probabilitas": float, "Alasan": "string pendek setup SMC/ICT"}}
+
+**Pelajaran dari sinyal gagal:**
+- `invalid_tp_hit_first`: Entry terlalu jauh dan TP terlalu dekat; harga mencapai TP sebelum order terisi. HINDARI.
+- `expired`: pasar sideways, tidak ada momentum ke Entry. Hindari sinyal tanpa pergerakan yang jelas.
+- `SL`: periksa apakah sinyal melawan tren H1 atau salah identifikasi order block.
+"""
+
+
+def price_scale(close):
+    """
+    (basis, desimal) untuk harga `close`: basis dibulatkan ke 3 digit signifikan (BTC ~60000 ->
+    kelipatan 100) dan selisih ditulis dengan ~6 digit signifikan, minimal 2 desimal.
+    Harga di bawah 1.0 (forex, altcoin) jadi tidak kehilangan presisi.
+    """
+    close = float(close)
+    if not np.isfinite(close) or close == 0:
+        return 0.0, 2
+    orde = int(np.floor(np.log10(abs(close))))
+    return float(np.round(close, 2 - orde)), max(2, 5 - orde)
+
+def _fmt_delta(value, base, desimal=2):
+    text = f"{value - base:+.{desimal}f}"
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+@lru_cache(maxsize=1024)
+def _label_tanggal(hari):
+    return datetime.fromtimestamp(hari * 86400, tz=timezone.utc).strftime("%m-%d")
+
+def _label_waktu(ts, tanggal_terakhir):
+    hari, detik = divmod(int(ts), 86400)
+    tanggal = _label_tanggal(hari)
+    jam = f"{detik // 3600:02d}:{detik % 3600 // 60:02d}"
+    if tanggal != tanggal_terakhir:
+        return f"{tanggal} {jam}", tanggal
+    return jam, tanggal
+
+def encode_candles(records, n_raw, n_ringkasan, base, bar_per_ringkasan=BAR_PER_RINGKASAN, desimal=2):
+    """
+    Teks deret harga: `n_ringkasan` bar OHLC ringkasan (masing-masing `bar_per_ringkasan`
+    candle) sebelum `n_raw` candle terakhir, lalu close `n_raw` candle terakhir.
+    """
+    baris = []
+    tanggal = None
+    raw = records[len(records) - n_raw:] if n_raw else records[:0]
+    lama = records[:len(records) - n_raw]
+    if n_ringkasan:
+        lama = lama[max(len(lama) - n_ringkasan * bar_per_ringkasan, 0):]
+        baris.append(f"Ringkasan lama (per {bar_per_ringkasan} bar, O/H/L/C):")
+        for i in range(0, len(lama), bar_per_ringkasan):
+            g = lama[i:i + bar_per_ringkasan]
+            label, tanggal = _label_waktu(g["ts"][0], tanggal)
+            baris.append(f"{label} {_fmt_delta(g['open'][0], base, desimal)}/{_fmt_delta(g['high'].max(), base, desimal)}/"
+                         f"{_fmt_delta(g['low'].min(), base, desimal)}/{_fmt_delta(g['close'][-1], base, desimal)}")
+    if n_raw:
+        baris.append("Close per bar:")
+        for r in raw:
+            label, tanggal = _label_waktu(r["ts"], tanggal)
+            baris.append(f"{label} {_fmt_delta(r['close'], base, desimal)}")
+    return "\n".join(baris)
+
+def encode_history(signals, alasan_maks=ALASAN_MAKS):
+    baris = []
+    for s in signals:
+        item = {k: s.get(k) for k in FIELD_HISTORI if k in s}
+        if isinstance(item.get("Alasan"), str) and len(item["Alasan"]) > alasan_maks:
+            item["Alasan"] = item["Alasan"][:alasan_maks - 1] + "…"
+        baris.append(json.dumps(item, separators=(",", ":"), ensure_ascii=False))
+    return "\n".join(baris) if baris else "(belum ada)"
+
+
+def build_prompt(records, signals_lama, context, symbol, interval, minimum_rr,
+                 token_budget=TOKEN_BUDGET, raw_maks=CANDLES_RAW_MAKS, bar_per_ringkasan=BAR_PER_RINGKASAN):
+    """
+    Menyusun prompt dari `records` (array candle terurut naik, sampai waktu prompt),
+    histori sinyal, dan `context` (dict trend_h1, volatility_h1, support, resistance).
+    Mengembalikan (prompt, laporan) dengan laporan token per bagian.
+    """
+    preamble = build_preamble(minimum_rr)
+    base, desimal = price_scale(records["close"][-1]) if len(records) else (0.0, 2)
+    konteks = (f"## Pasar {symbol}\n"
+               f"Tren H1: {context['trend_h1']} | Volatilitas H1: {context['volatility_h1']} | "
+               f"Support (Daily Low): {context['support']} | Resistance (Daily High): {context['resistance']}\n")
+    if context.get("indikator"):
+        konteks += f"Indikator {interval}: {context['indikator']}\n"
+    histori = f"## {len(signals_lama)} sinyal terakhir & hasilnya\n{encode_history(signals_lama)}\n"
+    header_harga = f"## Harga {interval} (UTC, urut lama->baru), harga = {base:.{desimal}f} + nilai\n"
+
+    tetap = estimate_tokens(preamble) + estimate_tokens(konteks) + estimate_tokens(histori) + estimate_tokens(header_harga)
+    sisa = token_budget - tetap
+
+    # Bar terbaru sebagai close per bar, selama anggaran cukup
+    n_raw = 0
+    biaya_raw = estimate_tokens("Close per bar:")
+    tanggal = None
+    for r in records[::-1][:raw_maks]:
+        label, tanggal = _label_waktu(r["ts"], tanggal)
+        biaya = estimate_tokens(f"{label} {_fmt_delta(r['close'], base, desimal)}") + 1
+        if biaya_raw + biaya > sisa:
+            break
+        biaya_raw += biaya
+        n_raw += 1
+    sisa -= biaya_raw
+
+    # Bar yang lebih lama diringkas per jam, mundur dari yang terbaru
+    n_ringkasan = 0
+    lama = records[:len(records) - n_raw]
+    biaya_ringkasan = estimate_tokens("Ringkasan lama (per 4 bar, O/H/L/C):")
+    for i in range(len(lama), 0, -bar_per_ringkasan):
+        g = lama[max(i - bar_per_ringkasan, 0):i]
+        biaya = estimate_tokens(f"00:00 {_fmt_delta(g['open'][0], base, desimal)}/{_fmt_delta(g['high'].max(), base, desimal)}/"
+                                f"{_fmt_delta(g['low'].min(), base, desimal)}/{_fmt_delta(g['close'][-1], base, desimal)}") + 1
+        if biaya_ringkasan + biaya > sisa:
+            break
+        biaya_ringkasan += biaya
+        n_ringkasan += 1
+
+    harga = header_harga + encode_candles(records, n_raw, n_ringkasan, base, bar_per_ringkasan, desimal) + "\n"
+    prompt = "\n".join([preamble, konteks, harga, histori])
+
+    laporan = {
+        "preamble": estimate_tokens(preamble),
+        "konteks": estimate_tokens(konteks),
+        "harga": estimate_tokens(harga),
+        "histori": estimate_tokens(histori),
+        "total": estimate_tokens(prompt),
+        "budget": token_budget,
+        "candle_raw": n_raw,
+        "candle_ringkasan": n_ringkasan * bar_per_ringkasan,
+    }
+    return prompt, laporan
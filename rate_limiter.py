@@ -0,0 +1,145 @@
+"""
+Token bucket untuk kredit API TwelveData yang dipakai bersama oleh semua proses.
+
+State bucket (jumlah token, waktu update, proses live yang sedang menunggu) disimpan
+di file JSON kecil yang dikunci (flock / msvcrt) setiap kali dibaca-ubah-tulis, jadi
+bot live dan skrip backfill yang berjalan bersamaan berbagi satu anggaran kredit.
+
+Prioritas:
+- PRIORITAS_LIVE     : boleh memakai token sampai habis, dan menahan backfill selama menunggu
+- PRIORITAS_BACKFILL : hanya jalan jika tidak ada live yang menunggu dan token tersisa > cadangan
+
+Backfill tetap berjalan tepat di laju refill (batas kredit), bukan dengan jeda tetap.
+"""
+import json
+import os
+import time
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# --- KONFIGURASI ---
+LIMITER_FILE = "twelvedata_credits.json"
+CREDITS_PER_MENIT = 8  # Paket gratis TwelveData
+CADANGAN_LIVE = 1  # Token yang tidak boleh dipakai backfill
+LIVE_WAIT_TTL = 30.0  # Detik; penanda "live menunggu" dianggap basi setelah ini
+
+PRIORITAS_LIVE = 0
+PRIORITAS_BACKFILL = 1
+
+
+class FileLock:
+    """Lock eksklusif antar proses pada file `<path>.lock` (dipakai juga oleh signal_journal.py)."""
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+
+    def __enter__(self):
+        self.f = open(self.path, "a+")
+        if fcntl:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        else:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+        else:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        self.f.close()
+
+
+class TokenBucket:
+    def __init__(self, path=LIMITER_FILE, capacity=CREDITS_PER_MENIT, refill_per_sec=CREDITS_PER_MENIT / 60.0,
+                 cadangan=CADANGAN_LIVE, clock=time.time, sleep=time.sleep):
+        self.path = path
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.cadangan = cadangan
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = FileLock(path)
+
+    def _load(self, now):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {"tokens": float(self.capacity), "updated": now, "live_waiting": {}}
+        elapsed = max(0.0, now - state["updated"])
+        state["tokens"] = min(float(self.capacity), state["tokens"] + elapsed * self.refill_per_sec)
+        state["updated"] = now
+        state["live_waiting"] = {pid: ts for pid, ts in state.get("live_waiting", {}).items() if now - ts < LIVE_WAIT_TTL}
+        return state
+
+    def _save(self, state):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def try_acquire(self, credits=1, priority=PRIORITAS_LIVE):
+        """
+        Satu percobaan mengambil `credits` token. Mengembalikan 0 jika berhasil, atau
+        perkiraan detik yang perlu ditunggu sebelum mencoba lagi.
+        """
+        pid = str(os.getpid())
+        with self._lock:
+            now = self.clock()
+            state = self._load(now)
+            if priority == PRIORITAS_LIVE:
+                if state["tokens"] >= credits:
+                    state["tokens"] -= credits
+                    state["live_waiting"].pop(pid, None)
+                    self._save(state)
+                    return 0.0
+                state["live_waiting"][pid] = now
+                kurang = credits - state["tokens"]
+            else:
+                live_lain = [p for p in state["live_waiting"] if p != pid]
+                if not live_lain and state["tokens"] - credits >= self.cadangan:
+                    state["tokens"] -= credits
+                    self._save(state)
+                    return 0.0
+                kurang = credits + self.cadangan - state["tokens"]
+            self._save(state)
+        return max(kurang / self.refill_per_sec, 0.1)
+
+    def acquire(self, credits=1, priority=PRIORITAS_LIVE, timeout=None):
+        """Blok sampai token tersedia. Mengembalikan False jika `timeout` (detik) terlewati."""
+        mulai = self.clock()
+        antre = False
+        while True:
+            tunggu = self.try_acquire(credits, priority)
+            if tunggu == 0:
+                return True
+            if not antre:
+                antre = True
+                metrics.RATE_LIMIT_HITS.inc(sumber="token_bucket")
+            if timeout is not None and self.clock() + tunggu - mulai > timeout:
+                return False
+            self.sleep(tunggu)
+
+    def drain(self):
+        """Dipanggil saat API tetap membalas 'limit per menit': kosongkan bucket agar semua proses mundur."""
+        with self._lock:
+            state = self._load(self.clock())
+            state["tokens"] = 0.0
+            self._save(state)
+
+
+_default = None
+
+def get_limiter():
+    global _default
+    if _default is None:
+        _default = TokenBucket()
+    return _default
@@ -1,12 +1,21 @@
-import json
 import csv
 
+import signal_journal
+import signal_parquet
+import signal_stats
+import state_checkpoint
+
 # --- KONFIGURASI FILE ---
-# Pastikan nama file ini adalah file JSON Anda yang sudah final dan benar
-INPUT_JSON_FILE = "sinyal_trading.json" 
+# Snapshot JSON + jurnal append-only yang ditulis oleh bot
+INPUT_JSON_FILE = signal_journal.SNAPSHOT_FILE
+INPUT_JOURNAL_FILE = signal_journal.JOURNAL_FILE
+# Checkpoint bot yang watermark-nya diikutkan ke hasil compact (start ulang tetap cepat)
+STATE_FILE = state_checkpoint.STATE_FILE
 
 # Nama file CSV yang akan dibuat atau ditimpa
 OUTPUT_CSV_FILE = "sinyal_trading.csv" 
+# Export kolumnar bertipe, dipartisi per tanggal (lihat signal_parquet.py); None = tidak dibuat
+OUTPUT_PARQUET_DIR = signal_parquet.PARQUET_DIR
 
 
 def save_signals_csv(data):
@@ -18,16 +27,8 @@ def save_signals_csv(data):
         print("⚠️ Tidak ada data untuk disimpan ke CSV.")
         return
         
-    # Mengumpulkan semua kemungkinan nama kolom (keys) dari setiap sinyal
-    keys = set()
-    for d in data:
-        keys.update(d.keys())
-    
-    # Mengurutkan nama kolom agar konsisten
-    # Kolom penting ditaruh di depan
-    sorted_keys = sorted(list(keys))
-    preferred_order = ["Waktu", "Tipe", "Status", "Hasil", "Entry", "TP", "SL", "Probabilitas", "Alasan"]
-    final_keys = [key for key in preferred_order if key in sorted_keys] + [key for key in sorted_keys if key not in preferred_order]
+    # Urutan kolom konsisten: kolom penting di depan, sisanya alfabetis
+    final_keys = signal_journal.csv_columns(data)
 
     try:
         with open(OUTPUT_CSV_FILE, "w", newline='', encoding='utf-8') as f:
@@ -40,22 +41,31 @@ def save_signals_csv(data):
 
 
 def main():
-    """Fungsi utama untuk membaca JSON dan mengonversinya ke CSV."""
+    """
+    Fungsi utama: menggabungkan jurnal ke snapshot JSON (materialisasi view lengkap)
+    lalu mengonversinya ke CSV.
+    """
     print("🚀 Memulai proses konversi JSON ke CSV...")
     
     try:
-        with open(INPUT_JSON_FILE, "r") as f:
-            signals_data = json.load(f)
-        print(f"📖 Berhasil memuat {len(signals_data)} sinyal dari '{INPUT_JSON_FILE}'.")
-    except FileNotFoundError:
-        print(f"❌ ERROR: File '{INPUT_JSON_FILE}' tidak ditemukan.")
-        return
-    except json.JSONDecodeError:
-        print(f"❌ ERROR: File '{INPUT_JSON_FILE}' bukan format JSON yang valid.")
+        signals_data = signal_journal.compact(INPUT_JSON_FILE, INPUT_JOURNAL_FILE,
+                                              on_compacted=lambda lama, baru: state_checkpoint.restamp(lama, baru, STATE_FILE))
+        print(f"📖 Berhasil memuat {len(signals_data)} sinyal dari '{INPUT_JSON_FILE}' + '{INPUT_JOURNAL_FILE}'.")
+    except IOError as e:
+        print(f"❌ ERROR: Gagal memuat/menulis snapshot sinyal: {e}")
         return
         
     save_signals_csv(signals_data)
 
+    if OUTPUT_PARQUET_DIR and signals_data:
+        hasil = signal_parquet.export_signals(signals_data, OUTPUT_PARQUET_DIR)
+        print(f"🗂️ Parquet '{OUTPUT_PARQUET_DIR}': {hasil['ditulis']} partisi ditulis, {hasil['dilewati']} partisi tidak berubah"
+              + (f", {hasil['dibuang']} sinyal tanpa Waktu valid dilewati." if hasil['dibuang'] else "."))
+
+    # Compact mengubah versi snapshot + jurnal, jadi file agregat dashboard diselaraskan ulang
+    if signal_stats.refresh_file(snapshot_file=INPUT_JSON_FILE, journal_file=INPUT_JOURNAL_FILE) is not None:
+        print(f"📊 File agregat '{signal_stats.AGGREGATES_FILE}' diperbarui.")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Mode replay / simulasi untuk main loop Signal_Trading_LLM.
+
+Candle dibaca dari file rekaman (format candle_store), lalu setiap bar diproses dengan
+process_bar() yang sama persis dengan mode live (expiry, evaluasi, filter RR, jurnal),
+memakai jam simulasi (waktu tutup bar + REPLAY_LATENCY_DETIK) dan LLM pengganti:
+
+- file .json  : list teks respons berskrip, dipakai bergiliran
+- file .jsonl : respons rekaman {"prompt_sha1": ..., "response": ...}, dicocokkan per prompt
+- None        : setiap prompt dijawab `{}` (tidak ada trade)
+
+Tidak ada sleep maupun request jaringan, jadi berminggu-minggu candle 15min selesai
+dalam hitungan detik. Hasil (jurnal & ringkasan) ditulis ke REPLAY_OUTPUT_DIR.
+"""
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+
+import candle_store
+import indicators
+import intrabar
+import llm_cache
+import llm_client
+import signal_journal
+import signal_stats
+import Signal_Trading_LLM as bot
+from signal_book import SignalBook
+
+# --- KONFIGURASI ---
+REPLAY_CANDLE_FILE = candle_store.candle_path(bot.SYMBOL, bot.INTERVAL)
+REPLAY_LLM_FILE = None
+REPLAY_OUTPUT_DIR = "replay_output"
+REPLAY_LATENCY_DETIK = 2  # Jeda simulasi antara candle tutup dan iterasi loop
+REPLAY_WARMUP_BARS = 200  # Bar awal yang hanya dipakai untuk indikator, tidak diproses
+REPLAY_VERBOSE = False  # True = tampilkan semua print dari main loop
+
+
+class ReplayClock:
+    """Jam simulasi yang bisa disuntikkan ke komponen yang butuh waktu sekarang."""
+
+    def __init__(self, ts=0.0):
+        self.ts = ts
+
+    def __call__(self):
+        return self.ts
+
+    def now_utc(self):
+        return datetime.fromtimestamp(self.ts, tz=timezone.utc)
+
+
+def _parse_response(text):
+    # Sama dengan jalur non-streaming live: JSON pertama di teks, lalu validasi field;
+    # None = respons tidak bisa dipakai (tidak di-cache, sama dengan live)
+    sinyal = bot.extract_json_from_text(text)
+    if sinyal is None:
+        return None
+    try:
+        return llm_client.validate_signal(sinyal)
+    except llm_client.InvalidSignalError:
+        return None
+
+
+class ScriptedLLM:
+    def __init__(self, responses):
+        self.responses = itertools.cycle(responses)
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        return _parse_response(next(self.responses))
+
+
+class RecordedLLM:
+    def __init__(self, path):
+        self.responses = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for baris in f:
+                if baris.strip():
+                    item = json.loads(baris)
+                    self.responses[item["prompt_sha1"]] = item["response"]
+        self.calls = 0
+        self.misses = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        text = self.responses.get(hashlib.sha1(prompt.encode("utf-8")).hexdigest())
+        if text is None:
+            # Prompt tidak ada di rekaman: tidak ada jawaban (None, tidak di-cache), bukan "tidak ada trade"
+            self.misses += 1
+            return None
+        return _parse_response(text)
+
+
+def load_llm(path):
+    if path is None:
+        return ScriptedLLM(["{}"])
+    if path.endswith(".jsonl"):
+        return RecordedLLM(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return ScriptedLLM(json.load(f))
+
+
+def load_records(candle_file, start_ts=None, end_ts=None, warmup_bars=REPLAY_WARMUP_BARS):
+    """Candle rekaman dalam rentang (+ bar warmup sebelum start_ts). Mengembalikan (records, warmup_bars)."""
+    records = np.fromfile(candle_file, dtype=candle_store.CANDLE_DTYPE)
+    if start_ts is not None:
+        records = records[max(np.searchsorted(records["ts"], start_ts) - warmup_bars, 0):]
+        warmup_bars = int(np.searchsorted(records["ts"], start_ts))
+    if end_ts is not None:
+        records = records[:np.searchsorted(records["ts"], end_ts, side="right")]
+    return records, warmup_bars
+
+
+def build_state(output_dir, clock):
+    """LoopState baru dengan jurnal kosong & agregat (disimpan manual) di `output_dir`."""
+    os.makedirs(output_dir, exist_ok=True)
+    journal_file = os.path.join(output_dir, signal_journal.JOURNAL_FILE)
+    open(journal_file, "w").close()
+    stats = signal_stats.SignalStats(os.path.join(output_dir, signal_stats.AGGREGATES_FILE),
+                                     os.path.join(output_dir, signal_journal.SNAPSHOT_FILE), journal_file, autosave=False)
+    return bot.LoopState(SignalBook(bot.WAKTU_EXPIRED_MENIT, bot.HISTORY_UNTUK_PROMPT),
+                         llm_cache.DecisionCache(ttl=bot.LLM_CACHE_TTL_DETIK, clock=clock), journal_file=journal_file,
+                         # Drill-down hanya dari candle 1min yang sudah ada di store, tanpa request API
+                         fine_candles=intrabar.FineCandles(bot.SYMBOL) if bot.INTRABAR_DRILLDOWN else None,
+                         stats=stats)
+
+
+def run_replay(candle_file=REPLAY_CANDLE_FILE, llm=None, output_dir=REPLAY_OUTPUT_DIR, start_ts=None, end_ts=None,
+               warmup_bars=REPLAY_WARMUP_BARS, latency=REPLAY_LATENCY_DETIK, verbose=REPLAY_VERBOSE):
+    """Menjalankan replay dan mengembalikan dict ringkasan (throughput, jumlah sinyal, hasil)."""
+    records, warmup_bars = load_records(candle_file, start_ts, end_ts, warmup_bars)
+    llm = llm or load_llm(REPLAY_LLM_FILE)
+    clock = ReplayClock()
+    state = build_state(output_dir, clock)
+    stats, journal_file = state.stats, state.journal_file
+    engine = indicators.IndicatorEngine(bot.INTERVAL, session=bot.SESI_DAILY)
+    step = candle_store.interval_seconds(bot.INTERVAL)
+
+    hasil = Counter()
+    sinyal_baru = 0
+    llm_dipanggil = 0
+    diproses = 0
+    mulai = time.perf_counter()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        for i in range(len(records)):
+            r = records[i]
+            engine.update(r["ts"], r["open"], r["high"], r["low"], r["close"])
+            if i < warmup_bars:
+                continue
+            clock.ts = float(r["ts"]) + step + latency
+            data = candle_store.records_to_values(records[i:i + 1])
+            market_context = (records[:i + 1], bot.market_context_from_engine(engine))
+            ringkasan = bot.process_bar(state, data, clock.now_utc(), market_context=market_context, get_signal=llm)
+            diproses += ringkasan["diproses"]
+            llm_dipanggil += ringkasan["llm_dipanggil"]
+            sinyal_baru += ringkasan["sinyal_baru"] is not None
+            hasil.update(h for _, h in ringkasan["hasil"])
+    durasi = time.perf_counter() - mulai
+    stats.save()
+
+    laporan = {
+        "candle_file": candle_file,
+        "bar": diproses,
+        "dari": candle_store.format_datetime(records["ts"][warmup_bars]) if diproses else None,
+        "sampai": candle_store.format_datetime(records["ts"][-1]) if diproses else None,
+        "durasi_detik": round(durasi, 3),
+        "bar_per_detik": round(diproses / durasi, 1) if durasi > 0 else None,
+        "llm_dipanggil": llm_dipanggil,
+        "cache": state.decision_cache.stats(),
+        "sinyal_baru": sinyal_baru,
+        "masih_terbuka": len(state.book.open_signals()),
+        "hasil": dict(hasil),
+        "journal_file": journal_file,
+        "ringkasan": stats.summary(),
+    }
+    with open(os.path.join(output_dir, "replay_summary.json"), "w") as f:
+        json.dump(laporan, f, indent=2)
+    return laporan
+
+
+if __name__ == "__main__":
+    laporan = run_replay()
+    print("\n====================== REPLAY ======================")
+    print(f"🎞️ {laporan['bar']} bar ({laporan['dari']} -> {laporan['sampai']}) dalam {laporan['durasi_detik']} detik "
+          f"({laporan['bar_per_detik']} bar/detik)")
+    print(f"🧠 LLM dipanggil {laporan['llm_dipanggil']}x | 📈 sinyal baru {laporan['sinyal_baru']} | hasil {laporan['hasil']}")
+    print(f"💾 Jurnal: {laporan['journal_file']}")
+    print("====================================================\n")
@@ -0,0 +1,64 @@
+"""
+Membangun bar timeframe lebih tinggi (H1, Daily, ...) dari candle dasar (mis. 15min)
+yang ada di candle_store, tanpa request API tambahan.
+
+Bar dikelompokkan per periode target dengan penyelarasan sesi (UTC atau WIB).
+Bar terakhir bisa masih "parsial" (periodenya belum selesai); statusnya dikembalikan
+sebagai mask `complete` supaya pemanggil bisa memilih menyertakannya atau tidak.
+"""
+import numpy as np
+
+from candle_store import CANDLE_DTYPE, interval_seconds
+
+# Offset awal sesi terhadap UTC, dalam detik
+SESSION_OFFSET = {
+    "UTC": 0,
+    "WIB": 7 * 3600,
+}
+
+
+def resample(records, target_interval, session="UTC", asof_ts=None, base_interval=None):
+    """
+    Agregasi OHLC dari `records` (array CANDLE_DTYPE terurut naik) ke `target_interval`.
+
+    - open  = open bar dasar pertama di periode, close = close bar dasar terakhir
+    - high/low = max/min seluruh bar dasar di periode
+    - ts    = awal periode (epoch UTC), diselaraskan ke tengah malam sesi
+
+    `asof_ts` adalah waktu data dianggap berlaku; default-nya akhir bar dasar terakhir
+    (butuh `base_interval`). Bar yang periodenya berakhir setelah `asof_ts` ditandai
+    parsial. Mengembalikan (bars, complete).
+    """
+    period = interval_seconds(target_interval)
+    offset = SESSION_OFFSET[session]
+    if len(records) == 0:
+        return np.empty(0, dtype=CANDLE_DTYPE), np.empty(0, dtype=bool)
+
+    ts = np.asarray(records["ts"])
+    bucket = (ts + offset) // period * period - offset
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:] - 1, len(ts) - 1]
+
+    bars = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    bars["ts"] = bucket[starts]
+    bars["open"] = np.asarray(records["open"])[starts]
+    bars["high"] = np.maximum.reduceat(np.asarray(records["high"]), starts)
+    bars["low"] = np.minimum.reduceat(np.asarray(records["low"]), starts)
+    bars["close"] = np.asarray(records["close"])[ends]
+
+    if asof_ts is None:
+        asof_ts = int(ts[-1]) + (interval_seconds(base_interval) if base_interval else 0)
+    complete = bars["ts"] + period <= asof_ts
+    return bars, complete
+
+
+def last_bars(records, target_interval, count, session="UTC", include_partial=True, asof_ts=None, base_interval=None):
+    """`count` bar terakhir hasil resample, opsional tanpa bar yang masih parsial."""
+    # Hanya ekor data dasar yang dibutuhkan; +1 periode untuk bar parsial & penyelarasan
+    if len(records) and base_interval:
+        perlu = (count + 1) * interval_seconds(target_interval) // interval_seconds(base_interval) + 1
+        records = records[-perlu:]
+    bars, complete = resample(records, target_interval, session=session, asof_ts=asof_ts, base_interval=base_interval)
+    if not include_partial:
+        bars = bars[complete]
+    return bars[-count:]
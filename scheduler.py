@@ -0,0 +1,77 @@
+"""
+Penjadwal loop yang selaras dengan penutupan candle.
+
+Alih-alih polling tetap setiap 60 detik, bot tidur sampai tepat setelah candle
+`INTERVAL` berikutnya tutup, lalu polling dengan backoff pendek sampai candle baru
+muncul di API. Di antara penutupan candle tidak ada request sama sekali.
+Latensi dari penutupan candle sampai sinyal dikirim juga dicatat.
+"""
+import time
+from collections import deque
+
+from candle_store import interval_seconds, parse_datetime
+
+
+def next_bar_close(now_ts, interval, offset=0):
+    """Timestamp penutupan candle berikutnya (> now_ts), diselaraskan ke epoch UTC + offset."""
+    step = interval_seconds(interval)
+    return ((int(now_ts) - offset) // step + 1) * step + offset
+
+
+class BarScheduler:
+    def __init__(self, interval, grace=2.0, retry_delays=(2, 3, 5, 8, 13, 20, 30), clock=time.time, sleep=time.sleep):
+        self.interval = interval
+        self.grace = grace  # Jeda setelah candle tutup sebelum request pertama
+        self.retry_delays = retry_delays
+        self.clock = clock
+        self.sleep = sleep
+        self.bar_close_ts = None
+        self.latencies = deque(maxlen=500)  # Detik dari candle tutup sampai sinyal dikirim
+
+    def wait_next_close(self):
+        """Tidur sampai candle berikutnya tutup (+grace). Mengembalikan timestamp penutupan."""
+        close_ts = next_bar_close(self.clock(), self.interval)
+        tunggu = close_ts + self.grace - self.clock()
+        if tunggu > 0:
+            print(f"💤 Tidur {tunggu:.0f} detik sampai candle {self.interval} berikutnya tutup...")
+            self.sleep(tunggu)
+        self.bar_close_ts = close_ts
+        return close_ts
+
+    def poll_new_bar(self, fetch, min_datetime_ts=None):
+        """
+        Memanggil `fetch()` (mengembalikan list candle terbaru dulu, atau [] jika gagal)
+        sampai candle terbaru berdatetime >= `min_datetime_ts` (default: penutupan candle
+        yang baru ditunggu). Di antara percobaan ada backoff pendek `retry_delays`.
+        Mengembalikan data terakhir yang didapat (bisa masih lama / kosong jika habis).
+        """
+        if min_datetime_ts is None:
+            min_datetime_ts = self.bar_close_ts
+        data = []
+        for attempt in range(len(self.retry_delays) + 1):
+            data = fetch()
+            if data and (min_datetime_ts is None or parse_datetime(data[0]["datetime"]) >= min_datetime_ts):
+                return data
+            if attempt < len(self.retry_delays):
+                delay = self.retry_delays[attempt]
+                print(f"⏳ Candle baru belum muncul. Coba lagi dalam {delay} detik...")
+                self.sleep(delay)
+        return data
+
+    def record_signal_latency(self):
+        """Mencatat latensi penutupan candle -> sinyal dikirim (detik) dan mengembalikannya."""
+        if self.bar_close_ts is None:
+            return None
+        latency = self.clock() - self.bar_close_ts
+        self.latencies.append(latency)
+        return latency
+
+    def latency_summary(self):
+        if not self.latencies:
+            return None
+        return {
+            "count": len(self.latencies),
+            "last": self.latencies[-1],
+            "avg": sum(self.latencies) / len(self.latencies),
+            "max": max(self.latencies),
+        }
@@ -0,0 +1,129 @@
+"""
+Buku sinyal di memori untuk main loop.
+
+Sinyal terbuka (pending/active) dan yang sudah selesai disimpan terpisah, sehingga
+biaya per tick hanya O(jumlah sinyal terbuka), berapa pun panjang histori bot:
+
+- sinyal terbuka   : dict idx -> OpenSignal (__slots__)
+- kadaluarsa       : heap berurut waktu expired (sama dengan aturan validasi_expired)
+- histori prompt   : N sinyal selesai terakhir (berdasarkan urutan id), terbatas
+- sinyal selesai   : hanya id + kode hasil, dalam array ringkas
+"""
+import bisect
+import heapq
+from array import array
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+STATUS_TERBUKA = ("pending", "active")
+KODE_HASIL = {"TP": 1, "SL": 2, "expired": 3, "invalid_tp_hit_first": 4}
+
+
+class OpenSignal:
+    __slots__ = ("idx", "data", "expires_at")
+
+    def __init__(self, idx, data, expires_at):
+        self.idx = idx
+        self.data = data
+        self.expires_at = expires_at
+
+
+def waktu_expired(sinyal, expired_menit):
+    # Sama dengan validasi_expired: 'Waktu' dibaca sebagai UTC
+    waktu_utc = datetime.fromisoformat(sinyal["Waktu"]).replace(tzinfo=ZoneInfo("UTC"))
+    return waktu_utc + timedelta(minutes=expired_menit)
+
+
+class SignalBook:
+    def __init__(self, expired_menit, recent_count):
+        self.expired_menit = expired_menit
+        self.recent_count = recent_count
+        self.next_id = 0
+        self._open = {}
+        self._heap = []  # (expires_at, idx)
+        self._recent = []  # (idx, sinyal) terurut idx, maks. recent_count
+        self.closed_ids = array("q")
+        self.closed_kode = array("b")
+
+    @classmethod
+    def from_signals(cls, signals, expired_menit, recent_count):
+        book = cls(expired_menit, recent_count)
+        for idx, sinyal in enumerate(signals):
+            book.add(idx, sinyal)
+        return book
+
+    def add(self, idx, sinyal):
+        """Mendaftarkan sinyal (baru atau dari histori) dengan id `idx`."""
+        self.next_id = max(self.next_id, idx + 1)
+        if sinyal.get("Status") in STATUS_TERBUKA:
+            expires_at = waktu_expired(sinyal, self.expired_menit)
+            self._open[idx] = OpenSignal(idx, sinyal, expires_at)
+            heapq.heappush(self._heap, (expires_at, idx))
+        else:
+            self._close(idx, sinyal)
+
+    def _close(self, idx, sinyal):
+        self.closed_ids.append(idx)
+        self.closed_kode.append(KODE_HASIL.get(sinyal.get("Hasil"), 0))
+        if sinyal.get("Hasil"):
+            pos = bisect.bisect([i for i, _ in self._recent], idx)
+            self._recent.insert(pos, (idx, sinyal))
+            if len(self._recent) > self.recent_count:
+                del self._recent[0]
+
+    def resolve(self, idx, sinyal=None):
+        """Memindahkan sinyal yang sudah punya hasil ke sisi 'selesai'."""
+        entry = self._open.pop(idx, None)
+        if sinyal is None and entry is not None:
+            sinyal = entry.data
+        if sinyal is not None:
+            self._close(idx, sinyal)
+
+    def pop_expired(self, now):
+        """
+        Sinyal terbuka yang sudah lewat batas waktu pada `now`. Sinyal dikeluarkan dari
+        daftar terbuka; setelah Status/Hasil diisi, pemanggil menyerahkannya ke resolve().
+        """
+        expired = []
+        while self._heap and now > self._heap[0][0]:
+            _, idx = heapq.heappop(self._heap)
+            entry = self._open.get(idx)
+            if entry is not None:
+                expired.append((idx, entry.data))
+                del self._open[idx]
+        return expired
+
+    def open_signals(self):
+        return [(idx, entry.data) for idx, entry in sorted(self._open.items())]
+
+    def recent_resolved(self):
+        return [sinyal for _, sinyal in self._recent]
+
+    def recent_resolved_keys(self):
+        # (id, Hasil) histori prompt, untuk fingerprint cache keputusan LLM
+        return [(idx, sinyal.get("Hasil")) for idx, sinyal in self._recent]
+
+    def __len__(self):
+        return self.next_id
+
+    # --- CHECKPOINT ---
+
+    def to_state(self):
+        """State lengkap buku (hanya tipe bawaan) untuk state_checkpoint.py."""
+        return {
+            "next_id": self.next_id,
+            "open": [(idx, entry.data) for idx, entry in sorted(self._open.items())],
+            "recent": list(self._recent),
+            "closed_ids": self.closed_ids.tobytes(), "closed_kode": self.closed_kode.tobytes(),
+        }
+
+    @classmethod
+    def from_state(cls, state, expired_menit, recent_count):
+        book = cls(expired_menit, recent_count)
+        for idx, sinyal in state["open"]:
+            book.add(idx, sinyal)  # Heap kadaluarsa dihitung ulang dengan expired_menit saat ini
+        book.next_id = max(book.next_id, state["next_id"])
+        book._recent = [tuple(r) for r in state["recent"]][-recent_count:] if recent_count else []
+        book.closed_ids.frombytes(state["closed_ids"])
+        book.closed_kode.frombytes(state["closed_kode"])
+        return book
@@ -0,0 +1,158 @@
+"""
+Penyimpanan sinyal berbasis jurnal (append-only).
+
+State = snapshot (`sinyal_trading.json`, list sinyal seperti sebelumnya) + ekor jurnal
+(`sinyal_trading.journal.jsonl`, satu event JSON per baris). Setiap loop bot hanya
+menambahkan event baru ke jurnal, tidak lagi menulis ulang seluruh histori:
+
+    {"op": "new", "id": 12, "data": {...sinyal...}}
+    {"op": "update", "id": 12, "data": {"Status": "active", "Hasil": null}}
+
+`id` adalah posisi sinyal di list (sinyal tidak pernah dihapus, jadi stabil).
+Event bersifat idempoten, sehingga jurnal aman di-replay ulang setelah crash.
+View JSON/CSV lengkap dibuat hanya saat diminta lewat `compact()` / `export_csv()`.
+
+Semua penulis jurnal (append & compact, lintas proses) memegang lock file
+`<jurnal>.lock`, jadi event yang ditulis bot selama compact tidak hilang.
+"""
+import csv
+import json
+import os
+import threading
+
+from rate_limiter import FileLock
+
+# --- KONFIGURASI FILE ---
+SNAPSHOT_FILE = "sinyal_trading.json"
+JOURNAL_FILE = "sinyal_trading.journal.jsonl"
+CSV_FILE = "sinyal_trading.csv"
+
+# Urutan kolom CSV yang tetap; kolom lain menyusul secara alfabetis
+CSV_COLUMNS = ["Waktu", "Symbol", "Interval", "Tipe", "Status", "Hasil", "Entry", "TP", "SL", "Probabilitas", "Alasan"]
+
+_append_lock = threading.Lock()  # Beberapa pipeline dalam satu proses menulis ke jurnal yang sama
+
+
+def journal_lock(journal_file=JOURNAL_FILE):
+    """Lock antar proses untuk penulis jurnal (file `<jurnal>.lock`)."""
+    return FileLock(journal_file)
+
+
+def _apply_event(signals, event):
+    idx = event["id"]
+    if event["op"] == "new":
+        if idx < len(signals):
+            signals[idx] = dict(event["data"])
+        else:
+            signals.append(dict(event["data"]))
+    elif event["op"] == "update" and idx < len(signals):
+        signals[idx].update(event["data"])
+
+def read_journal(journal_file=JOURNAL_FILE, offset=0, until=None):
+    """Event dari jurnal pada byte [offset, until). Baris terakhir yang terpotong (crash) diabaikan."""
+    events = []
+    try:
+        with open(journal_file, "rb") as f:
+            f.seek(offset)
+            data = f.read() if until is None else f.read(max(until - offset, 0))
+            for line in data.splitlines(keepends=True):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    except FileNotFoundError:
+        pass
+    return events
+
+def repair_journal(journal_file=JOURNAL_FILE):
+    # Buang baris terakhir yang terpotong (crash saat menulis) agar event berikutnya tidak tersambung
+    try:
+        with open(journal_file, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    except FileNotFoundError:
+        pass
+
+def load_signals(snapshot_file=SNAPSHOT_FILE, journal_file=JOURNAL_FILE, repair=False):
+    """State lengkap: snapshot + replay ekor jurnal. `repair=True` hanya untuk proses penulis (bot)."""
+    if repair:
+        repair_journal(journal_file)
+    try:
+        with open(snapshot_file, "r") as f:
+            signals = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        signals = []
+    for event in read_journal(journal_file):
+        _apply_event(signals, event)
+    return signals
+
+def file_version(*paths):
+    """(mtime_ns, size) per file; None untuk file yang tidak ada."""
+    versi = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            versi.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            versi.append(None)
+    return tuple(versi)
+
+
+def _append(event, journal_file):
+    line = json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n"
+    # File dibuka per event supaya penulis tetap benar setelah jurnal dikosongkan oleh compact()
+    with _append_lock, journal_lock(journal_file), open(journal_file, "a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+def append_new(idx, sinyal, journal_file=JOURNAL_FILE):
+    _append({"op": "new", "id": idx, "data": sinyal}, journal_file)
+
+def append_update(idx, sinyal, fields=("Status", "Hasil"), journal_file=JOURNAL_FILE):
+    _append({"op": "update", "id": idx, "data": {k: sinyal.get(k) for k in fields}}, journal_file)
+
+def compact(snapshot_file=SNAPSHOT_FILE, journal_file=JOURNAL_FILE, on_compacted=None):
+    """
+    Menulis state terkini sebagai snapshot baru (atomik) lalu mengosongkan jurnal.
+    Lock jurnal dipegang selama proses, jadi append dari bot menunggu dan tidak ada
+    event yang hilang. `on_compacted(versi_lama, versi_baru)` (file_version snapshot +
+    jurnal sebelum & sesudah) dipanggil sebelum lock dilepas, mis. untuk memindahkan
+    watermark checkpoint. Mengembalikan list sinyal hasil materialisasi.
+    """
+    with _append_lock, journal_lock(journal_file):
+        versi_lama = file_version(snapshot_file, journal_file)
+        repair_journal(journal_file)
+        signals = load_signals(snapshot_file, journal_file)
+
+        tmp = snapshot_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(signals, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, snapshot_file)
+
+        # Crash di antara dua langkah ini aman: replay jurnal di atas snapshot baru idempoten
+        if os.path.exists(journal_file) and os.path.getsize(journal_file):
+            with open(journal_file, "w"):
+                pass
+        if on_compacted is not None:
+            on_compacted(versi_lama, file_version(snapshot_file, journal_file))
+    return signals
+
+def csv_columns(signals):
+    keys = set()
+    for d in signals:
+        keys.update(d.keys())
+    return [k for k in CSV_COLUMNS if k in keys] + sorted(k for k in keys if k not in CSV_COLUMNS)
+
+def export_csv(signals, csv_file=CSV_FILE):
+    if not signals:
+        return
+    with open(csv_file, "w", newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=csv_columns(signals))
+        writer.writeheader()
+        writer.writerows(signals)
@@ -0,0 +1,151 @@
+"""
+Export histori sinyal ke Parquet (kolumnar, bertipe, dipartisi per tanggal).
+
+Layout (partisi gaya Hive, tanggal UTC dari Waktu):
+
+    sinyal_parquet/
+        _manifest.json                 {"2025-06-10": {"count": 7, "final": true}, ...}
+        tanggal=2025-06-10/part-0.parquet
+        tanggal=2025-06-11/part-0.parquet
+
+Skema tetap: `Waktu` timestamp UTC (offset +07:00 lama dan UTC baru disamakan), harga &
+probabilitas float64, Tipe/Status/Hasil kategorikal (dictionary), `id` = posisi sinyal
+di histori. Export bersifat inkremental: partisi yang semua sinyalnya sudah selesai dan
+jumlahnya tidak berubah dilewati; hanya partisi baru atau yang masih punya sinyal
+terbuka yang ditulis (atomik, file sementara lalu rename).
+
+`read_signals()` hanya membaca partisi & kolom yang diminta, dengan memory-map.
+"""
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+# --- KONFIGURASI ---
+PARQUET_DIR = "sinyal_parquet"
+MANIFEST_FILE = "_manifest.json"
+PARTISI = "tanggal"
+STATUS_SELESAI = ("TP", "SL", "expired", "invalid")
+
+KATEGORI = pa.dictionary(pa.int8(), pa.string())
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("Waktu", pa.timestamp("us", tz="UTC")),
+    ("Symbol", KATEGORI),  # Kosong untuk sinyal lama (bot satu instrumen)
+    ("Interval", KATEGORI),
+    ("Tipe", KATEGORI),
+    ("Status", KATEGORI),
+    ("Hasil", KATEGORI),
+    ("Entry", pa.float64()),
+    ("SL", pa.float64()),
+    ("TP", pa.float64()),
+    ("Probabilitas", pa.float64()),
+    ("Alasan", pa.string()),
+])
+
+
+def signals_frame(signals):
+    """DataFrame sesuai SCHEMA (+ kolom partisi). Baris dengan Waktu tidak valid dibuang."""
+    df = pd.DataFrame(signals)
+    df.insert(0, "id", range(len(df)))
+    for col in SCHEMA.names:
+        if col not in df.columns:
+            df[col] = None
+    df = df[SCHEMA.names]
+    df["Waktu"] = pd.to_datetime(df["Waktu"], errors="coerce", utc=True, format="ISO8601")
+    df = df.dropna(subset=["Waktu"])
+    for col in ("Entry", "SL", "TP", "Probabilitas"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in ("Symbol", "Interval", "Tipe", "Status", "Hasil"):
+        df[col] = df[col].astype("string").astype("category")
+    df["Alasan"] = df["Alasan"].astype("string")
+    df[PARTISI] = df["Waktu"].dt.strftime("%Y-%m-%d")
+    return df
+
+
+def load_manifest(parquet_dir=PARQUET_DIR):
+    try:
+        with open(os.path.join(parquet_dir, MANIFEST_FILE), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _save_manifest(parquet_dir, manifest):
+    path = os.path.join(parquet_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def _write_partition(parquet_dir, tanggal, bagian):
+    folder = os.path.join(parquet_dir, f"{PARTISI}={tanggal}")
+    os.makedirs(folder, exist_ok=True)
+    table = pa.Table.from_pandas(bagian.drop(columns=[PARTISI]), schema=SCHEMA, preserve_index=False)
+    # Nama sementara berawalan "." supaya tidak ikut terbaca dataset jika proses terhenti
+    tmp = os.path.join(folder, ".part-0.parquet.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, os.path.join(folder, "part-0.parquet"))
+
+
+def export_signals(signals, parquet_dir=PARQUET_DIR):
+    """
+    Menulis partisi yang baru / berubah. Mengembalikan dict: ditulis, dilewati, dibuang
+    (baris tanpa Waktu valid).
+    """
+    df = signals_frame(signals)
+    os.makedirs(parquet_dir, exist_ok=True)
+    manifest = load_manifest(parquet_dir)
+    ditulis = dilewati = 0
+    for tanggal, bagian in df.groupby(PARTISI, sort=True):
+        final = bool(bagian["Status"].isin(STATUS_SELESAI).all())
+        lama = manifest.get(tanggal)
+        if lama is not None and lama["final"] and lama["count"] == len(bagian):
+            dilewati += 1
+            continue
+        _write_partition(parquet_dir, tanggal, bagian)
+        manifest[tanggal] = {"count": len(bagian), "final": final}
+        ditulis += 1
+    _save_manifest(parquet_dir, manifest)
+    return {"ditulis": ditulis, "dilewati": dilewati, "dibuang": len(signals) - len(df)}
+
+
+def _utc(waktu):
+    waktu = pd.Timestamp(waktu)
+    return waktu.tz_localize("UTC") if waktu.tzinfo is None else waktu.tz_convert("UTC")
+
+def _scalar(waktu):
+    return pa.scalar(waktu.to_pydatetime(), SCHEMA.field("Waktu").type)
+
+
+def read_signals(parquet_dir=PARQUET_DIR, start=None, end=None, columns=None, tz="Asia/Jakarta"):
+    """
+    Sinyal dengan start <= Waktu < end (datetime/str, tz-naive dianggap UTC) sebagai DataFrame.
+    Hanya partisi tanggal yang relevan & `columns` (None = semua) yang dibaca, file di-memory-map.
+    Waktu dikonversi ke `tz` (None = tetap UTC).
+    """
+    if not os.path.isdir(parquet_dir):
+        return pd.DataFrame(columns=columns or SCHEMA.names)
+    dataset = ds.dataset(parquet_dir, schema=SCHEMA.append(pa.field(PARTISI, pa.string())), format="parquet", filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True),
+                         partitioning=ds.partitioning(pa.schema([(PARTISI, pa.string())]), flavor="hive"),
+                         ignore_prefixes=["_", "."])
+    # Filter tanggal memangkas partisi, filter Waktu memotong di dalam partisi
+    syarat = []
+    if start is not None:
+        start = _utc(start)
+        syarat += [ds.field(PARTISI) >= start.strftime("%Y-%m-%d"), ds.field("Waktu") >= _scalar(start)]
+    if end is not None:
+        end = _utc(end)
+        syarat += [ds.field(PARTISI) <= end.strftime("%Y-%m-%d"), ds.field("Waktu") < _scalar(end)]
+    filter_ = None
+    for s in syarat:
+        filter_ = s if filter_ is None else filter_ & s
+    kolom = [c for c in (columns or SCHEMA.names) if c != PARTISI]
+    df = dataset.to_table(columns=kolom, filter=filter_).to_pandas()
+    if "Waktu" in df.columns:
+        if tz:
+            df["Waktu"] = df["Waktu"].dt.tz_convert(tz)
+        df = df.sort_values("Waktu", kind="stable").reset_index(drop=True)
+    return df
@@ -0,0 +1,225 @@
+"""
+Agregat histori sinyal yang diperbarui secara inkremental oleh bot.
+
+Setiap kali sinyal baru dibuat atau mencapai status akhir (TP/SL/invalid/expired), bot
+memperbarui ringkasan kecil di `sinyal_trading.aggregates.json`; event jurnal lain (mis.
+pending -> active) hanya memajukan watermark-nya:
+
+- counts  : jumlah sinyal per Hasil ("pending" untuk sinyal yang masih terbuka)
+- weekly  : PnL per minggu, label = Senin pada/setelah tanggal WIB (sama dengan resample 'W-MON')
+- equity  : seri [ts, pnl, pnl_kumulatif] untuk trade TP/SL, urut waktu sinyal
+- win/loss: jumlah & total PnL positif/negatif (untuk rata-rata win/loss)
+
+Dashboard hanya membaca file ini untuk metrik & grafik. `watermark` menyimpan versi
+(mtime, ukuran) snapshot + jurnal saat agregat terakhir ditulis; jika tidak cocok (mis.
+bot crash di antara dua penulisan atau jurnal di-compact), agregat dibangun ulang dari histori.
+"""
+import bisect
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import signal_journal
+
+# --- KONFIGURASI ---
+AGGREGATES_FILE = "sinyal_trading.aggregates.json"
+PNL_MULTIPLIER = 0.01  # Sama dengan Dashboard.py
+ZONA_WAKTU = ZoneInfo("Asia/Jakarta")
+VERSION = 1
+
+
+def _num(value):
+    # Sama dengan pd.to_numeric(errors='coerce').fillna(0) di dashboard
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _timestamp(sinyal):
+    try:
+        waktu = datetime.fromisoformat(str(sinyal.get("Waktu")))
+    except ValueError:
+        return None
+    if waktu.tzinfo is None:
+        waktu = waktu.replace(tzinfo=timezone.utc)
+    return waktu.timestamp()
+
+def week_label(ts):
+    """Label minggu 'YYYY-MM-DD': Senin pada atau setelah tanggal WIB dari `ts`."""
+    tanggal = datetime.fromtimestamp(ts, ZONA_WAKTU).date()
+    return (tanggal + timedelta(days=-tanggal.weekday() % 7)).isoformat()
+
+def signal_pnl(sinyal):
+    hasil = str(sinyal.get("Hasil")).upper()
+    entry = _num(sinyal.get("Entry"))
+    if hasil == "TP":
+        return abs(_num(sinyal.get("TP")) - entry) * PNL_MULTIPLIER
+    if hasil == "SL":
+        return -abs(_num(sinyal.get("SL")) - entry) * PNL_MULTIPLIER
+    return 0.0
+
+
+class SignalStats:
+    def __init__(self, path=AGGREGATES_FILE, snapshot_file=signal_journal.SNAPSHOT_FILE,
+                 journal_file=signal_journal.JOURNAL_FILE, autosave=True):
+        self.path = path
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.autosave = autosave  # False = hanya disimpan saat save() dipanggil (mis. replay)
+        self._lock = threading.Lock()  # Dipakai bersama oleh beberapa pipeline (pipeline_engine.py)
+        self.reset()
+
+    def reset(self):
+        self.counts = {}
+        self.weekly = {}
+        self.equity = []  # [ts, pnl, cum], urut ts
+        self.win = [0, 0.0]   # [jumlah, total PnL] trade dengan PnL > 0
+        self.loss = [0, 0.0]  # [jumlah, total PnL] trade dengan PnL < 0
+        self.watermark = None
+
+    # --- pembaruan inkremental ---
+
+    def _count(self, hasil, delta):
+        jumlah = self.counts.get(hasil, 0) + delta
+        if jumlah > 0:
+            self.counts[hasil] = jumlah
+        else:
+            self.counts.pop(hasil, None)
+
+    def _add_trade(self, ts, pnl):
+        minggu = week_label(ts)
+        self.weekly[minggu] = self.weekly.get(minggu, 0.0) + pnl
+        if pnl > 0:
+            self.win[0] += 1; self.win[1] += pnl
+        elif pnl < 0:
+            self.loss[0] += 1; self.loss[1] += pnl
+        # Trade hampir selalu yang terbaru (satu sinyal terbuka), jadi biasanya hanya append
+        pos = bisect.bisect_right(self.equity, ts, key=lambda e: e[0])
+        cum = self.equity[pos - 1][2] if pos else 0.0
+        self.equity.insert(pos, [ts, pnl, cum + pnl])
+        for e in self.equity[pos + 1:]:
+            e[2] += pnl
+
+    def _apply(self, sinyal, baru):
+        ts = _timestamp(sinyal)
+        if ts is None:
+            return  # Dashboard juga membuang baris dengan Waktu tidak valid
+        hasil = sinyal.get("Hasil") or "pending"
+        if baru:
+            self._count(hasil, 1)
+        elif hasil != "pending":
+            self._count("pending", -1)
+            self._count(hasil, 1)
+        if hasil in ("TP", "SL"):
+            self._add_trade(ts, signal_pnl(sinyal))
+
+    def record_new(self, sinyal):
+        with self._lock:
+            self._apply(sinyal, baru=True)
+            if self.autosave:
+                self._save()
+
+    def record_terminal(self, sinyal):
+        """Dipanggil sekali saat sinyal pending/active mencapai status akhir."""
+        with self._lock:
+            self._apply(sinyal, baru=False)
+            if self.autosave:
+                self._save()
+
+    def record_update(self, sinyal):
+        """Event jurnal yang tidak mengubah agregat (mis. pending -> active): watermark tetap mengikuti jurnal."""
+        with self._lock:
+            if self.autosave:
+                self._save()
+
+    def rebuild(self, signals):
+        self.reset()
+        for sinyal in signals:
+            self._apply(sinyal, baru=True)
+
+    # --- ringkasan ---
+
+    def summary(self):
+        total = sum(self.counts.values())
+        tp = self.counts.get("TP", 0)
+        sl = self.counts.get("SL", 0)
+        return {
+            "total_signals": total, "total_win": tp, "total_loss": sl,
+            "total_invalid": sum(n for h, n in self.counts.items() if "invalid" in h),
+            "total_expired": self.counts.get("expired", 0),
+            "total_pnl": self.equity[-1][2] if self.equity else 0.0,
+            "win_rate": tp / (tp + sl) * 100 if tp + sl else 0,
+            "execution_rate": (tp + sl) / total * 100 if total else 0,
+            "avg_win": self.win[1] / self.win[0] if self.win[0] else 0.0,
+            "avg_loss": self.loss[1] / self.loss[0] if self.loss[0] else 0.0,
+        }
+
+    # --- file ---
+
+    def to_dict(self):
+        return {"version": VERSION, "watermark": self.watermark, "counts": self.counts, "weekly": self.weekly,
+                "equity": self.equity, "win": self.win, "loss": self.loss}
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        # Watermark = versi file setelah event jurnal terakhir ditulis (event selalu ditulis lebih dulu)
+        self.watermark = [list(v) if v else None for v in signal_journal.file_version(self.snapshot_file, self.journal_file)]
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def load(self):
+        """True jika file agregat ada dan masih sesuai dengan snapshot + jurnal saat ini."""
+        self.reset()
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        return self.load_dict(data) and self.is_current()
+
+    def load_dict(self, data):
+        """Mengisi agregat dari hasil to_dict() (file atau checkpoint); False jika versinya lain."""
+        if data.get("version") != VERSION:
+            return False
+        self.counts, self.weekly, self.equity = data["counts"], data["weekly"], data["equity"]
+        self.win, self.loss, self.watermark = data["win"], data["loss"], data["watermark"]
+        return True
+
+    def is_current(self):
+        versi = [list(v) if v else None for v in signal_journal.file_version(self.snapshot_file, self.journal_file)]
+        return self.watermark == versi
+
+
+def open_stats(signals, path=AGGREGATES_FILE, snapshot_file=signal_journal.SNAPSHOT_FILE,
+               journal_file=signal_journal.JOURNAL_FILE):
+    """
+    Agregat untuk bot: dari file jika masih sesuai, jika tidak dibangun ulang dari `signals`
+    lalu disimpan. `signals` boleh berupa fungsi, dipanggil hanya jika perlu membangun ulang.
+    """
+    stats = SignalStats(path, snapshot_file, journal_file)
+    if not stats.load():
+        stats.rebuild(signals() if callable(signals) else signals)
+        stats.save()
+    return stats
+
+
+def refresh_file(path=AGGREGATES_FILE, snapshot_file=signal_journal.SNAPSHOT_FILE,
+                 journal_file=signal_journal.JOURNAL_FILE):
+    """
+    Membangun ulang file agregat dari histori (mis. setelah jurnal di-compact). Tidak menulis
+    apa pun jika snapshot/jurnal berubah selama proses; agregat milik bot yang berlaku.
+    """
+    versi = signal_journal.file_version(snapshot_file, journal_file)
+    stats = SignalStats(path, snapshot_file, journal_file)
+    stats.rebuild(signal_journal.load_signals(snapshot_file, journal_file))
+    if signal_journal.file_version(snapshot_file, journal_file) != versi:
+        return None
+    stats.save()
+    return stats
@@ -0,0 +1,114 @@
+"""
+Checkpoint biner state main loop, supaya bot bisa start ulang dalam hitungan milidetik dan
+melanjutkan tepat di candle tempat ia berhenti.
+
+Isi checkpoint (ditulis setelah setiap iterasi yang memproses candle):
+
+- candle terakhir yang diproses (last_processed_datetime)
+- SignalBook: sinyal terbuka, ring histori prompt, id berikutnya, id & kode hasil sinyal selesai
+- state mesin indikator (sama dengan IndicatorEngine.to_state)
+- agregat histori (SignalStats.to_dict), supaya file agregat tidak perlu divalidasi ulang
+- watermark: versi (mtime, ukuran) snapshot + jurnal saat checkpoint ditulis
+
+Format file: header tetap (magic, versi format, CRC32 & panjang payload) lalu payload pickle
+yang hanya berisi tipe bawaan. Unpickler menolak semua global, jadi file checkpoint tidak
+bisa menjalankan kode; file rusak / terpotong ditolak oleh CRC. Penulisan atomik: file
+sementara + fsync + rename.
+
+Watermark ditulis di bawah lock jurnal. compact() tidak mengubah isi logis histori, jadi
+regeneratecsv.py memindahkan watermark checkpoint ke versi file hasil compact (restamp).
+Jika watermark tetap tidak cocok (jurnal berubah setelah checkpoint, mis. crash di tengah
+iterasi), buku sinyal dibangun dari histori lengkap seperti biasa; candle terakhir dan state
+indikator dari checkpoint tetap berlaku karena tidak bergantung pada jurnal.
+"""
+import io
+import os
+import pickle
+import struct
+import zlib
+
+import signal_journal
+
+# --- KONFIGURASI ---
+STATE_FILE = "bot_state.ckpt"
+MAGIC = b"SIGSTATE"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sHIQ")  # magic, versi format, crc32 payload, panjang payload
+
+
+class _BuiltinsOnlyUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Global tidak diizinkan di checkpoint: {module}.{name}")
+
+
+def _as_list(versi):
+    return [list(v) if v else None for v in versi]
+
+def _watermark(snapshot_file, journal_file):
+    return _as_list(signal_journal.file_version(snapshot_file, journal_file))
+
+
+def _write(checkpoint, path):
+    payload = pickle.dumps(checkpoint, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, zlib.crc32(payload), len(payload)))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def save_state(state, engine=None, path=STATE_FILE, snapshot_file=signal_journal.SNAPSHOT_FILE,
+               journal_file=signal_journal.JOURNAL_FILE):
+    """Menulis checkpoint untuk `state` (bot.LoopState) dan mesin indikatornya (boleh None)."""
+    checkpoint = {
+        "symbol": state.symbol,
+        "interval": state.interval,
+        "last_processed_datetime": state.last_processed_datetime,
+        "book": state.book.to_state(),
+        "indikator": engine.to_state() if engine is not None else None,
+        "stats": state.stats.to_dict() if state.stats is not None else None,
+    }
+    # Di bawah lock jurnal supaya compact() tidak berjalan di antara membaca watermark dan menulis file
+    with signal_journal.journal_lock(journal_file):
+        # Event jurnal selalu ditulis sebelum checkpoint, jadi versi ini mencakup semua event iterasi
+        checkpoint["watermark"] = _watermark(snapshot_file, journal_file)
+        _write(checkpoint, path)
+
+
+def restamp(versi_lama, versi_baru, path=STATE_FILE):
+    """
+    Callback compact(): checkpoint yang sesuai dengan versi file sebelum compact juga sesuai
+    dengan hasilnya (isi histori sama). Mengembalikan True jika checkpoint diperbarui.
+    """
+    checkpoint = load_state(path)
+    if checkpoint is None or checkpoint["watermark"] != _as_list(versi_lama):
+        return False
+    checkpoint["watermark"] = _as_list(versi_baru)
+    _write(checkpoint, path)
+    return True
+
+
+def load_state(path=STATE_FILE):
+    """Isi checkpoint (dict), atau None jika tidak ada / versi lain / rusak."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, versi, crc, panjang = HEADER.unpack_from(data)
+    payload = data[HEADER.size:]
+    if magic != MAGIC or versi != FORMAT_VERSION or len(payload) != panjang or zlib.crc32(payload) != crc:
+        return None
+    try:
+        return _BuiltinsOnlyUnpickler(io.BytesIO(payload)).load()
+    except (pickle.UnpicklingError, EOFError, ValueError):
+        return None
+
+
+def is_current(checkpoint, snapshot_file=signal_journal.SNAPSHOT_FILE, journal_file=signal_journal.JOURNAL_FILE):
+    """True jika snapshot + jurnal belum berubah sejak checkpoint ditulis."""
+    return checkpoint["watermark"] == _watermark(snapshot_file, journal_file)
@@ -0,0 +1,177 @@
+"""
+Server lokal pengganti API eksternal, untuk uji coba & benchmark tanpa jaringan.
+
+- Chat completions (kompatibel OpenAI/Together), mode biasa maupun streaming SSE,
+  dengan respons berskrip, latensi awal, jeda per potongan dan tingkat error.
+- TwelveData `time_series` dari array candle (mis. synthetic.generate_ohlc), dengan
+  latensi, tingkat error HTTP dan tingkat respons "kredit habis". Hanya candle dengan
+  ts <= `server.cfg["now_ts"]` yang terlihat, jadi waktu pasar bisa dimajukan per bar.
+
+Contoh:
+    server, url = start_chat_server(['{"Tipe": "BUY LIMIT", ...} penjelasan...'])
+    llm_client.stream_signal(prompt, "dummy", url=url)
+    server.shutdown()
+
+    server, base_url = start_time_series_server({"BTC/USD:Binance": {"15min": records}})
+    http_client.TWELVE_DATA_URL = base_url
+"""
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import candle_store
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Header & body ditulis terpisah; tanpa ini ada jeda delayed-ACK ~40 ms
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        cfg = self.server.cfg
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests.append(body)
+        time.sleep(cfg["latency"])
+        if cfg["error_rate"] and random.random() < cfg["error_rate"]:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        with self.server.lock:
+            content = next(self.server.responses)
+        if not body.get("stream"):
+            data = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        step = cfg["chunk_size"]
+        terkirim = 0
+        try:
+            for i in range(0, len(content), step):
+                chunk = {"choices": [{"delta": {"content": content[i:i + step]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                terkirim += 1
+                time.sleep(cfg["chunk_delay"])
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Klien menutup stream lebih awal
+        self.server.chunks_sent.append(terkirim)
+
+
+def start_chat_server(responses, latency=0.0, chunk_delay=0.0, chunk_size=8, error_rate=0.0, host="127.0.0.1", port=0):
+    """
+    Menjalankan server chat completions di thread latar. `responses` diputar bergiliran.
+    Mengembalikan (server, url). `server.requests` berisi body request yang diterima dan
+    `server.chunks_sent` jumlah potongan SSE yang sempat terkirim per request.
+    """
+    server = ThreadingHTTPServer((host, port), _ChatHandler)
+    server.daemon_threads = True
+    server.cfg = {"latency": latency, "chunk_delay": chunk_delay, "chunk_size": chunk_size, "error_rate": error_rate}
+    server.responses = itertools.cycle(responses)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.chunks_sent = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1/chat/completions"
+
+
+class _TimeSeriesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Header & body ditulis terpisah; tanpa ini ada jeda delayed-ACK ~40 ms
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        cfg = self.server.cfg
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.requests.append(params)
+        time.sleep(cfg["latency"])
+        if cfg["error_rate"] and random.random() < cfg["error_rate"]:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if cfg["credit_error_rate"] and random.random() < cfg["credit_error_rate"]:
+            self._send_json(200, {"code": 429, "status": "error",
+                                  "message": "You have run out of API credits for the current minute."})
+            return
+        if url.path.rstrip("/") != "/time_series":
+            self._send_json(404, {"code": 404, "status": "error", "message": "Not found"})
+            return
+
+        records = self.server.data.get(params.get("symbol"), {}).get(params.get("interval"))
+        if records is None:
+            self._send_json(200, {"code": 400, "status": "error", "message": "symbol or interval not found"})
+            return
+        ts = records["ts"]
+        akhir = np.searchsorted(ts, cfg["now_ts"], side="right") if cfg["now_ts"] is not None else len(ts)
+        if "end_date" in params:
+            akhir = min(akhir, np.searchsorted(ts, candle_store.parse_datetime(params["end_date"]), side="right"))
+        awal = np.searchsorted(ts, candle_store.parse_datetime(params["start_date"])) if "start_date" in params else 0
+        outputsize = int(params.get("outputsize", 30))
+        # Seperti TwelveData: outputsize candle terbaru di rentang, urutan terbaru dulu
+        pilih = records[max(awal, akhir - outputsize):akhir]
+        if len(pilih) == 0:
+            self._send_json(200, {"code": 400, "status": "error", "message": "No data is available on the specified dates."})
+            return
+        self._send_json(200, {"meta": {"symbol": params.get("symbol"), "interval": params.get("interval")},
+                              "values": candle_store.records_to_values(pilih), "status": "ok"})
+
+
+def start_time_series_server(data, latency=0.0, error_rate=0.0, credit_error_rate=0.0, now_ts=None,
+                             host="127.0.0.1", port=0):
+    """
+    Menjalankan stub TwelveData di thread latar. `data` = {symbol: {interval: records CANDLE_DTYPE}}.
+    Mengembalikan (server, base_url) untuk http_client.TWELVE_DATA_URL. `server.cfg["now_ts"]`
+    boleh diubah kapan saja untuk memajukan waktu pasar; `server.requests` berisi parameter request.
+    """
+    server = ThreadingHTTPServer((host, port), _TimeSeriesHandler)
+    server.daemon_threads = True
+    server.cfg = {"latency": latency, "error_rate": error_rate, "credit_error_rate": credit_error_rate, "now_ts": now_ts}
+    server.data = data
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+if __name__ == "__main__":
+    contoh = ['{"Tipe": "BUY LIMIT", "Entry": 100000.0, "SL": 99700.0, "TP": 100700.0, '
+              '"Probabilitas": 0.7, "Alasan": "stub"}\nPenjelasan panjang yang tidak perlu dibaca...']
+    server, url = start_chat_server(contoh, chunk_delay=0.05, port=8765)
+    print(f"🧪 Stub chat completions berjalan di {url} (Ctrl+C untuk berhenti)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,211 @@
+"""
+Sweep parameter risiko terhadap histori sinyal: MINIMUM_RR, WAKTU_EXPIRED_MENIT, dan batas
+waktu sinyal pending (heuristik expired 1 jam di evaluate_history.py).
+
+Candle dari store lokal dan histori sinyal dimuat sekali. Setiap sinyal dievaluasi satu kali
+dengan batch_eval terhadap jendela terpanjang di grid; karena state machine evaluasi hanya
+bergerak maju, hasil untuk jendela yang lebih pendek bisa diturunkan dari waktu fill / exit
+(first-touch) tanpa membaca candle lagi. Array hasil per sinyal diletakkan di shared memory
+dan kombinasi parameter dibagi ke process pool; tiap worker hanya menempel ke blok memori
+yang sama, bukan menyalin data.
+
+Per kombinasi, sinyal yang RR-nya di bawah ambang dibuang, dan (opsional) sinyal yang muncul
+saat sinyal sebelumnya masih terbuka dilewati, seperti bot live yang hanya membuka satu sinyal.
+"""
+import csv
+import os
+import time
+from datetime import datetime, timezone
+from itertools import product
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+import batch_eval
+import candle_store
+import signal_journal
+
+# --- KONFIGURASI ---
+SYMBOL = "BTC/USD:Binance"
+INTERVAL = "15min"
+INPUT_JSON_FILE = signal_journal.SNAPSHOT_FILE  # + jurnal-nya
+OUTPUT_CSV_FILE = "sweep_results.csv"
+PNL_MULTIPLIER = 0.01  # Sama dengan Dashboard.py
+
+GRID_MINIMUM_RR = [round(float(x), 2) for x in np.arange(1.0, 4.01, 0.25)]
+GRID_WAKTU_EXPIRED_MENIT = [30, 60, 90, 120, 180, 240, 360, 480, 720, 1440]
+GRID_PENDING_MENIT = [None, 15, 30, 60, 120, 240]  # None = sama dengan WAKTU_EXPIRED_MENIT
+SATU_SINYAL_TERBUKA = True  # Sinyal baru hanya dibuat jika tidak ada sinyal terbuka (seperti main_loop)
+WORKERS = os.cpu_count() or 1
+TAMPILKAN_TERBAIK = 15
+
+SIGNAL_DTYPE = np.dtype([
+    ("start", "<i8"),
+    ("rr", "<f8"),
+    ("status", "i1"),  # kode batch_eval pada jendela terpanjang
+    ("fill_ts", "<i8"),
+    ("exit_ts", "<i8"),
+    ("pnl_tp", "<f8"),
+    ("pnl_sl", "<f8"),
+])
+
+KOLOM = ["minimum_rr", "waktu_expired_menit", "pending_menit", "sinyal", "ditolak_rr", "dilewati_terbuka",
+         "tp", "sl", "invalid", "expired", "win_rate", "execution_rate", "pnl"]
+
+
+def prepare_signals(signals, candles, max_menit, ranges=None, now_ts=None):
+    """
+    Array SIGNAL_DTYPE (urut waktu) untuk sinyal yang jendela `max_menit`-nya tersedia
+    di candle store, dievaluasi sekali dengan batch_eval. Mengembalikan (array, jumlah_dilewati).
+    """
+    now_ts = now_ts if now_ts is not None else int(time.time())
+    step = candle_store.interval_seconds(INTERVAL)
+    ranges = candle_store._merge_ranges(ranges or [], step)
+    pilih, start = [], []
+    for s in signals:
+        try:
+            waktu = datetime.fromisoformat(s["Waktu"])
+            float(s["Entry"]), float(s["SL"]), float(s["TP"])
+        except (KeyError, ValueError, TypeError):
+            continue
+        if waktu.tzinfo is None:
+            waktu = waktu.replace(tzinfo=timezone.utc)
+        ts = int(waktu.timestamp())
+        end = min(ts + max_menit * 60, now_ts)
+        if s.get("Tipe") in ("BUY LIMIT", "SELL LIMIT") and any(a <= ts and end <= b for a, b in ranges):
+            pilih.append(s)
+            start.append(ts)
+    dilewati = len(signals) - len(pilih)
+
+    arr = np.zeros(len(pilih), dtype=SIGNAL_DTYPE)
+    if not pilih:
+        return arr, dilewati
+    tipe, entry, sl, tp = batch_eval.signals_to_arrays(pilih)
+    start = np.array(start, dtype=np.int64)
+    # Sinyal live dibuat sesaat setelah candle sebelumnya tutup, jadi candle tempat 'Waktu' berada ikut dievaluasi
+    hasil = batch_eval.evaluate_batch(candles, tipe, entry, sl, tp, start // step * step,
+                                      np.minimum(start + max_menit * 60, now_ts))
+    risk = np.abs(entry - sl)
+    arr["start"] = start
+    arr["rr"] = np.where(risk > 0, np.abs(tp - entry) / np.where(risk > 0, risk, 1), 0)
+    arr["status"] = hasil["status"]
+    arr["fill_ts"] = hasil["fill_ts"]
+    arr["exit_ts"] = hasil["exit_ts"]
+    arr["pnl_tp"] = np.abs(tp - entry) * PNL_MULTIPLIER
+    arr["pnl_sl"] = -np.abs(sl - entry) * PNL_MULTIPLIER
+    return arr[np.argsort(start, kind="stable")], dilewati
+
+
+def evaluate_combo(arr, minimum_rr, expired_menit, pending_menit, satu_terbuka=SATU_SINYAL_TERBUKA, step=900):
+    """
+    Metrik satu kombinasi parameter dari array SIGNAL_DTYPE. Seperti process_bar, sebuah
+    candle hanya dihitung jika ia tutup (ts + step) sebelum sinyal kadaluarsa.
+    """
+    pending_menit = expired_menit if pending_menit is None else min(pending_menit, expired_menit)
+    batas = arr["start"] + expired_menit * 60
+    batas_fill = arr["start"] + pending_menit * 60
+    status = arr["status"]
+    terisi = (arr["fill_ts"] != batch_eval.NO_TS) & (arr["fill_ts"] + step <= batas_fill)
+    selesai = (arr["exit_ts"] != batch_eval.NO_TS) & (arr["exit_ts"] + step <= batas)
+
+    hasil = np.full(len(arr), 3, dtype=np.int8)  # 0=TP 1=SL 2=invalid 3=expired
+    hasil[(status == batch_eval.INVALID) & (arr["exit_ts"] + step <= batas_fill)] = 2
+    hasil[terisi & selesai & (status == batch_eval.SL)] = 1
+    hasil[terisi & selesai & (status == batch_eval.TP)] = 0
+    # Sinyal terbuka sampai candle exit selesai diproses, atau sampai kadaluarsa
+    akhir = np.where(hasil == 3, np.where(terisi, batas, batas_fill), arr["exit_ts"] + step)
+
+    lolos = arr["rr"] >= minimum_rr
+    diambil = lolos.copy()
+    if satu_terbuka:
+        start, akhir = arr["start"].tolist(), akhir.tolist()
+        bebas = -1
+        for i in np.flatnonzero(lolos).tolist():
+            if start[i] < bebas:
+                diambil[i] = False
+            else:
+                bebas = akhir[i]
+
+    h = hasil[diambil]
+    tp, sl, invalid, expired = (int((h == k).sum()) for k in range(4))
+    pnl = float(arr["pnl_tp"][diambil][h == 0].sum() + arr["pnl_sl"][diambil][h == 1].sum())
+    n = int(diambil.sum())
+    return {
+        "minimum_rr": minimum_rr, "waktu_expired_menit": expired_menit,
+        "pending_menit": pending_menit, "sinyal": n,
+        "ditolak_rr": int((~lolos).sum()), "dilewati_terbuka": int((lolos & ~diambil).sum()),
+        "tp": tp, "sl": sl, "invalid": invalid, "expired": expired,
+        "win_rate": round(tp / (tp + sl) * 100, 2) if tp + sl else 0.0,
+        "execution_rate": round((tp + sl) / n * 100, 2) if n else 0.0,
+        "pnl": round(pnl, 2),
+    }
+
+
+# --- PROCESS POOL (shared memory) ---
+
+_shm = None
+_arr = None
+_step = 900
+
+def _init_worker(nama_shm, jumlah, step):
+    global _shm, _arr, _step
+    _shm = shared_memory.SharedMemory(name=nama_shm)
+    _arr = np.ndarray((jumlah,), dtype=SIGNAL_DTYPE, buffer=_shm.buf)
+    _step = step
+
+def _run_combo(combo):
+    return evaluate_combo(_arr, *combo, step=_step)
+
+
+def run_sweep(signals, candles, ranges, grid_rr=GRID_MINIMUM_RR, grid_expired=GRID_WAKTU_EXPIRED_MENIT,
+              grid_pending=GRID_PENDING_MENIT, workers=WORKERS, now_ts=None):
+    """Mengembalikan (list baris hasil, info)."""
+    step = candle_store.interval_seconds(INTERVAL)
+    arr, dilewati = prepare_signals(signals, candles, max(grid_expired), ranges, now_ts)
+    combos = list(product(grid_rr, grid_expired, grid_pending))
+    info = {"sinyal": len(arr), "dilewati": dilewati, "kombinasi": len(combos)}
+    if len(arr) == 0:
+        return [], info
+
+    shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    try:
+        np.ndarray(arr.shape, dtype=SIGNAL_DTYPE, buffer=shm.buf)[:] = arr
+        chunk = max(1, len(combos) // (workers * 8))
+        with Pool(workers, initializer=_init_worker, initargs=(shm.name, len(arr), step)) as pool:
+            rows = pool.map(_run_combo, combos, chunksize=chunk)
+    finally:
+        shm.close()
+        shm.unlink()
+    return rows, info
+
+
+def main():
+    try:
+        signals = signal_journal.load_signals(INPUT_JSON_FILE)
+    except Exception as e:
+        print(f"❌ ERROR: Tidak dapat memuat file input '{INPUT_JSON_FILE}': {e}"); return
+    candles = candle_store.load_candles(SYMBOL, INTERVAL)
+    ranges = candle_store.load_ranges(SYMBOL, INTERVAL)
+
+    mulai = time.perf_counter()
+    rows, info = run_sweep(signals, candles, ranges)
+    durasi = time.perf_counter() - mulai
+    print(f"🧪 {info['kombinasi']} kombinasi x {info['sinyal']} sinyal dalam {durasi:.1f} detik "
+          f"({WORKERS} proses). {info['dilewati']} sinyal dilewati (data candle belum ada di store).")
+    if not rows:
+        print("❗ Tidak ada sinyal yang bisa dievaluasi. Jalankan evaluate_history.py dulu untuk mengisi candle store."); return
+
+    with open(OUTPUT_CSV_FILE, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=KOLOM)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"\n🏆 {TAMPILKAN_TERBAIK} kombinasi dengan PnL terbaik:")
+    print(f"{'RR':>5} {'Exp':>5} {'Pend':>5} {'Sinyal':>6} {'TP':>4} {'SL':>4} {'Inv':>4} {'Exp':>4} {'Win%':>6} {'Eks%':>6} {'PnL':>10}")
+    for r in sorted(rows, key=lambda r: r["pnl"], reverse=True)[:TAMPILKAN_TERBAIK]:
+        print(f"{r['minimum_rr']:>5} {r['waktu_expired_menit']:>5} {r['pending_menit']:>5} {r['sinyal']:>6} {r['tp']:>4} {r['sl']:>4} "
+              f"{r['invalid']:>4} {r['expired']:>4} {r['win_rate']:>6} {r['execution_rate']:>6} {r['pnl']:>10,.2f}")
+    print(f"\n💾 Semua hasil disimpan di: {OUTPUT_CSV_FILE}")
+
+if __name__ == "__main__":
+    main()
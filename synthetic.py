@@ -0,0 +1,114 @@
+"""
+Generator data sintetis (deterministik per seed) untuk benchmark & uji tanpa jaringan.
+
+Harga OHLC dibangkitkan per candle dengan rezim yang berganti (rantai Markov):
+
+- "trend"   : drift searah (naik/turun dipilih acak tiap rezim), volatilitas sedang
+- "range"   : mean-reverting ke harga tengah rezim, volatilitas rendah
+- "volatile": tanpa drift, volatilitas tinggi dan ekor tebal (student-t)
+
+Wick atas/bawah sebanding dengan volatilitas rezim. Hasilnya array CANDLE_DTYPE yang
+bisa langsung ditulis ke candle_store atau disajikan oleh stub_servers.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+from candle_store import CANDLE_DTYPE, interval_seconds
+
+# --- KONFIGURASI ---
+REZIM = ("trend", "range", "volatile")
+# Volatilitas per candle (fraksi harga) dan drift per candle untuk rezim trend
+VOLATILITAS = {"trend": 0.0015, "range": 0.0008, "volatile": 0.0040}
+DRIFT_TREND = 0.0004
+MEAN_REVERSION = 0.05
+# Peluang tetap di rezim yang sama per candle (rata-rata panjang rezim ~ 1 / (1 - p))
+PELUANG_TETAP = 0.995
+HARGA_AWAL = 60000.0
+START_TS = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def generate_regimes(n, seed=0, p_tetap=PELUANG_TETAP):
+    """Array indeks REZIM per candle."""
+    rng = np.random.default_rng(seed)
+    ganti = rng.random(n) > p_tetap
+    ganti[0] = True
+    pilihan = rng.integers(0, len(REZIM), size=n)
+    # Setiap kali berganti, rezim baru diambil dari `pilihan`; di antaranya tetap
+    idx = np.maximum.accumulate(np.where(ganti, np.arange(n), 0))
+    return pilihan[idx]
+
+
+def generate_ohlc(n, interval="15min", start_ts=START_TS, seed=0, harga_awal=HARGA_AWAL, regimes=None):
+    """Mengembalikan (records CANDLE_DTYPE, indeks rezim per candle)."""
+    rng = np.random.default_rng(seed + 1)
+    regimes = generate_regimes(n, seed) if regimes is None else regimes
+    skala = np.sqrt(interval_seconds(interval) / 900.0)  # Volatilitas diskalakan terhadap 15min
+    vol = np.array([VOLATILITAS[r] for r in REZIM])[regimes] * skala
+
+    # Arah trend & harga tengah range ditetapkan per segmen rezim
+    awal_segmen = np.r_[True, regimes[1:] != regimes[:-1]]
+    segmen = np.cumsum(awal_segmen) - 1
+    arah = rng.choice([-1.0, 1.0], size=segmen[-1] + 1)[segmen]
+
+    kejut = rng.standard_normal(n)
+    volatile = regimes == REZIM.index("volatile")
+    kejut[volatile] = rng.standard_t(3, size=int(volatile.sum())) / np.sqrt(3.0)
+
+    log_close = np.empty(n)
+    harga = np.log(harga_awal)
+    tengah = harga
+    for i in range(n):
+        if awal_segmen[i]:
+            tengah = harga
+        r = REZIM[regimes[i]]
+        drift = DRIFT_TREND * skala * arah[i] if r == "trend" else (MEAN_REVERSION * (tengah - harga) if r == "range" else 0.0)
+        harga = harga + drift + vol[i] * kejut[i]
+        log_close[i] = harga
+
+    close = np.exp(log_close)
+    open_ = np.r_[harga_awal, close[:-1]]
+    wick = np.abs(rng.standard_normal((2, n))) * vol * close * 0.6
+    records = np.empty(n, dtype=CANDLE_DTYPE)
+    records["ts"] = start_ts + np.arange(n, dtype=np.int64) * interval_seconds(interval)
+    records["open"] = open_
+    records["close"] = close
+    records["high"] = np.maximum(open_, close) + wick[0]
+    records["low"] = np.minimum(open_, close) - wick[1]
+    return records, regimes
+
+
+def generate_signals(candles, n, seed=0, rr=(1.5, 4.0), hasil=True):
+    """
+    `n` sinyal acak (format dict seperti sinyal_trading.json) pada candle `candles`.
+    Entry sedikit di luar close, SL 0.2%-1% dari entry, TP sesuai RR acak.
+    Jika `hasil`, Status/Hasil diisi acak (untuk benchmark dashboard); jika tidak, pending.
+    """
+    rng = np.random.default_rng(seed + 2)
+    pos = np.sort(rng.integers(0, len(candles), size=n))
+    close = candles["close"][pos]
+    buy = rng.random(n) < 0.5
+    jarak = close * rng.uniform(0.0005, 0.003, n)
+    entry = np.where(buy, close - jarak, close + jarak)
+    risk = entry * rng.uniform(0.002, 0.01, n)
+    reward = risk * rng.uniform(rr[0], rr[1], n)
+    sl = np.where(buy, entry - risk, entry + risk)
+    tp = np.where(buy, entry + reward, entry - reward)
+    # Detik acak di dalam candle supaya Waktu mirip sinyal live
+    ts = candles["ts"][pos] + rng.integers(0, 60, n)
+    pilihan = np.array(["TP", "SL", "expired", "invalid_tp_hit_first", None], dtype=object)
+    kode = rng.choice(len(pilihan), size=n, p=[0.3, 0.35, 0.2, 0.1, 0.05]) if hasil else np.full(n, len(pilihan) - 1)
+    status = {"TP": "TP", "SL": "SL", "expired": "expired", "invalid_tp_hit_first": "invalid", None: "pending"}
+    prob = rng.uniform(0.5, 0.9, n)
+
+    signals = []
+    for i in range(n):
+        h = pilihan[kode[i]]
+        signals.append({
+            "Tipe": "BUY LIMIT" if buy[i] else "SELL LIMIT",
+            "Entry": round(float(entry[i]), 2), "SL": round(float(sl[i]), 2), "TP": round(float(tp[i]), 2),
+            "Probabilitas": round(float(prob[i]), 2), "Alasan": "Sinyal sintetis untuk benchmark.",
+            "Waktu": datetime.fromtimestamp(int(ts[i]), tz=timezone.utc).isoformat(),
+            "Status": status[h], "Hasil": h,
+        })
+    return signals
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# Modul bot ada di root repo (tanpa paket), jadi root dimasukkan ke sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class _CacheTanpaTrade:
+    # Setiap kondisi pasar sudah punya keputusan "tidak ada trade", jadi LLM tidak dipanggil
+    def get(self, kunci):
+        return {}
+
+    def stats(self):
+        return {"hits": 0, "misses": 0}
+
+
+@pytest.fixture
+def cache_tanpa_trade():
+    return _CacheTanpaTrade()
@@ -0,0 +1,52 @@
+import candle_store
+
+STEP = 900
+NOW = 1767614400 + 2 * STEP + 30  # 30 detik setelah candle ke-3 dibuka
+
+
+def _values(ts_list):
+    return [{"datetime": candle_store.format_datetime(ts), "open": "1", "high": "1", "low": "1", "close": "1"}
+            for ts in reversed(ts_list)]
+
+
+def test_candle_yang_masih_terbentuk_tidak_tercakup(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    awal = 1767614400
+    candle_store.sync_candles("X", "15min", lambda params: _values([awal, awal + STEP, awal + 2 * STEP]),
+                              warmup=10, now_ts=NOW)
+    candle_store.sync_candles("X", "15min", lambda params: _values([awal + 2 * STEP]), warmup=10, now_ts=NOW)
+
+    assert len(candle_store.load_candles("X", "15min")) == 3
+    assert candle_store.load_ranges("X", "15min") == [(awal, awal + STEP)]
+    assert candle_store.last_closed_ts("15min", NOW) == awal + STEP
+    assert not candle_store.is_covered("X", "15min", awal + 2 * STEP, awal + 2 * STEP)
+
+
+def test_rentang_lama_tetap_tercakup_penuh(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    records = candle_store.values_to_records(_values([0, STEP, 2 * STEP]))
+    candle_store.write_candles("X", "15min", records, covered=(0, 2 * STEP), now_ts=NOW)
+    assert candle_store.is_covered("X", "15min", 0, 2 * STEP)
+
+
+def test_tulis_di_ekor_tanpa_membaca_seluruh_histori(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    ts = [1767614400 + i * STEP for i in range(1000)]
+    candle_store.write_candles("X", "15min", candle_store.values_to_records(_values(ts)), now_ts=NOW)
+
+    def fromfile(*args, **kwargs):
+        raise AssertionError("histori dibaca seluruhnya")
+    baru = candle_store.values_to_records(_values(ts[-1:] + [ts[-1] + STEP]))
+    baru["close"] = 2.0
+    with monkeypatch.context() as m:
+        m.setattr(candle_store.np, "fromfile", fromfile)
+        candle_store.write_candles("X", "15min", baru, now_ts=NOW)
+
+    data = candle_store.load_candles("X", "15min")
+    assert len(data) == 1001 and list(data["close"][-3:]) == [1.0, 2.0, 2.0]
+    # Data yang tidak di ekor tetap digabung
+    lama = candle_store.values_to_records(_values([ts[0] - STEP, ts[5]]))
+    lama["close"] = 3.0
+    candle_store.write_candles("X", "15min", lama, now_ts=NOW)
+    data = candle_store.load_candles("X", "15min")
+    assert len(data) == 1002 and data["ts"][0] == ts[0] - STEP and data["close"][6] == 3.0
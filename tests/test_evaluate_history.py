@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+import candle_store
+import evaluate_history
+
+STEP = candle_store.interval_seconds(evaluate_history.INTERVAL)
+NOW = 1767614400 + 40  # 40 detik setelah candle 12:00 dibuka
+
+
+def _fetch(start_ts, end_ts):
+    return [{"datetime": candle_store.format_datetime(ts), "open": "1", "high": "1", "low": "1", "close": "1"}
+            for ts in range(end_ts // STEP * STEP, start_ts - 1, -STEP)]
+
+
+def test_sinyal_baru_tercakup_setelah_satu_fetch(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    sinyal = {"Waktu": datetime.fromtimestamp(NOW - 3 * 3600, timezone.utc).isoformat()}
+    jendela = evaluate_history.jendela_sinyal(sinyal, NOW)
+    assert jendela[1] == candle_store.last_closed_ts(evaluate_history.INTERVAL, NOW)
+
+    # Sama dengan main(): fetch rentang yang direncanakan, tulis, lalu cek cakupan
+    for start_ts, end_ts in candle_store.plan_fetch_ranges(evaluate_history.SYMBOL, evaluate_history.INTERVAL, [jendela]):
+        candle_store.write_candles(evaluate_history.SYMBOL, evaluate_history.INTERVAL,
+                                   candle_store.values_to_records(_fetch(start_ts, end_ts)),
+                                   covered=(start_ts, end_ts), now_ts=NOW)
+    assert candle_store.is_covered(evaluate_history.SYMBOL, evaluate_history.INTERVAL, *jendela)
+    assert candle_store.plan_fetch_ranges(evaluate_history.SYMBOL, evaluate_history.INTERVAL, [jendela]) == []
+
+
+def test_sinyal_di_candle_yang_masih_terbentuk_belum_dievaluasi():
+    sinyal = {"Waktu": datetime.fromtimestamp(NOW - 10, timezone.utc).isoformat()}
+    start_ts, end_ts = evaluate_history.jendela_sinyal(sinyal, NOW)
+    assert end_ts < start_ts
@@ -0,0 +1,23 @@
+import numpy as np
+
+import indicators
+from candle_store import CANDLE_DTYPE
+
+
+def test_harga_kecil_tidak_dibulatkan_ke_dua_desimal():
+    rng = np.random.default_rng(3)
+    close = 1.08 + np.cumsum(rng.normal(0, 0.0004, 300))
+    records = np.empty(len(close), dtype=CANDLE_DTYPE)
+    records["ts"] = 1767225600 + 900 * np.arange(len(close))
+    records["open"] = np.r_[close[0], close[:-1]]
+    records["close"] = close
+    records["high"] = np.maximum(records["open"], close) + 0.0003
+    records["low"] = np.minimum(records["open"], close) - 0.0003
+    engine = indicators.IndicatorEngine("15min")
+    engine.update_records(records)
+
+    # Harga ~1.08 -> 5 desimal, sama dengan deret harga di prompt (prompt_builder.price_scale)
+    support, resistance = engine.support_resistance()
+    assert (support, resistance) == (f"{engine.daily.lowest():.5f}", f"{engine.daily.highest():.5f}")
+    atr = engine.summary().split(f"ATR{indicators.ATR_PERIODE} ")[1].split(" ")[0]
+    assert atr == f"{engine.s['atr']:.5f}" and float(atr) > 0
@@ -0,0 +1,43 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import candle_store
+import intrabar
+import llm_cache
+import pipeline_engine
+import signal_stats
+
+AWAL = 1704067200  # 2024-01-01 00:00 UTC
+
+
+def _fetch_lambat(params):
+    time.sleep(0.05)
+    start = candle_store.parse_datetime(params["start_date"])
+    end = candle_store.parse_datetime(params["end_date"])
+    return [{"datetime": candle_store.format_datetime(ts), "open": "1", "high": "2", "low": "0.5", "close": "1.5"}
+            for ts in range(end, start - 1, -60)]
+
+
+def test_fine_candles_bersama_tidak_fetch_ganda(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    fine = intrabar.FineCandles("X", fetch_values=_fetch_lambat)
+    mulai = threading.Barrier(8)
+
+    def ambil(_):
+        mulai.wait()
+        return fine.get(AWAL, AWAL + 14 * 60)
+
+    with ThreadPoolExecutor(8) as pool:
+        hasil = list(pool.map(ambil, range(8)))
+    assert fine.fetches == 1
+    assert all(len(data) == 15 for data in hasil)
+
+
+def test_pipeline_simbol_sama_berbagi_fine_candles(tmp_path):
+    stats = signal_stats.SignalStats(*(str(tmp_path / n) for n in ("agregat.json", "snapshot.json", "journal.jsonl")))
+    pipelines = pipeline_engine.build_pipelines([("X", "15min"), ("X", "1h"), ("Y", "15min")], signals=[], stats=stats,
+                                                decision_cache=llm_cache.DecisionCache(), fine_candles=True)
+    fine = [p.state.fine_candles for p in pipelines]
+    assert fine[0] is fine[1]
+    assert fine[2] is not fine[0] and fine[2].symbol == "Y"
@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import Signal_Trading_LLM as bot
+import llm_cache
+import llm_client
+import llm_ensemble
+import stub_servers
+from signal_book import SignalBook
+
+SINYAL = '{"Tipe": "BUY LIMIT", "Entry": 100.0, "SL": 95.0, "TP": 112.0, "Probabilitas": 0.7, "Alasan": "FVG"}'
+
+
+@pytest.fixture
+def chat():
+    servers = []
+
+    def mulai(responses):
+        server, url = stub_servers.start_chat_server(responses)
+        servers.append(server)
+        return url
+    yield mulai
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.mark.parametrize("respons, harapan", [
+    (SINYAL + " penjelasan", "sinyal"),
+    ("Tidak ada setup. {}", {}),
+    ('{"Tipe": "BUY LIMIT", "Entry": 100.0, "SL": 95.0, "TP"', None),  # terpotong
+    ('{"Tipe": "HOLD", "Entry": 100.0}', None),                         # tidak valid
+    ("maaf, saya tidak bisa menjawab", None),                           # tanpa JSON
+])
+def test_stream_signal_membedakan_tidak_ada_trade_dan_gagal(chat, respons, harapan):
+    sinyal, _ = llm_client.stream_signal("prompt", "dummy", url=chat([respons]))
+    if harapan == "sinyal":
+        assert sinyal["Tipe"] == "BUY LIMIT"
+    else:
+        assert sinyal == harapan
+
+
+def test_respons_tidak_valid_tidak_di_cache(chat, monkeypatch):
+    monkeypatch.setattr(bot, "LLM_API_URL", chat(['{"Tipe": "HOLD"}']))
+    monkeypatch.setattr(bot, "LLM_ENSEMBLE", [])
+    cache = llm_cache.DecisionCache()
+    state = bot.LoopState(SignalBook(bot.WAKTU_EXPIRED_MENIT, bot.HISTORY_UNTUK_PROMPT), cache)
+    candle = {"datetime": "2026-01-05 10:00:00", "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0}
+    monkeypatch.setattr(bot, "format_prompt", lambda *args, **kwargs: "prompt")
+
+    ringkasan = bot.process_bar(state, [candle], datetime(2026, 1, 5, 10, 15, tzinfo=timezone.utc), market_context=([], {}))
+    assert ringkasan["llm_dipanggil"] and ringkasan["sinyal_baru"] is None
+    assert len(cache._data) == 0
+
+
+def test_ensemble_menghitung_respons_rusak_sebagai_gagal(chat):
+    backends = [{"model": "a", "url": chat(['{"Tipe": "HOLD"}'])}, {"model": "b", "url": chat(["tanpa json"])}]
+    sinyal, laporan = llm_ensemble.ensemble_signal("prompt", backends, deadline=5)
+    assert sinyal is None
+    assert set(laporan["gagal"]) == {"a", "b"}
+
+
+@pytest.mark.parametrize("mode", [llm_ensemble.MODE_PERTAMA, llm_ensemble.MODE_VOTING])
+def test_ensemble_tanpa_mayoritas_sebelum_batas_waktu(mode):
+    servers = [stub_servers.start_chat_server(["{}"]),
+               stub_servers.start_chat_server([SINYAL], latency=2.0),
+               stub_servers.start_chat_server([SINYAL], latency=2.0)]
+    try:
+        backends = [{"model": nama, "url": url} for nama, (_, url) in zip("abc", servers)]
+        sinyal, laporan = llm_ensemble.ensemble_signal("prompt", backends, mode=mode, deadline=0.5)
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+    assert list(laporan["jawaban"]) == ["a"]
+    assert sinyal is None
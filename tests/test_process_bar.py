@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+import Signal_Trading_LLM as bot
+from signal_book import SignalBook
+
+WAKTU = datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc)
+
+
+def _candle(menit, low, high):
+    waktu = (WAKTU + timedelta(minutes=menit)).strftime("%Y-%m-%d %H:%M:%S")
+    return {"datetime": waktu, "open": 101.0, "high": high, "low": low, "close": 101.0}
+
+
+def _state(tmp_path, cache=None):
+    state = bot.LoopState(SignalBook(bot.WAKTU_EXPIRED_MENIT, bot.HISTORY_UNTUK_PROMPT), decision_cache=cache,
+                          journal_file=str(tmp_path / "journal.jsonl"))
+    sinyal = {"Tipe": "BUY LIMIT", "Entry": 100.0, "TP": 110.0, "SL": 95.0, "Waktu": WAKTU.isoformat(),
+              "Status": "pending", "Hasil": None}
+    state.add_signal(sinyal)
+    state.last_processed_datetime = _candle(0, 0, 0)["datetime"]
+    return state, sinyal
+
+
+def test_candle_yang_masih_terbentuk_tidak_dievaluasi(tmp_path):
+    state, sinyal = _state(tmp_path)
+    # Candle 10:15 baru dibuka pada 10:15:02; low-nya sudah menyentuh Entry & SL
+    ringkasan = bot.process_bar(state, [_candle(15, 90.0, 102.0), _candle(0, 100.5, 102.0)],
+                                WAKTU + timedelta(minutes=15, seconds=2))
+    assert not ringkasan["diproses"]
+    assert sinyal["Status"] == "pending"
+    assert state.last_processed_datetime == "2026-01-05 10:00:00"
+
+
+def test_candle_tertinggal_dievaluasi_berurutan(tmp_path, cache_tanpa_trade):
+    state, sinyal = _state(tmp_path, cache_tanpa_trade)
+    data = [_candle(45, 90.0, 102.0),   # masih terbentuk, tidak boleh memicu SL
+            _candle(30, 100.5, 111.0),  # TP
+            _candle(15, 99.0, 102.0),   # Entry tersentuh -> active
+            _candle(0, 100.5, 102.0)]   # sudah diproses
+    ringkasan = bot.process_bar(state, data, WAKTU + timedelta(minutes=45, seconds=2), market_context=([], {}))
+    assert ringkasan["hasil"] == [(0, "TP")]
+    assert state.last_processed_datetime == "2026-01-05 10:30:00"
+    assert state.book.open_signals() == []
@@ -0,0 +1,40 @@
+import re
+
+import numpy as np
+import pytest
+
+import prompt_builder
+from candle_store import CANDLE_DTYPE
+
+KONTEKS = {"trend_h1": "Naik", "volatility_h1": "Normal", "support": 0, "resistance": 0}
+
+
+def _records(close):
+    records = np.empty(len(close), dtype=CANDLE_DTYPE)
+    records["ts"] = 1767225600 + 900 * np.arange(len(close))
+    records["open"] = records["high"] = records["low"] = records["close"] = close
+    return records
+
+
+def _decode(prompt):
+    base = float(re.search(r"harga = (\S+) \+ nilai", prompt).group(1))
+    bagian = prompt.split("Close per bar:\n", 1)[1].split("\n\n", 1)[0]
+    return base, [base + float(baris.split()[-1]) for baris in bagian.splitlines()]
+
+
+@pytest.mark.parametrize("close, toleransi", [
+    (0.51234 + 0.00011 * np.arange(50), 5e-7),  # Aset di bawah 1.0
+    (1.08523 + 0.00007 * np.arange(50), 5e-6),  # Forex
+    (64123.45 + 12.5 * np.arange(50), 5e-3),     # BTC: tetap 2 desimal, basis kelipatan 100
+])
+def test_harga_bisa_direkonstruksi(close, toleransi):
+    prompt, laporan = prompt_builder.build_prompt(_records(close), [], KONTEKS, "X", "15min", 2.0)
+    base, harga = _decode(prompt)
+    assert laporan["candle_raw"] == len(close)
+    assert np.abs(np.array(harga) - close).max() <= toleransi
+    assert abs(base - close[-1]) <= abs(close[-1]) * 0.01
+
+
+def test_skala_btc_tidak_berubah():
+    assert prompt_builder.price_scale(64123.45) == (64100.0, 2)
+    assert prompt_builder.price_scale(0.51234) == (0.512, 6)
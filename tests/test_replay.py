@@ -0,0 +1,14 @@
+import hashlib
+import json
+
+import replay
+
+
+def test_recorded_llm_miss_bukan_tidak_ada_trade(tmp_path):
+    path = tmp_path / "rekaman.jsonl"
+    path.write_text(json.dumps({"prompt_sha1": hashlib.sha1(b"ada").hexdigest(), "response": "{}"}) + "\n",
+                    encoding="utf-8")
+    llm = replay.RecordedLLM(str(path))
+    assert llm("ada") == {}
+    assert llm("tidak ada") is None
+    assert (llm.calls, llm.misses) == (2, 1)
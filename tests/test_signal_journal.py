@@ -0,0 +1,24 @@
+import multiprocessing
+
+import signal_journal
+
+JUMLAH = 300
+
+
+def _penulis(snapshot, journal):
+    for i in range(JUMLAH):
+        signal_journal.append_new(i, {"n": i}, journal_file=journal)
+
+
+def test_compact_tidak_menghilangkan_append_dari_proses_lain(tmp_path):
+    snapshot, journal = str(tmp_path / "snapshot.json"), str(tmp_path / "journal.jsonl")
+    proses = multiprocessing.get_context("spawn").Process(target=_penulis, args=(snapshot, journal))
+    proses.start()
+    while proses.is_alive():
+        signal_journal.compact(snapshot, journal)
+    proses.join()
+    assert proses.exitcode == 0
+
+    assert [s["n"] for s in signal_journal.load_signals(snapshot, journal)] == list(range(JUMLAH))
+    assert [s["n"] for s in signal_journal.compact(snapshot, journal)] == list(range(JUMLAH))
+    assert signal_journal.read_journal(journal) == []
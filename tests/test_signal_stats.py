@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+import Signal_Trading_LLM as bot
+import signal_stats
+from signal_book import SignalBook
+
+WAKTU = datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc)
+
+
+def _files(tmp_path):
+    return (str(tmp_path / "aggregates.json"), str(tmp_path / "snapshot.json"), str(tmp_path / "journal.jsonl"))
+
+
+def _sinyal():
+    return {"Tipe": "BUY LIMIT", "Entry": 100.0, "TP": 110.0, "SL": 95.0, "Waktu": WAKTU.isoformat(),
+            "Status": "pending", "Hasil": None, "Symbol": bot.SYMBOL, "Interval": bot.INTERVAL}
+
+
+def _candle(menit, low, high):
+    waktu = (WAKTU + timedelta(minutes=menit)).strftime("%Y-%m-%d %H:%M:%S")
+    return {"datetime": waktu, "open": 101.0, "high": high, "low": low, "close": 101.0}
+
+
+def _state(tmp_path, cache=None):
+    agregat, snapshot, journal = _files(tmp_path)
+    stats = signal_stats.open_stats([], agregat, snapshot, journal)
+    state = bot.LoopState(SignalBook(bot.WAKTU_EXPIRED_MENIT, bot.HISTORY_UNTUK_PROMPT), decision_cache=cache,
+                          journal_file=journal, stats=stats)
+    sinyal = _sinyal()
+    state.add_signal(sinyal)
+    stats.record_new(sinyal)
+    return state, sinyal
+
+
+def test_aktivasi_memajukan_watermark(tmp_path):
+    state, sinyal = _state(tmp_path)
+    bot.process_bar(state, [_candle(15, low=99.0, high=102.0)], WAKTU + timedelta(minutes=30))
+    assert sinyal["Status"] == "active"
+
+    stats = signal_stats.SignalStats(*_files(tmp_path))
+    assert stats.load()
+    assert stats.counts == {"pending": 1}
+
+
+def test_hasil_akhir_tercatat_setelah_aktivasi(tmp_path, cache_tanpa_trade):
+    state, sinyal = _state(tmp_path, cache_tanpa_trade)
+    bot.process_bar(state, [_candle(15, low=99.0, high=102.0)], WAKTU + timedelta(minutes=30))
+    bot.process_bar(state, [_candle(30, low=100.0, high=111.0)], WAKTU + timedelta(minutes=45), market_context=([], {}))
+    assert sinyal["Hasil"] == "TP"
+
+    stats = signal_stats.SignalStats(*_files(tmp_path))
+    assert stats.load()
+    assert stats.summary()["total_win"] == 1
+    assert stats.summary()["total_pnl"] == signal_stats.signal_pnl(sinyal)
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import Signal_Trading_LLM as bot
+import signal_journal
+import state_checkpoint
+
+WAKTU = datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    for nama, file in (("JSON_FILE", "snapshot.json"), ("JOURNAL_FILE", "journal.jsonl"),
+                       ("AGGREGATES_FILE", "aggregates.json"), ("STATE_FILE", "bot_state.ckpt")):
+        monkeypatch.setattr(bot, nama, str(tmp_path / file))
+    monkeypatch.setattr(bot, "_indicator_engines", {})
+    return bot
+
+
+def _tanpa_histori(monkeypatch):
+    def gagal(*args, **kwargs):
+        raise AssertionError("histori lengkap dibaca saat start ulang")
+    monkeypatch.setattr(bot, "load_signals", gagal)
+    monkeypatch.setattr(signal_journal, "load_signals", gagal)
+
+
+def _jalankan_sampai_aktif():
+    state = bot.restore_state(decision_cache=None)
+    sinyal = {"Tipe": "BUY LIMIT", "Entry": 100.0, "TP": 110.0, "SL": 95.0, "Waktu": WAKTU.isoformat(),
+              "Status": "pending", "Hasil": None, "Symbol": bot.SYMBOL, "Interval": bot.INTERVAL}
+    state.add_signal(sinyal)
+    state.stats.record_new(sinyal)
+    candle = {"datetime": "2026-01-05 10:15:00", "open": 101.0, "high": 102.0, "low": 99.0, "close": 101.0}
+    bot.process_bar(state, [candle], WAKTU + timedelta(minutes=30))
+    assert sinyal["Status"] == "active"
+    bot.save_state(state)
+    return state
+
+
+def _cek_state_pulih():
+    state = bot.restore_state(decision_cache=None)
+    [(idx, sinyal)] = state.book.open_signals()
+    assert (idx, sinyal["Status"]) == (0, "active")
+    assert state.last_processed_datetime == "2026-01-05 10:15:00"
+    assert state.stats.counts == {"pending": 1}
+
+
+def test_start_ulang_setelah_aktivasi_tanpa_histori(files, monkeypatch):
+    _jalankan_sampai_aktif()
+    _tanpa_histori(monkeypatch)
+    _cek_state_pulih()
+
+
+def test_start_ulang_setelah_compact_tanpa_histori(files, monkeypatch):
+    _jalankan_sampai_aktif()
+    signal_journal.compact(bot.JSON_FILE, bot.JOURNAL_FILE,
+                           on_compacted=lambda lama, baru: state_checkpoint.restamp(lama, baru, bot.STATE_FILE))
+    assert signal_journal.read_journal(bot.JOURNAL_FILE) == []
+    _tanpa_histori(monkeypatch)
+    _cek_state_pulih()
+
+
+def test_checkpoint_tertinggal_memakai_histori(files):
+    state = _jalankan_sampai_aktif()
+    sinyal = state.book.open_signals()[0][1]
+    sinyal["Status"] = sinyal["Hasil"] = "TP"
+    bot.save_signal_event(0, sinyal)  # Crash sebelum checkpoint berikutnya ditulis
+
+    state = bot.restore_state(decision_cache=None)
+    assert state.book.open_signals() == []
+    assert state.stats.counts == {"TP": 1}
@@ -0,0 +1,50 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+
+import Signal_Trading_LLM as bot
+import candle_store
+import sweep
+import synthetic
+from signal_book import SignalBook
+
+STEP = candle_store.interval_seconds(sweep.INTERVAL)
+
+
+@pytest.fixture(scope="module")
+def fixture_pasar():
+    candles, _ = synthetic.generate_ohlc(600, sweep.INTERVAL, seed=7)
+    signals = synthetic.generate_signals(candles[:-150], 80, seed=7, hasil=False)
+    return candles, signals
+
+
+def _live(candles, signals, expired_menit, cache, tmp_path):
+    # process_bar per candle; sinyal masuk tepat sebelum candle tempat 'Waktu'-nya berada
+    state = bot.LoopState(SignalBook(expired_menit, bot.HISTORY_UNTUK_PROMPT), cache,
+                          journal_file=str(tmp_path / f"journal-{expired_menit}.jsonl"))
+    antre = sorted((candle_store.parse_datetime(s["Waktu"]) // STEP * STEP, i) for i, s in enumerate(signals))
+    salinan = [dict(s) for s in signals]
+    hasil = Counter()
+    for bar in candle_store.records_to_values(candles)[::-1]:
+        ts = candle_store.parse_datetime(bar["datetime"])
+        while antre and antre[0][0] == ts:
+            i = antre.pop(0)[1]
+            state.book.add(i, salinan[i])
+        ringkasan = bot.process_bar(state, [bar], datetime.fromtimestamp(ts + STEP, timezone.utc), market_context=([], {}))
+        hasil.update(h for _, h in ringkasan["hasil"])
+    return hasil
+
+
+@pytest.mark.parametrize("expired_menit", [30, 60, 120])
+def test_combo_sama_dengan_process_bar(fixture_pasar, expired_menit, cache_tanpa_trade, tmp_path):
+    candles, signals = fixture_pasar
+    arr, dilewati = sweep.prepare_signals(signals, candles, expired_menit, ranges=[(int(candles["ts"][0]), int(candles["ts"][-1]))],
+                                          now_ts=int(candles["ts"][-1]) + STEP)
+    assert dilewati == 0
+    combo = sweep.evaluate_combo(arr, 0.0, expired_menit, None, satu_terbuka=False, step=STEP)
+
+    live = _live(candles, signals, expired_menit, cache_tanpa_trade, tmp_path)
+    assert sum(live.values()) == len(signals)
+    assert (combo["tp"], combo["sl"], combo["invalid"], combo["expired"]) == \
+        (live["TP"], live["SL"], live["invalid_tp_hit_first"], live["expired"])